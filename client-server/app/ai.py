@@ -1,33 +1,114 @@
-# ------------------ AI REPLY FUNCTION ------------------
-
-def get_ai_reply(message: str) -> str:
-    """Get AI reply for chat message"""
-    # Simple AI response logic
-    message_lower = message.lower()
-    
-    if "hello" in message_lower or "hi" in message_lower:
-        return "Hello! Welcome to Roamio Wanderly! How can I help you plan your Nepal adventure today?"
-    
-    elif "pokhara" in message_lower:
-        return "Pokhara is a beautiful city known as the 'City of Lakes'. It offers stunning views of the Himalayas, beautiful lakes, and activities like paragliding and boating. Would you like to know more about specific attractions in Pokhara?"
-    
-    elif "kathmandu" in message_lower:
-        return "Kathmandu is the capital city of Nepal, rich in culture and history. You can visit ancient temples, Durbar Square, and experience vibrant local markets. What specific information about Kathmandu would you like?"
-    
-    elif "everest" in message_lower:
-        return "Mount Everest is the world's highest peak! The Everest Base Camp trek is one of the most popular adventures. Are you interested in trekking information or just curious about the mountain?"
-    
-    elif "hotel" in message_lower or "stay" in message_lower:
-        return "I can help you find great accommodation options! What city or area in Nepal are you planning to visit? I can recommend hotels based on your budget and preferences."
-    
-    elif "food" in message_lower or "restaurant" in message_lower:
-        return "Nepal has amazing cuisine! From traditional Dal Bhat to momos and Newari dishes. What type of food are you interested in, and which city?"
-    
-    elif "weather" in message_lower:
-        return "Nepal's weather varies by region and season. Generally, spring (March-May) and autumn (September-November) are the best times to visit. What specific region are you planning to visit?"
-    
-    elif "price" in message_lower or "cost" in message_lower:
-        return "Costs in Nepal vary greatly. Budget travelers can manage $20-30 per day, while mid-range travelers might spend $50-100 per day. What's your budget range and what type of experience are you looking for?"
-    
-    else:
-        return "I'd be happy to help you plan your Nepal adventure! You can ask me about destinations, hotels, restaurants, weather, costs, or trekking. What specific information would you like?"
+"""
+Intent matching for the chat bot.
+
+Intents, their trigger phrases and replies live in ``app/intents.json``. They
+are compiled once into a trie over normalised words, so a message is matched
+in a single left-to-right pass over its words: at each word the trie gives the
+longest phrase starting there, and the scan continues after it. The cost
+depends on the length of the message, not on how many intents or phrases
+there are, and phrases only match whole words ("hi" no longer fires on
+"chitwan" or "this").
+
+Every matched phrase adds its intent's weight to that intent's score (each
+distinct phrase counts once) and the highest score wins; ties go to the intent
+listed first. Topic intents (hotels, food, ...) weigh more than places and
+greetings, so "hi, any hotels in Pokhara?" is answered as a hotel question.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from .shared_index import SharedIndex
+from .suggest import normalize
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.json")
+
+Intent = namedtuple("Intent", "name weight reply priority")
+IntentMatch = namedtuple("IntentMatch", "intent score phrases")
+
+_END = None  # trie key holding the intents a phrase ends in
+
+
+# ------------------ INTENT ENGINE ------------------
+
+class IntentEngine:
+    """Word-trie multi-phrase matcher with weighted intent scoring"""
+
+    def __init__(self, fallback=""):
+        self.fallback = fallback
+        self.intents = {}
+        self._trie = {}
+        self.phrase_count = 0
+
+    def add_intent(self, name, patterns=(), weight=1.0, reply=""):
+        """Register an intent (or extend an existing one) with trigger phrases"""
+        if name not in self.intents:
+            self.intents[name] = Intent(name, float(weight), reply, len(self.intents))
+        self.add_patterns(name, patterns)
+
+    def add_patterns(self, name, patterns):
+        for pattern in patterns:
+            words = normalize(pattern).split()
+            if not words:
+                continue
+            node = self._trie
+            for word in words:
+                node = node.setdefault(word, {})
+            targets = node.setdefault(_END, set())
+            if name not in targets:
+                targets.add(name)
+                self.phrase_count += 1
+
+    def scan(self, message):
+        """Leftmost-longest phrase matches in a message: [(phrase, {intent names})]"""
+        words = normalize(message).split()
+        found = []
+        i = 0
+        while i < len(words):
+            node = self._trie
+            longest = None
+            j = i
+            while j < len(words) and words[j] in node:
+                node = node[words[j]]
+                j += 1
+                if _END in node:
+                    longest = (j, node[_END])
+            if longest is None:
+                i += 1
+                continue
+            end, names = longest
+            found.append((" ".join(words[i:end]), names))
+            i = end
+        return found
+
+    def match(self, message):
+        """Scored intents for a message, best first"""
+        scores = {}
+        phrases = {}
+        for phrase, names in self.scan(message):
+            for name in names:
+                seen = phrases.setdefault(name, [])
+                if phrase not in seen:
+                    seen.append(phrase)
+                    scores[name] = scores.get(name, 0.0) + self.intents[name].weight
+        ranked = sorted(scores, key=lambda name: (-scores[name], self.intents[name].priority))
+        return [IntentMatch(self.intents[name], scores[name], phrases[name]) for name in ranked]
+
+    def reply(self, message):
+        matches = self.match(message)
+        return matches[0].intent.reply if matches else self.fallback
+
+
+def load_intents(path=INTENTS_FILE):
+    """Build an IntentEngine from an intents JSON file"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    engine = IntentEngine(fallback=data.get("fallback", ""))
+    for intent in data["intents"]:
+        engine.add_intent(intent["name"], intent.get("patterns", ()),
+                          intent.get("weight", 1.0), intent.get("reply", ""))
+    return engine
+
+
+intent_engine = SharedIndex(lambda: load_intents(INTENTS_FILE), "intent engine")
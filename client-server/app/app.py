@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, jsonify
 from flask_cors import CORS
 import os
 import sys
@@ -7,7 +7,19 @@ from dotenv import load_dotenv  # ✅ Load .env
 # Add the app directory to Python path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from .database import init_db, db
+from .database import engine, init_db, remove_session
+from .writer import exit_on_sigterm
+from .image_manifest import image_manifest
+from .static_assets import asset_index
+from .suggest import suggest_index
+from .recommender import similar_items
+from .collaborative import co_saves
+from .geo import spatial_index
+from .seasons import season_index
+from .hotel_index import destination_hotels
+from .facets import facet_index
+from .retrieval import chat_catalog
+from .mailer import mail_queue
 from .routes.search import search_blueprint
 from .routes.users import users_blueprint
 from .routes.rooms import rooms_blueprint
@@ -16,6 +28,9 @@ from .routes.admin import admin_bp   # ⭐ Admin routes (login + dashboard)
 from .routes.places import places_bp
 from .routes.wishlist import wishlist_bp
 from .routes.hotels import hotels_bp
+from .routes.recommendations import recommendations_bp
+from .routes.nearby import nearby_bp
+from .routes.seasons import seasons_bp
 
 # -----------------------------
 # Load .env from backend folder
@@ -34,11 +49,10 @@ def create_app():
     app = Flask(__name__, static_folder=None)
 
     # -----------------------------
-    # Database configuration
+    # Database sessions
     # -----------------------------
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///./tourism.db"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.init_app(app)
+    # One pooled engine (app/database.py); each request's session is closed here
+    app.teardown_appcontext(remove_session)
 
     # -----------------------------
     # CORS setup
@@ -52,12 +66,34 @@ def create_app():
         "http://127.0.0.1:5174",
         "http://127.0.0.1:5175",
         "http://127.0.0.1:3000"
-    ], supports_credentials=True)
+    ], supports_credentials=True, expose_headers=["X-Next-Cursor"])
 
     # -----------------------------
     # Initialize DB
     # -----------------------------
     init_db()
+    # Queued write-behind jobs are committed at exit, also on SIGTERM
+    exit_on_sigterm()
+
+    # Scan (or load the cached manifest of) the place image folders once up front
+    image_manifest.refresh()
+    # Content hashes for ETags and versioned image URLs
+    asset_index.warm()
+
+    # Build the autocomplete index before the first keystroke arrives
+    suggest_index.get()
+
+    # Load the precomputed similar-items table (built here only if missing)
+    similar_items.load()
+    co_saves.build()
+    spatial_index.get()
+    season_index.get()
+    destination_hotels.get()
+    facet_index.get()
+    chat_catalog.get()
+
+    # Send queued emails (including any left over from a previous run)
+    mail_queue.start()
 
     # -----------------------------
     # Register blueprints/routes
@@ -69,6 +105,9 @@ def create_app():
     app.register_blueprint(places_bp, url_prefix="/api")
     app.register_blueprint(wishlist_bp, url_prefix="/api")
     app.register_blueprint(hotels_bp, url_prefix="/api")
+    app.register_blueprint(recommendations_bp, url_prefix="/api")
+    app.register_blueprint(nearby_bp, url_prefix="/api")
+    app.register_blueprint(seasons_bp, url_prefix="/api")
     app.register_blueprint(admin_bp)  # Admin login/dashboard routes
 
     # -----------------------------
@@ -83,8 +122,8 @@ def create_app():
     # -----------------------------
     @app.route("/datasets/<path:filename>")
     def datasets_files(filename):
-        datasets_dir = os.path.join(os.getcwd(), "datasets")
-        return send_from_directory(datasets_dir, filename)
+        # Strong ETags, 304s, Range and immutable caching for ?v=<hash> URLs
+        return asset_index.serve(filename)
 
     return app
 
@@ -96,7 +135,7 @@ if __name__ == "__main__":
     print("🚀 Starting Tourism Recommendation System Backend Server...")
     print("📍 Server running at: http://localhost:8000")
     print("🌐 CORS enabled for frontend at: http://localhost:5173")
-    print("📊 Database: SQLite (tourism.db)")
+    print(f"📊 Database: {engine.url.render_as_string(hide_password=True)}")
     print("=" * 50)
     
     app.run(debug=True, host="0.0.0.0", port=8000)
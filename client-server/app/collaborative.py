@@ -0,0 +1,223 @@
+"""
+Item-to-item collaborative filtering over the wishlists table.
+
+Saves are a binary user x place matrix M. The place x place co-occurrence
+matrix C = M.T @ M is built once with SciPy sparse ops; C[i, j] is the number of
+users who saved both i and j and the diagonal holds each place's save count.
+Similarity is cosine, C[i, j] / sqrt(C[i, i] * C[j, j]).
+
+Wishlist writes are applied incrementally: adding or removing place p for a user
+who also saved places O only touches the (p, o) pairs, which go into a small
+delta map. Only the top-k lists of the touched places are recomputed, on the next
+read. Once the delta grows past ``compact_threshold`` pairs it is folded back
+into C on a background thread (``shared_index.BackgroundRebuild``), together
+with fresh top-k lists; lookups keep using C plus the delta until the new C is
+swapped in, so no request waits for the fold. (Lists that merely contain p keep p's old save count in their scores
+until they are touched or the delta is compacted.)
+
+Each process keeps its own model; writes made by other processes are picked up
+on the next full ``build()``.
+"""
+
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+from scipy import sparse
+
+from .database import SessionLocal
+from . import models
+from .shared_index import BackgroundRebuild
+
+TOP_K = 20
+
+
+class CoSaveModel:
+    """Incrementally maintained place-place co-save similarities"""
+
+    def __init__(self, top_k=TOP_K, compact_threshold=50_000):
+        self.top_k = top_k
+        self.compact_threshold = compact_threshold
+
+        self._base = sparse.csr_matrix((0, 0), dtype=np.int64)  # C, indexed by place id
+        self._base_counts = np.zeros(0, dtype=np.int64)          # diagonal of C
+        self._delta = defaultdict(Counter)  # place -> other place -> co-save change
+        self._delta_pairs = 0
+        self._count_delta = Counter()       # place -> save count change
+        self._top = {}                      # place -> [(other, score, co-saves)]
+        self._dirty = set()
+        self._loaded = False
+        self._generation = 0                # bumped by build(), so a fold of an older C is dropped
+        self._lock = threading.RLock()
+        self._compaction = BackgroundRebuild(self._compact, "co-save table")
+
+    # ------------------ BUILDING ------------------
+
+    def build(self):
+        """Rebuild C from the wishlists table"""
+        db = SessionLocal()
+        try:
+            pairs = db.query(models.Wishlist.user_id, models.Wishlist.place_id).distinct().all()
+        finally:
+            db.close()
+
+        user_index = {}
+        rows = np.fromiter((user_index.setdefault(u, len(user_index)) for u, _ in pairs),
+                           dtype=np.int64, count=len(pairs))
+        cols = np.fromiter((p for _, p in pairs), dtype=np.int64, count=len(pairs))
+        n_places = int(cols.max()) + 1 if len(cols) else 0
+
+        saves = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.int64), (rows, cols)),
+            shape=(len(user_index), n_places),
+        )
+        with self._lock:
+            self._install((saves.T @ saves).tocsr())
+            self._generation += 1
+            self._loaded = True
+
+    def wait(self, timeout=None):
+        """Wait for a pending background compaction (scripts and tests)"""
+        return self._compaction.wait(timeout)
+
+    def _install(self, co):
+        co.sum_duplicates()
+        self._base = co
+        self._base_counts = co.diagonal()
+        self._delta.clear()
+        self._delta_pairs = 0
+        self._count_delta.clear()
+        self._dirty.clear()
+        self._top = self._all_top_k(co)
+
+    def _all_top_k(self, co):
+        """Top-k lists for every place, straight from the CSR arrays"""
+        counts = co.diagonal().astype(np.float64)
+        top = {}
+        for i in np.flatnonzero(counts):
+            start, stop = co.indptr[i], co.indptr[i + 1]
+            others, together = co.indices[start:stop], co.data[start:stop]
+            keep = (others != i) & (together > 0)
+            top[int(i)] = self._rank(others[keep], together[keep], counts[i], counts[others[keep]])
+        return top
+
+    def _rank(self, others, together, count, other_counts):
+        if not len(others):
+            return []
+        scores = together / np.sqrt(count * other_counts)
+        k = min(self.top_k, len(others))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.lexsort((others[best], -scores[best]))]
+        return [(int(others[j]), float(scores[j]), int(together[j])) for j in best]
+
+    def _compact(self):
+        """
+        Fold a snapshot of the delta map into C and recompute every top-k list
+        (runs on the compaction thread). Only the snapshot and the swap hold
+        the lock; changes made in between stay in the delta.
+        """
+        with self._lock:
+            if self._delta_pairs < self.compact_threshold:
+                return
+            generation = self._generation
+            base = self._base
+            delta = {i: dict(row) for i, row in self._delta.items()}
+            count_delta = dict(self._count_delta)
+
+        entries = [(i, j, d) for i, row in delta.items() for j, d in row.items()]
+        entries += [(i, i, d) for i, d in count_delta.items()]
+        size = max([base.shape[0]] + [max(i, j) + 1 for i, j, _ in entries])
+        if base.shape[0] < size:
+            base = base.copy()
+            base.resize((size, size))
+        if entries:
+            i, j, d = (np.array(column, dtype=np.int64) for column in zip(*entries))
+            base = base + sparse.csr_matrix((d, (i, j)), shape=(size, size))
+            base.eliminate_zeros()
+        co = base.tocsr()
+        co.sum_duplicates()
+        top = self._all_top_k(co)
+
+        with self._lock:
+            if generation != self._generation:
+                return  # build() replaced C meanwhile
+            # What was folded in leaves the delta; later changes stay
+            for i, row in delta.items():
+                live = self._delta[i]
+                for j, d in row.items():
+                    live[j] -= d
+                    if not live[j]:
+                        del live[j]
+                if not live:
+                    del self._delta[i]
+            for i, d in count_delta.items():
+                self._count_delta[i] -= d
+                if not self._count_delta[i]:
+                    del self._count_delta[i]
+            self._base = co
+            self._base_counts = co.diagonal()
+            self._top = top
+            self._delta_pairs = sum(len(row) for row in self._delta.values())
+            self._dirty = set(self._delta) | set(self._count_delta)
+
+    # ------------------ INCREMENTAL UPDATES ------------------
+
+    def record_add(self, place_id, other_place_ids):
+        """A user who already saved ``other_place_ids`` saved ``place_id``"""
+        self._apply(place_id, other_place_ids, +1)
+
+    def record_remove(self, place_id, other_place_ids):
+        """A user who still has ``other_place_ids`` removed ``place_id``"""
+        self._apply(place_id, other_place_ids, -1)
+
+    def _apply(self, place_id, other_place_ids, sign):
+        with self._lock:
+            if not self._loaded:
+                return  # the first build reads the current table anyway
+            self._count_delta[place_id] += sign
+            self._dirty.add(place_id)
+            for other in other_place_ids:
+                if other == place_id:
+                    continue
+                self._delta[place_id][other] += sign
+                self._delta[other][place_id] += sign
+                self._delta_pairs += 2
+                self._dirty.add(other)
+            if self._delta_pairs >= self.compact_threshold:
+                self._compaction.request()
+
+    # ------------------ LOOKUP ------------------
+
+    def _count(self, i):
+        base = int(self._base_counts[i]) if i < len(self._base_counts) else 0
+        return base + self._count_delta.get(i, 0)
+
+    def _recompute(self, i):
+        together = Counter()
+        if i < self._base.shape[0]:
+            start, stop = self._base.indptr[i], self._base.indptr[i + 1]
+            together.update(dict(zip(self._base.indices[start:stop].tolist(),
+                                     self._base.data[start:stop].tolist())))
+        together.update(self._delta.get(i, {}))
+        together.pop(i, None)
+
+        others = np.array([j for j, c in together.items() if c > 0], dtype=np.int64)
+        counts = np.array([together[j] for j in others], dtype=np.float64)
+        count = self._count(i)
+        if count <= 0 or not len(others):
+            return []
+        other_counts = np.array([self._count(int(j)) for j in others], dtype=np.float64)
+        return self._rank(others, counts, float(count), np.maximum(other_counts, 1.0))
+
+    def also_saved(self, place_id, limit=10):
+        """[(place id, cosine score, number of users who saved both)] for ``place_id``"""
+        with self._lock:
+            if not self._loaded:
+                self.build()
+            if place_id in self._dirty:
+                self._top[place_id] = self._recompute(place_id)
+                self._dirty.discard(place_id)
+            return self._top.get(place_id, [])[:limit]
+
+
+co_saves = CoSaveModel()
@@ -1,15 +1,26 @@
+from collections import namedtuple
+
+from sqlalchemy import delete, func, select, text
 from sqlalchemy.orm import Session
 from . import models
+from .database import insert
+from .collaborative import co_saves
+from .writer import writer
 
 # ------------------ USER CRUD ------------------
 
-def create_user(db: Session, user_data: dict):
+# Writes go through the shared writer (see writer.py), which group-commits
+# them from a single thread; reads use the caller's session.
+
+def _create(db: Session, model, values: dict):
+    obj = model(**values)
+    db.add(obj)
+    db.flush()
+    return obj
+
+def create_user(user_data: dict):
     """Create a new user"""
-    user = models.User(**user_data)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return writer.run(_create, models.User, user_data)
 
 def get_user_by_email(db: Session, email: str):
     """Get user by email"""
@@ -21,13 +32,9 @@ def get_all_users(db: Session):
 
 # ------------------ ROOM CRUD ------------------
 
-def create_room(db: Session, room_data: dict):
+def create_room(room_data: dict):
     """Create a new room"""
-    room = models.Room(**room_data)
-    db.add(room)
-    db.commit()
-    db.refresh(room)
-    return room
+    return writer.run(_create, models.Room, room_data)
 
 def get_all_rooms(db: Session):
     """Get all rooms"""
@@ -35,6 +42,12 @@ def get_all_rooms(db: Session):
 
 # ------------------ GENERAL CRUD ------------------
 
+def count_rows(db: Session, table: str):
+    """Row count of a table kept in row_counts by triggers (see migrations.COUNTED_TABLES)"""
+    return db.execute(
+        text("SELECT row_count FROM row_counts WHERE table_name = :table"), {"table": table}
+    ).scalar() or 0
+
 def get_all_places(db: Session):
     """Get all places"""
     return db.query(models.Place).all()
@@ -53,54 +66,127 @@ def search_places(db: Session, query: str):
 
 # ------------------ WISHLIST CRUD ------------------
 
-def add_to_wishlist(db: Session, user_id: str, place_id: int):
-    """Add place to user's wishlist"""
-    # Check if already in wishlist
-    existing = db.query(models.Wishlist).filter(
-        models.Wishlist.user_id == user_id,
-        models.Wishlist.place_id == place_id
-    ).first()
-    
+# Outcome of a batched wishlist update: place IDs newly saved, removed, and
+# requested for adding but not found; ``saved`` is the subset of the checked
+# IDs that are in the wishlist after the update
+WishlistChanges = namedtuple("WishlistChanges", "added removed missing saved")
+
+MAX_WISHLIST_BATCH = 500
+
+def _update_wishlist(db: Session, user_id: str, add, remove, check):
+    """Write job: apply adds, then removes, then check; returns (changes, saved place IDs after)"""
+    W = models.Wishlist
+    existing = set()
+    if add:
+        existing = {pid for (pid,) in db.query(models.Place.id).filter(models.Place.id.in_(add))}
+
+    added = []
     if existing:
-        return existing
-    
-    wishlist_item = models.Wishlist(user_id=user_id, place_id=place_id)
-    db.add(wishlist_item)
-    db.commit()
-    db.refresh(wishlist_item)
-    return wishlist_item
-
-def remove_from_wishlist(db: Session, user_id: str, place_id: int):
-    """Remove place from user's wishlist"""
-    wishlist_item = db.query(models.Wishlist).filter(
+        # The unique (user_id, place_id) index makes re-adding a no-op
+        stmt = insert(W).values([{"user_id": user_id, "place_id": pid} for pid in sorted(existing)])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "place_id"]).returning(W.place_id)
+        added = sorted(pid for (pid,) in db.execute(stmt))
+
+    removed = []
+    if remove:
+        stmt = delete(W).where(W.user_id == user_id, W.place_id.in_(remove)).returning(W.place_id)
+        removed = sorted(pid for (pid,) in db.execute(stmt))
+
+    changes = WishlistChanges(
+        added=added,
+        removed=removed,
+        missing=sorted(set(add) - existing),
+        saved=wishlisted_places(db, user_id, check),
+    )
+    current = None
+    if added or removed:
+        current = {pid for (pid,) in db.query(W.place_id).filter(W.user_id == user_id)}
+    return changes, current
+
+def update_wishlist(user_id: str, add=(), remove=(), check=()):
+    """
+    Add and remove many places for a user in one transaction, then report
+    which of ``check`` are saved. Returns WishlistChanges.
+    """
+    changes, current = writer.run(_update_wishlist, user_id, list(add), list(remove), list(check))
+    if current is not None:
+        _record_co_saves(changes, current)
+    return changes
+
+def _record_co_saves(changes: WishlistChanges, current: set):
+    """Replay the update against the "also saved" co-occurrence model, in the order it was applied"""
+    saved = (current | set(changes.removed)) - set(changes.added)
+    for place_id in changes.added:
+        co_saves.record_add(place_id, saved - {place_id})
+        saved.add(place_id)
+    for place_id in changes.removed:
+        saved.discard(place_id)
+        co_saves.record_remove(place_id, saved)
+
+def add_to_wishlist(user_id: str, place_id: int):
+    """Add place to user's wishlist; False if the place does not exist"""
+    return not update_wishlist(user_id, add=[place_id]).missing
+
+def remove_from_wishlist(user_id: str, place_id: int):
+    """Remove place from user's wishlist; False if it was not saved"""
+    return bool(update_wishlist(user_id, remove=[place_id]).removed)
+
+def wishlisted_places(db: Session, user_id: str, place_ids):
+    """The subset of ``place_ids`` in the user's wishlist, from one index lookup"""
+    if not place_ids:
+        return []
+    rows = db.query(models.Wishlist.place_id).filter(
+        models.Wishlist.user_id == user_id,
+        models.Wishlist.place_id.in_(place_ids)
+    )
+    return sorted(pid for (pid,) in rows)
+
+def get_wishlist_item(db: Session, user_id: str, place_id: int):
+    """The wishlist row for a saved place, or None"""
+    return db.query(models.Wishlist).filter(
         models.Wishlist.user_id == user_id,
         models.Wishlist.place_id == place_id
     ).first()
-    
-    if wishlist_item:
-        db.delete(wishlist_item)
-        db.commit()
-        return True
-    return False
+
+DEFAULT_PLACE_IMAGE = 'https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=800'
 
 def get_user_wishlist(db: Session, user_id: str):
-    """Get all places in user's wishlist with place details"""
-    return db.query(models.Wishlist, models.Place).join(
-        models.Place, models.Wishlist.place_id == models.Place.id
-    ).filter(models.Wishlist.user_id == user_id).all()
+    """
+    The user's saved places, oldest save first, as plain dicts. One indexed
+    join over the materialized place columns; fallbacks are applied in SQL.
+    """
+    W, P = models.Wishlist, models.Place
+    rows = db.execute(
+        select(
+            P.id,
+            P.name,
+            func.coalesce(P.location, 'Nepal').label('location'),
+            func.coalesce(P.description, 'Explore the beautiful ' + P.name + ' and discover its unique charm.')
+                .label('description'),
+            func.coalesce(P.image_url, DEFAULT_PLACE_IMAGE).label('image'),
+            P.category,
+            P.rating,
+            P.reviews,
+            P.duration,
+            P.difficulty,
+            P.price,
+            func.coalesce(P.tags, '').label('tags'),
+            func.replace(W.created_at, ' ', 'T').label('added_at'),
+        )
+        .join(P, W.place_id == P.id)
+        .where(W.user_id == user_id)
+        .order_by(W.created_at, W.id)
+    )
+    return [dict(row._mapping) for row in rows]
 
 def is_in_wishlist(db: Session, user_id: str, place_id: int):
     """Check if place is in user's wishlist"""
-    return db.query(models.Wishlist).filter(
-        models.Wishlist.user_id == user_id,
-        models.Wishlist.place_id == place_id
-    ).first() is not None
+    return get_wishlist_item(db, user_id, place_id) is not None
 
 
 # ------------------ NEWSLETTER CRUD ------------------
 
-def subscribe_to_newsletter(db: Session, email: str, preferences: str = "general"):
-    """Subscribe email to newsletter"""
+def _subscribe(db: Session, email: str, preferences: str):
     # Check if already subscribed
     existing = db.query(models.Newsletter).filter(models.Newsletter.email == email).first()
     
@@ -109,8 +195,7 @@ def subscribe_to_newsletter(db: Session, email: str, preferences: str = "general
             # Reactivate subscription
             existing.is_active = 1
             existing.preferences = preferences
-            db.commit()
-            db.refresh(existing)
+            db.flush()
             return existing
         else:
             return existing  # Already subscribed
@@ -118,19 +203,22 @@ def subscribe_to_newsletter(db: Session, email: str, preferences: str = "general
     # Create new subscription
     newsletter_sub = models.Newsletter(email=email, preferences=preferences)
     db.add(newsletter_sub)
-    db.commit()
-    db.refresh(newsletter_sub)
+    db.flush()
     return newsletter_sub
 
-def unsubscribe_from_newsletter(db: Session, email: str):
+def subscribe_to_newsletter(email: str, preferences: str = "general"):
+    """Subscribe email to newsletter"""
+    return writer.run(_subscribe, email, preferences)
+
+def _unsubscribe(db: Session, email: str):
+    updated = db.query(models.Newsletter).filter(
+        models.Newsletter.email == email
+    ).update({models.Newsletter.is_active: 0}, synchronize_session=False)
+    return updated > 0
+
+def unsubscribe_from_newsletter(email: str):
     """Unsubscribe email from newsletter"""
-    subscriber = db.query(models.Newsletter).filter(models.Newsletter.email == email).first()
-    
-    if subscriber:
-        subscriber.is_active = 0
-        db.commit()
-        return True
-    return False
+    return writer.run(_unsubscribe, email)
 
 def get_newsletter_subscribers(db: Session, active_only: bool = True):
     """Get all newsletter subscribers"""
@@ -1,19 +1,77 @@
-from sqlalchemy import create_engine
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# -----------------------------
+# Configuration
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+# Absolute by default, so the database no longer depends on the working directory
+DATABASE_URL = os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.join(BASE_DIR, 'tourism.db')}"
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# SQLite connection tuning, applied to every pooled connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",           # readers no longer block behind a writer
+    "synchronous": "NORMAL",         # safe with WAL, far fewer fsyncs
+    "busy_timeout": int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,        # negative = KiB, i.e. 64 MB per connection
+}
 
 # -----------------------------
 # SQLAlchemy setup
 # -----------------------------
-engine = create_engine("sqlite:///./tourism.db", connect_args={"check_same_thread": False})
+def _engine_options(url):
+    options = {"pool_size": POOL_SIZE, "max_overflow": MAX_OVERFLOW, "pool_timeout": POOL_TIMEOUT}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(pool_pre_ping=True, pool_recycle=1800)
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+# INSERT with ON CONFLICT ... DO NOTHING/DO UPDATE and RETURNING, from the
+# configured backend's dialect; SQLite and PostgreSQL both support them
+if engine.dialect.name == "postgresql":
+    from sqlalchemy.dialects.postgresql import insert
+else:
+    from sqlalchemy.dialects.sqlite import insert
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # -----------------------------
-# Flask-SQLAlchemy setup
+# Request-scoped sessions
 # -----------------------------
-db = SQLAlchemy()
+# One session per request thread, closed by remove_session() when the app
+# context tears down. Background jobs and scripts keep using SessionLocal().
+db_session = scoped_session(SessionLocal)
+
+def get_session():
+    """The current request's session; no need to close it"""
+    return db_session()
+
+def remove_session(exception=None):
+    """Teardown hook: roll back anything uncommitted and return the connection to the pool"""
+    db_session.remove()
 
 def init_db():
     """Initialize database with all models"""
@@ -22,5 +80,16 @@ def init_db():
     
     # Create all tables for SQLAlchemy models
     Base.metadata.create_all(bind=engine)
+
+    # Full-text search index over places/hotels/restaurants/attractions.
+    # Created before the migrations: SQLite 3.40 fails to reload the schema
+    # ("no such table") when a table's other AFTER INSERT triggers are stored
+    # ahead of its FTS5 sync trigger
+    from .search_index import init_search_index
+    init_search_index(engine)
+
+    # Versioned schema changes (indexes, data fixes) for existing databases
+    from .migrations import run_migrations
+    run_migrations(engine)
     
     print("✅ Database initialized successfully")
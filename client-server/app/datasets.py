@@ -0,0 +1,49 @@
+"""
+Readers for the CSV files shipped under ``datasets/``.
+"""
+
+import csv
+import os
+
+from .database import BASE_DIR
+
+DATASETS_DIR = os.path.join(BASE_DIR, "datasets")
+
+ATTRACTIONS_CSV = "attraction.csv"
+HOTELS_CSV = "hotel.csv"
+RESTAURANTS_CSV = "restaurants.csv"
+
+# The CSVs store provinces by number
+PROVINCE_NAMES = {
+    "1": "Koshi",
+    "2": "Madhesh",
+    "3": "Bagmati",
+    "4": "Gandaki",
+    "5": "Lumbini",
+    "6": "Karnali",
+    "7": "Sudurpashchim",
+}
+
+
+def province_name(code):
+    """Province name for a CSV province number (None if unknown)"""
+    return PROVINCE_NAMES.get(str(code).strip())
+
+
+def read_rows(filename, datasets_dir=DATASETS_DIR):
+    """
+    Yield the rows of a dataset CSV as dicts with stripped values.
+
+    Blank rows and header lines repeated inside the file (hotel.csv has a few)
+    are skipped.
+    """
+    path = os.path.join(datasets_dir, filename)
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            if not any(row.values()):
+                continue
+            if all(value == name for name, value in row.items()):
+                continue
+            yield row
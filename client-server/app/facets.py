@@ -0,0 +1,271 @@
+"""
+Facet filters and counts over the search catalog, answered from bitsets.
+
+Every catalog row (places, hotels, restaurants and attractions, identified by
+their search-index rowid) gets a position 0..N-1. For each value of each facet
+the index keeps a bitset of the positions that have it, packed 64 rows to a
+``uint64`` word:
+
+* a filter is the OR of the selected values' bitsets, and several facets are
+  ANDed together;
+* the count for a value is popcount(value bitset & current filter). Counts are
+  disjunctive: a facet's own selection is left out of its counts, so picking
+  "Kaski" still shows how many results "Chitwan" would give.
+
+A request touches (values x N / 64) words in a handful of vectorized NumPy
+operations, well under a millisecond for tens of thousands of rows, instead
+of a GROUP BY per facet.
+
+Facet values come from the CSV columns, normalised where the data is free
+text (difficulty "Easy–Moderate" is both easy and moderate, accessibility
+"Road + Trek" is both road and trek, district "Baitadi / Darchula" is both
+districts) and mapped to names where it is a code (province "3" is Bagmati,
+in every table). Hotels take the districts of the
+attractions they are listed near; places take province and accessibility from
+their matched attraction.
+"""
+
+import re
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import text
+
+from .database import SessionLocal
+from .datasets import PROVINCE_NAMES, province_name
+from .ingest import price_band
+from .search_index import ENTITY_KINDS, KIND_COUNT
+from .shared_index import SharedIndex
+
+# Facet -> label, in the order they are returned
+FACETS = {
+    "type": "Type",
+    "province": "Province",
+    "district": "District",
+    "category": "Category",
+    "difficulty": "Difficulty",
+    "accessibility": "Accessibility",
+    "price_band": "Price band",
+}
+
+_DIFFICULTY_WORDS = (
+    ("easy", "easy"),
+    ("moderate", "moderate"), ("medium", "moderate"),
+    ("hard", "hard"), ("challenging", "hard"), ("difficult", "hard"), ("high", "hard"),
+)
+_ACCESS_WORDS = (
+    ("road", "road"), ("motor", "road"), ("drive", "road"), ("bus", "road"), ("jeep", "road"),
+    ("trek", "trek"), ("trail", "trek"), ("hike", "trek"), ("walk", "trek"),
+    ("flight", "flight"), ("fly", "flight"), ("air", "flight"),
+    ("boat", "boat"), ("cable car", "cable car"),
+)
+
+# "Bara / India Border", "Kailali/Rupandehi", "Panchthar–Taplejung"
+_DISTRICT_SEPARATORS = re.compile(r"\s*(?:/|,|–|&)\s*")
+_DISTRICT_NOTES = re.compile(r"\([^)]*\)|\b(?:border|area|region|district)\b", re.IGNORECASE)
+_DISTRICT_ALIASES = {"kavre": "Kavrepalanchok", "tehrathum": "Terhathum"}
+_NOT_DISTRICTS = {"india"}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def pack(bits):
+    """Bool array (rows along the last axis) -> uint64 words, zero padded"""
+    packed = np.packbits(bits, axis=-1)
+    padding = -packed.shape[-1] % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(packed.shape[:-1] + (padding,), np.uint8)], axis=-1)
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def popcount(words):
+    """Set bits per row of packed words (summed over the last axis)"""
+    if hasattr(np, "bitwise_count"):  # NumPy 2
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def _words_to_values(value, table):
+    value = (value or "").lower()
+    return {label for word, label in table if word in value}
+
+
+def difficulty_values(value):
+    """"Easy–Moderate" -> {"easy", "moderate"}"""
+    return _words_to_values(value, _DIFFICULTY_WORDS)
+
+
+def accessibility_values(value):
+    """"Road + Short Hike" -> {"road", "trek"}"""
+    return _words_to_values(value, _ACCESS_WORDS)
+
+
+def province_values(value):
+    """"3" -> {"Bagmati"}; names are kept ("bagmati province" -> {"Bagmati"})"""
+    name = province_name(value) if value is not None else None
+    if name is None:
+        value = (value or "").lower()
+        name = next((n for n in PROVINCE_NAMES.values() if n.lower() in value), None)
+    return {name} if name else set()
+
+
+def district_values(value):
+    """"Baitadi / Darchula" -> {"Baitadi", "Darchula"}; "Mustang (Upper Mustang)" -> {"Mustang"}"""
+    districts = set()
+    for part in _DISTRICT_SEPARATORS.split(_DISTRICT_NOTES.sub(" ", value or "")):
+        part = " ".join(part.split())
+        if part and part.lower() not in _NOT_DISTRICTS:
+            districts.add(_DISTRICT_ALIASES.get(part.lower(), part[0].upper() + part[1:]))
+    return districts
+
+
+# ------------------ CATALOG ------------------
+
+def load_records():
+    """Search-index rowid -> [(facet, value)] for every catalog row"""
+    rows = defaultdict(list)
+
+    def add(rowid, facet, values):
+        for value in values:
+            if value not in (None, ""):
+                rows[rowid].append((facet, str(value)))
+
+    def rowid(label, row_id):
+        return row_id * KIND_COUNT + ENTITY_KINDS[label][1]
+
+    db = SessionLocal()
+    try:
+        for label, (table, _) in ENTITY_KINDS.items():
+            for (row_id,) in db.execute(text(f"SELECT id FROM {table}")):
+                add(rowid(label, row_id), "type", [label])
+
+        for row in db.execute(text(
+            "SELECT id, province, district, category, difficulty, accessibility FROM attractions"
+        )):
+            r = rowid("Attraction", row.id)
+            add(r, "province", province_values(row.province))
+            add(r, "district", district_values(row.district))
+            add(r, "category", [row.category])
+            add(r, "difficulty", difficulty_values(row.difficulty))
+            add(r, "accessibility", accessibility_values(row.accessibility))
+
+        for row in db.execute(text(
+            "SELECT p.id, p.district, p.category, p.difficulty, p.price, a.province, a.accessibility "
+            "FROM places p LEFT JOIN attractions a ON a.id = p.attraction_id"
+        )):
+            r = rowid("Place", row.id)
+            add(r, "province", province_values(row.province))
+            add(r, "district", district_values(row.district))
+            add(r, "category", [row.category])
+            add(r, "difficulty", difficulty_values(row.difficulty))
+            add(r, "accessibility", accessibility_values(row.accessibility))
+            add(r, "price_band", [price_band(row.price)])
+
+        for row in db.execute(text("SELECT id, province, price_band FROM hotels")):
+            r = rowid("Hotel", row.id)
+            add(r, "province", province_values(row.province))
+            add(r, "price_band", [row.price_band])
+        for row in db.execute(text(
+            "SELECT DISTINCT hd.hotel_id, a.district FROM hotel_destinations hd "
+            "JOIN attractions a ON a.destination_id = hd.destination_id"
+        )):
+            add(rowid("Hotel", row.hotel_id), "district", district_values(row.district))
+
+        for row in db.execute(text("SELECT id, province, price_range FROM restaurants")):
+            r = rowid("Restaurant", row.id)
+            add(r, "province", province_values(row.province))
+            add(r, "price_band", [row.price_range])
+    finally:
+        db.close()
+    return rows
+
+
+class FacetIndex:
+    """Packed per-value bitsets over the catalog rows"""
+
+    def __init__(self, rows=None):
+        rows = rows or {}
+        self.rowids = np.array(sorted(rows), dtype=np.int64)
+        self.size = len(self.rowids)
+        position = {r: i for i, r in enumerate(self.rowids.tolist())}
+
+        members = {facet: defaultdict(list) for facet in FACETS}
+        for r, pairs in rows.items():
+            for facet, value in pairs:
+                members[facet][value].append(position[r])
+
+        # facet -> (values sorted, packed bitsets with one row per value)
+        self.facets = {}
+        self._lookup = {}  # facet -> lower-cased value -> row in the bitsets
+        for facet, by_value in members.items():
+            values = sorted(by_value, key=str.lower)
+            bits = np.zeros((len(values), self.size), dtype=bool)
+            for i, value in enumerate(values):
+                bits[i, by_value[value]] = True
+            self.facets[facet] = (values, pack(bits))
+            self._lookup[facet] = {value.lower(): i for i, value in enumerate(values)}
+
+        self._all = pack(np.ones(self.size, dtype=bool))
+
+    def __len__(self):
+        return self.size
+
+    # ------------------ MASKS ------------------
+
+    def mask_for_rowids(self, rowids):
+        """Packed bitset of the catalog rows among ``rowids``"""
+        return pack(np.isin(self.rowids, np.asarray(rowids, dtype=np.int64)))
+
+    def selection_masks(self, selected):
+        """
+        facet -> packed bitset for ``selected`` ({facet: [values]}); values
+        match case-insensitively and unknown values match nothing.
+        """
+        masks = {}
+        for facet, values in selected.items():
+            bits = self.facets[facet][1]
+            rows = [self._lookup[facet][v.lower()] for v in values if v.lower() in self._lookup[facet]]
+            if rows:
+                masks[facet] = np.bitwise_or.reduce(bits[rows], axis=0)
+            else:
+                masks[facet] = np.zeros_like(self._all)
+        return masks
+
+    # ------------------ QUERYING ------------------
+
+    def query(self, selected, base=None):
+        """
+        Apply facet selections on top of ``base`` (a packed bitset, e.g. the
+        text matches; default every row). Returns (packed filter, counts)
+        where counts is {facet: [(value, count)]} with zero counts left out.
+        """
+        base = self._all if base is None else base
+        masks = self.selection_masks(selected)
+
+        combined = base
+        for mask in masks.values():
+            combined = combined & mask
+
+        counts = {}
+        for facet, (values, bits) in self.facets.items():
+            if facet in masks:
+                # Disjunctive: count as if this facet were not selected
+                others = base
+                for other, mask in masks.items():
+                    if other != facet:
+                        others = others & mask
+            else:
+                others = combined
+            totals = popcount(bits & others)
+            counts[facet] = [(values[i], int(totals[i])) for i in np.flatnonzero(totals)]
+        return combined, counts
+
+    def rowids_in(self, mask):
+        """Catalog rowids set in a packed bitset, ascending"""
+        return self.rowids[np.flatnonzero(np.unpackbits(mask.view(np.uint8), count=self.size))]
+
+    def count(self, mask):
+        return int(popcount(mask))
+
+
+facet_index = SharedIndex(lambda: FacetIndex(load_records()), "facet index")
@@ -0,0 +1,117 @@
+"""
+In-memory spatial index over attraction coordinates.
+
+Coordinates are mapped to points on the unit sphere and stored in a KD-tree
+(scipy.spatial.cKDTree). Straight-line (chord) distance between those points
+grows monotonically with great-circle distance, so radius and k-nearest queries
+on the tree return exactly the right candidates; their haversine distances are
+then computed in one vectorized NumPy pass.
+"""
+
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .database import SessionLocal
+from . import models
+from .shared_index import SharedIndex
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vectors(lats, lons):
+    lat = np.radians(lats)
+    lon = np.radians(lons)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances in km from one point to arrays of points"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (np.sin((lats - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SpatialIndex:
+    """KD-tree over (id, name, district, lat, lon) records"""
+
+    def __init__(self, records=()):
+        records = list(records)
+        self.ids = np.array([r[0] for r in records], dtype=np.int64)
+        self.names = [r[1] for r in records]
+        self.districts = [r[2] or "" for r in records]
+        self.lats = np.array([r[3] for r in records], dtype=np.float64)
+        self.lons = np.array([r[4] for r in records], dtype=np.float64)
+        self._tree = cKDTree(_unit_vectors(self.lats, self.lons)) if records else None
+
+        self._by_name = {}
+        for i, name in enumerate(self.names):
+            self._by_name.setdefault(name.lower(), i)
+
+        # District -> centroid, for queries like "near Kaski"
+        self._districts = {}
+        for district in set(d.lower() for d in self.districts if d):
+            mask = np.array([d.lower() == district for d in self.districts])
+            self._districts[district] = (float(self.lats[mask].mean()), float(self.lons[mask].mean()))
+
+    def __len__(self):
+        return len(self.names)
+
+    def resolve(self, name):
+        """(lat, lon, index or None) for an attraction name or a district, else None"""
+        key = (name or "").strip().lower()
+        if key in self._by_name:
+            i = self._by_name[key]
+            return float(self.lats[i]), float(self.lons[i]), i
+        if key in self._districts:
+            lat, lon = self._districts[key]
+            return lat, lon, None
+        return None
+
+    def _results(self, lat, lon, candidates, exclude):
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        order = np.lexsort((self.ids[candidates], distances))  # nearest first, ties by id
+        return [
+            (int(self.ids[candidates[j]]), self.names[candidates[j]], self.districts[candidates[j]],
+             float(self.lats[candidates[j]]), float(self.lons[candidates[j]]), float(distances[j]))
+            for j in order
+        ]
+
+    def within(self, lat, lon, radius_km, limit=50, exclude=None):
+        """Attractions within ``radius_km`` of a point, nearest first"""
+        if self._tree is None:
+            return []
+        chord = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+        candidates = self._tree.query_ball_point(_unit_vectors([lat], [lon])[0], chord * (1 + 1e-9))
+        return self._results(lat, lon, candidates, exclude)[:limit]
+
+    def nearest(self, lat, lon, k=10, exclude=None):
+        """The ``k`` attractions nearest to a point"""
+        if self._tree is None:
+            return []
+        want = min(k + (exclude is not None), len(self))
+        _, candidates = self._tree.query(_unit_vectors([lat], [lon])[0], k=want)
+        return self._results(lat, lon, np.atleast_1d(candidates), exclude)[:k]
+
+
+def load_records():
+    """Attractions that have coordinates"""
+    db = SessionLocal()
+    try:
+        return db.query(
+            models.Attraction.id, models.Attraction.name, models.Attraction.district,
+            models.Attraction.latitude, models.Attraction.longitude
+        ).filter(
+            models.Attraction.latitude.isnot(None),
+            models.Attraction.longitude.isnot(None)
+        ).all()
+    finally:
+        db.close()
+
+
+spatial_index = SharedIndex(lambda: SpatialIndex(load_records()), "spatial index")
@@ -0,0 +1,86 @@
+"""
+Precomputed attraction -> nearby hotels index.
+
+hotel.csv lists every hotel under the attractions it is near ("Destination
+ID"), which ingest stores in ``hotel_destinations``. That table is read once
+into, for each attraction, one list per price band (low / mid / high, plus
+hotels without a price) already sorted by rating, best first.
+
+"Best hotels near X within budget" is then a merge of at most three sorted
+lists, cut at ``limit``; no text search or database access is involved.
+"""
+
+import heapq
+from collections import namedtuple
+from itertools import islice
+
+from .database import SessionLocal
+from . import models
+from .shared_index import SharedIndex
+
+# Cheapest first; a budget includes its own band and every cheaper one
+PRICE_BANDS = ("low", "mid", "high")
+
+HotelRecord = namedtuple("HotelRecord", "id name location rating price price_band")
+
+
+def _sort_key(hotel):
+    """Best rated first, unrated last, ties by id"""
+    return (hotel.rating is None, -(hotel.rating or 0.0), hotel.id)
+
+
+class DestinationHotels:
+    """attraction id -> price band -> hotels sorted by rating"""
+
+    def __init__(self, records=()):
+        self._hotels = {}
+        buckets = {}
+        for attraction_id, *hotel in records:
+            hotel = self._hotels.setdefault(hotel[0], HotelRecord(*hotel))
+            band = hotel.price_band if hotel.price_band in PRICE_BANDS else None
+            buckets.setdefault(attraction_id, {}).setdefault(band, []).append(hotel)
+        self._buckets = {
+            attraction_id: {band: sorted(hotels, key=_sort_key) for band, hotels in bands.items()}
+            for attraction_id, bands in buckets.items()
+        }
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def __contains__(self, attraction_id):
+        return attraction_id in self._buckets
+
+    def band_counts(self, attraction_id):
+        """Number of hotels near an attraction per price band"""
+        bands = self._buckets.get(attraction_id, {})
+        return {band or "unknown": len(hotels) for band, hotels in bands.items()}
+
+    def best(self, attraction_id, budget=None, limit=10):
+        """
+        The ``limit`` best rated hotels near an attraction whose price band is
+        ``budget`` or cheaper. Without a budget every hotel counts, including
+        those with no price.
+        """
+        bands = self._buckets.get(attraction_id)
+        if not bands:
+            return []
+        allowed = PRICE_BANDS[:PRICE_BANDS.index(budget) + 1] if budget else (*PRICE_BANDS, None)
+        lists = [bands[band] for band in allowed if band in bands]
+        if len(lists) == 1:
+            return lists[0][:limit]
+        return list(islice(heapq.merge(*lists, key=_sort_key), limit))
+
+
+def load_records():
+    """(attraction id, hotel id, name, location, rating, price, price band) for every link"""
+    H, HD, A = models.Hotel, models.HotelDestination, models.Attraction
+    db = SessionLocal()
+    try:
+        return db.query(
+            A.id, H.id, H.name, H.location, H.rating, H.price, H.price_band
+        ).join(HD, HD.hotel_id == H.id).join(A, A.destination_id == HD.destination_id).all()
+    finally:
+        db.close()
+
+
+destination_hotels = SharedIndex(lambda: DestinationHotels(load_records()), "destination hotels")
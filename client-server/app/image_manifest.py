@@ -0,0 +1,165 @@
+"""
+In-memory manifest of the place image folders.
+
+The image tree (one folder per place under ``datasets/project_imgfold/project_images``)
+is scanned once and kept as a name -> image paths dict, so lookups never touch
+the filesystem. Freshness is checked at most every ``check_interval`` seconds by
+comparing directory mtimes; only folders whose mtime changed are re-listed.
+The manifest is persisted to a small JSON file so a cold start only has to stat
+the folders instead of listing all of them.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .database import BASE_DIR
+
+# Image paths are handed out relative to the app directory (they double as URLs)
+IMAGE_PATH = "datasets/project_imgfold/project_images"
+BASE_IMAGE_DIR = os.path.join(BASE_DIR, IMAGE_PATH)
+MANIFEST_CACHE = os.path.join(BASE_DIR, "cache", "image_manifest.json")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+_FORMAT_VERSION = 1
+
+
+class ImageManifest:
+    """name -> list of image paths, refreshed by directory mtime"""
+
+    def __init__(self, root=BASE_IMAGE_DIR, cache_path=MANIFEST_CACHE, check_interval=30.0, path_prefix=IMAGE_PATH):
+        self.root = root
+        self.path_prefix = path_prefix
+        self.cache_path = cache_path
+        self.check_interval = check_interval
+
+        self._images = {}         # folder name -> [relative image paths]
+        self._folder_mtimes = {}  # folder name -> st_mtime_ns
+        self._root_mtime = None
+        self._next_check = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    # ------------------ LOOKUP ------------------
+
+    def get(self, name):
+        """Return the images for a place folder (empty list if there is none)"""
+        if not self._loaded or time.monotonic() >= self._next_check:
+            self.refresh()
+        return list(self._images.get(name, ()))
+
+    def __contains__(self, name):
+        return name in self._images
+
+    def __len__(self):
+        return len(self._images)
+
+    # ------------------ SCANNING ------------------
+
+    def _list_folder(self, name):
+        folder = os.path.join(self.root, name)
+        files = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    files.append(entry.name)
+        files.sort()
+        return [f"{self.path_prefix}/{name}/{f}".replace("\\", "/") for f in files]
+
+    def refresh(self, force=False):
+        """Bring the manifest up to date, re-listing only folders whose mtime changed"""
+        with self._lock:
+            if not self._loaded:
+                self._load_cache()
+                self._loaded = True
+            elif not force and time.monotonic() < self._next_check:
+                return  # another thread refreshed while we waited
+
+            changed = self._sync(force)
+            self._next_check = time.monotonic() + self.check_interval
+
+        if changed:
+            self._save_cache()
+
+    def _sync(self, force):
+        try:
+            root_mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            changed = bool(self._images)
+            self._images, self._folder_mtimes, self._root_mtime = {}, {}, None
+            return changed
+
+        # The root mtime only changes when folders are added, removed or renamed
+        if force or root_mtime != self._root_mtime:
+            with os.scandir(self.root) as entries:
+                names = [e.name for e in entries if e.is_dir()]
+        else:
+            names = list(self._folder_mtimes)
+
+        images = {}
+        mtimes = {}
+        changed = force or root_mtime != self._root_mtime
+        for name in names:
+            try:
+                mtime = os.stat(os.path.join(self.root, name)).st_mtime_ns
+            except FileNotFoundError:
+                changed = True
+                continue
+
+            if not force and self._folder_mtimes.get(name) == mtime:
+                images[name] = self._images[name]
+            else:
+                images[name] = self._list_folder(name)
+                changed = True
+            mtimes[name] = mtime
+
+        # Swap in whole dicts so concurrent readers never see a half-built map
+        self._images, self._folder_mtimes, self._root_mtime = images, mtimes, root_mtime
+        return changed
+
+    # ------------------ PERSISTENCE ------------------
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != _FORMAT_VERSION or data.get("root") != self.root:
+            return
+
+        self._root_mtime = data["root_mtime"]
+        self._folder_mtimes = {name: entry[0] for name, entry in data["folders"].items()}
+        self._images = {
+            name: [f"{self.path_prefix}/{name}/{f}" for f in entry[1]]
+            for name, entry in data["folders"].items()
+        }
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = {
+                "version": _FORMAT_VERSION,
+                "root": self.root,
+                "root_mtime": self._root_mtime,
+                "folders": {
+                    name: [mtime, [path.rsplit("/", 1)[-1] for path in self._images[name]]]
+                    for name, mtime in self._folder_mtimes.items()
+                },
+            }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not persist image manifest: {e}")
+
+
+# Shared instance used by the routes
+image_manifest = ImageManifest()
@@ -0,0 +1,458 @@
+"""
+Bulk, idempotent loaders that copy the dataset CSVs into the database.
+
+Each CSV is streamed in chunks of ``BATCH_SIZE`` rows. Every chunk is written
+with a single ``INSERT ... ON CONFLICT DO UPDATE`` executemany in its own short
+transaction, so a reload never holds the write lock for long and can run
+against a live database. Rows are upserted on their natural key:
+
+* attraction.csv   -> attractions, by Destination ID
+* hotel.csv        -> hotels, by (name, location), plus hotel_destinations links
+* restaurants.csv  -> restaurants, by (name, location)
+* data.csv         -> hotels / restaurants / attractions, by (name, location)
+
+Conflicting rows are only rewritten when a value actually changed, so running
+the loaders twice leaves the second run with nothing to write. Finally the
+derived attributes of places (rating, difficulty, price, ...) are recomputed
+from the loaded tables.
+
+Run ``python load_data.py`` to (re)load everything.
+"""
+
+import re
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+
+from sqlalchemy import bindparam, or_, select, text, update
+
+from . import models
+from .database import engine as default_engine, insert
+from .datasets import (
+    DATASETS_DIR, ATTRACTIONS_CSV, HOTELS_CSV, RESTAURANTS_CSV, PROVINCE_NAMES, read_rows,
+)
+from .seasons import parse_season, season_index
+from .writer import writer
+
+DATA_CSV = "data.csv"
+BATCH_SIZE = 1000
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+# ------------------ VALUE PARSING ------------------
+
+def parse_coordinate(value):
+    """
+    Parse a latitude/longitude cell such as ``27.71``, ``27.7107° N``, ``~29.02``
+    or ``(approx) 28.99–29.02`` (ranges give their midpoint). None if there is no number.
+    """
+    numbers = [float(n) for n in _NUMBER_RE.findall(value or "")]
+    if not numbers:
+        return None
+    coordinate = sum(numbers[:2]) / len(numbers[:2])
+    cell = value.strip().upper()
+    if cell.startswith("-") or cell.endswith(("S", "W")):
+        coordinate = -coordinate
+    return coordinate
+
+
+def parse_rating(value):
+    """Float rating, or None for blanks and stray header text"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_province(value):
+    """Province number 1-7, or None"""
+    return int(value) if value in PROVINCE_NAMES else None
+
+
+def price_band(value):
+    """Normalise hotel.csv prices ("Low (~$10–20)", "Mid: $25–$45", "High (~$90+)") to low / mid / high"""
+    value = (value or "").strip().lower()
+    if value.startswith("low"):
+        return "low"
+    if value.startswith(("mid", "medium")):
+        return "mid"
+    if value.startswith("high"):
+        return "high"
+    return None
+
+
+# ------------------ ROW MAPPING ------------------
+
+def attraction_values(row):
+    return {
+        "destination_id": int(row["Destination ID"]),
+        "name": row["Destination Name"],
+        "location": row["District"],
+        "district": row["District"],
+        "tags": row["Tags"],
+        "description": f"{row['Main Category']}. Activities: {row['Activities']}",
+        "latitude": parse_coordinate(row["Latitude"]),
+        "longitude": parse_coordinate(row["Longitude"]),
+        "best_season": row["Best Season"],
+        "season_mask": parse_season(row["Best Season"]),
+        "category": row["Main Category"] or None,
+        "activities": row["Activities"] or None,
+        "difficulty": row["Difficulty Level"] or None,
+        "accessibility": row["Accessibility"] or None,
+        "province": parse_province(row["Province"]),
+    }
+
+
+def hotel_values(row):
+    return {
+        "name": row["Hotel Name"],
+        "location": row["Location"],
+        "description": row["Review (short)"],
+        "rating": parse_rating(row["Rating (approx.)"]),
+        "price": row["Price"],
+        "price_band": price_band(row["Price"]),
+        "province": parse_province(row["Province"]),
+    }
+
+
+def restaurant_values(row):
+    if not row["Name"]:
+        return None
+    return {
+        "name": row["Name"],
+        "location": row["Location"],
+        "rating": parse_rating(row["Rating"]),
+        "price_range": row["Price Range"].lower() or None,
+        "province": parse_province(row["Province"]),
+    }
+
+
+def data_csv_values(row):
+    images = row["image_url"].split(",") if row["image_url"] else []
+    return {
+        "name": row["name"],
+        "location": row.get("location", ""),
+        "description": row.get("description", ""),
+        "tags": row.get("tags", ""),
+        "image_url": images[0] if images else None,
+    }
+
+
+# ------------------ BULK UPSERT ------------------
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def first_per_key(rows, key):
+    """
+    Drop rows whose natural key was already seen. hotel.csv lists the same
+    hotel under several destinations; keeping the first one makes reloads
+    write nothing instead of flip-flopping between the variants.
+    """
+    seen = set()
+    for row in rows:
+        row_key = tuple(row[k] for k in key)
+        if row_key not in seen:
+            seen.add(row_key)
+            yield row
+
+
+def upsert_statement(table, columns, key, key_where=None):
+    """
+    INSERT ... ON CONFLICT(key) DO UPDATE of ``columns``, skipping rows whose
+    values are unchanged. Columns not being loaded (e.g. image_url) are kept.
+    """
+    stmt = insert(table)
+    updates = [table.c[name] for name in columns if name not in key]
+    return stmt.on_conflict_do_update(
+        index_elements=list(key),
+        index_where=key_where,
+        set_={c.name: stmt.excluded[c.name] for c in updates},
+        where=or_(*(c.is_distinct_from(stmt.excluded[c.name]) for c in updates)),
+    )
+
+
+def bulk_upsert(engine, model, rows, key, key_where=None, batch_size=BATCH_SIZE):
+    """
+    Stream ``rows`` (dicts with the same keys) into ``model``'s table, one
+    executemany per batch and one transaction per batch. The first row for
+    each natural key wins.
+
+    Returns ``(rows read, rows inserted or changed)``.
+    """
+    table = model.__table__
+    stmt = None
+    read = written = 0
+    for batch in chunked(first_per_key(rows, key), batch_size):
+        if stmt is None:
+            stmt = upsert_statement(table, list(batch[0]), key, key_where)
+        with engine.begin() as conn:
+            result = conn.execute(stmt, batch)
+        read += len(batch)
+        written += max(result.rowcount, 0)
+    return read, written
+
+
+# ------------------ LOADERS ------------------
+
+def _report(label, started, read, written):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"✅ {label}: {read} rows, {written} inserted/updated "
+          f"in {elapsed:.2f}s ({read / elapsed:,.0f} rows/sec)")
+    return read, written
+
+
+def load_attractions(engine=default_engine, datasets_dir=DATASETS_DIR, batch_size=BATCH_SIZE):
+    """Upsert attraction.csv into attractions, keyed by Destination ID"""
+    started = time.perf_counter()
+    rows = (attraction_values(row) for row in read_rows(ATTRACTIONS_CSV, datasets_dir))
+    return _report(ATTRACTIONS_CSV, started,
+                   *bulk_upsert(engine, models.Attraction, rows, ("destination_id",), batch_size=batch_size))
+
+
+def load_hotels(engine=default_engine, datasets_dir=DATASETS_DIR, batch_size=BATCH_SIZE):
+    """Upsert hotel.csv into hotels, keyed by (name, location), and link each to its destinations"""
+    started = time.perf_counter()
+    rows = (hotel_values(row) for row in read_rows(HOTELS_CSV, datasets_dir))
+    read, written = bulk_upsert(engine, models.Hotel, rows, ("name", "location"), batch_size=batch_size)
+    written += link_hotel_destinations(engine, datasets_dir, batch_size)
+    return _report(HOTELS_CSV, started, read, written)
+
+
+def link_hotel_destinations(engine=default_engine, datasets_dir=DATASETS_DIR, batch_size=BATCH_SIZE):
+    """
+    Fill hotel_destinations from every hotel.csv row (a hotel near several
+    attractions appears once per "Destination ID"). Returns the links added.
+    """
+    stmt = text(
+        "INSERT OR IGNORE INTO hotel_destinations (hotel_id, destination_id) "
+        "SELECT id, :destination_id FROM hotels WHERE name = :name AND location = :location"
+    )
+    rows = (
+        {"name": row["Hotel Name"], "location": row["Location"], "destination_id": int(row["Destination ID"])}
+        for row in read_rows(HOTELS_CSV, datasets_dir) if row["Destination ID"].isdigit()
+    )
+    written = 0
+    for batch in chunked(rows, batch_size):
+        with engine.begin() as conn:
+            written += max(conn.execute(stmt, batch).rowcount, 0)
+    return written
+
+
+def load_restaurants(engine=default_engine, datasets_dir=DATASETS_DIR, batch_size=BATCH_SIZE):
+    """Upsert restaurants.csv into restaurants, keyed by (name, location)"""
+    started = time.perf_counter()
+    rows = filter(None, (restaurant_values(row) for row in read_rows(RESTAURANTS_CSV, datasets_dir)))
+    return _report(RESTAURANTS_CSV, started,
+                   *bulk_upsert(engine, models.Restaurant, rows, ("name", "location"), batch_size=batch_size))
+
+
+def load_data_csv(engine=default_engine, datasets_dir=DATASETS_DIR, batch_size=BATCH_SIZE):
+    """Upsert the legacy data.csv (type,name,location,...) into the matching tables"""
+    targets = {
+        "hotel": (models.Hotel, None),
+        "restaurant": (models.Restaurant, None),
+        "attraction": (models.Attraction, models.Attraction.destination_id.is_(None)),
+    }
+    started = time.perf_counter()
+    read = written = 0
+    for kind, (model, key_where) in targets.items():
+        rows = (
+            data_csv_values(row) for row in read_rows(DATA_CSV, datasets_dir)
+            if row["type"].lower() == kind
+        )
+        counts = bulk_upsert(engine, model, rows, ("name", "location"), key_where, batch_size)
+        read += counts[0]
+        written += counts[1]
+    return _report(DATA_CSV, started, read, written)
+
+
+def load_all(engine=default_engine, datasets_dir=DATASETS_DIR, batch_size=BATCH_SIZE):
+    """
+    Load every dataset CSV; safe to re-run. The upserts need the unique
+    natural-key indexes, which init_db (migration 7) guarantees.
+    """
+    started = time.perf_counter()
+    read = written = 0
+    for loader in (load_data_csv, load_attractions, load_hotels, load_restaurants):
+        counts = loader(engine, datasets_dir, batch_size)
+        read += counts[0]
+        written += counts[1]
+    materialize_place_attributes(engine)
+    # Only reaches an index built in this process; a server running elsewhere keeps its copy until restarted
+    season_index.invalidate()
+    return _report("All datasets", started, read, written)
+
+
+# ------------------ DERIVED PLACE ATTRIBUTES ------------------
+#
+# Places (curated destinations such as "Everest Base Camp Trek") are not rows
+# of any CSV. Their rating, difficulty, price etc. are derived from the
+# datasets once, here, and stored on the places table:
+#
+# * a place is matched to the attractions sharing the rarest name words with
+#   it (same district counts too), e.g. "Gokyo Lakes Trek" -> "Gokyo Lakes";
+# * difficulty and category come from that attraction, duration from its
+#   accessibility ("Flight + Multi-day Trek" -> "Multi-day");
+# * rating is the mean of the hotels listed under it in hotel.csv plus the
+#   restaurants in its district, reviews is how many listings that covers, and
+#   price is the most common hotel price among them.
+#
+# Anything that cannot be derived is left NULL rather than made up.
+
+_WORD_RE = re.compile(r"[a-z]+")
+_GENERIC_WORDS = frozenset("trek trekking circuit tour tours safari trip nepal the of and".split())
+
+
+def name_words(name):
+    """Distinctive lower-case words of a name"""
+    return set(_WORD_RE.findall((name or "").lower())) - _GENERIC_WORDS
+
+
+def duration_for(accessibility):
+    access = (accessibility or "").lower()
+    if "multi-day" in access:
+        return "Multi-day"
+    if any(word in access for word in ("trek", "trail", "hike")):
+        return "Day hike"
+    if access:
+        return "Day trip"
+    return None
+
+
+class _AttractionCatalog:
+    """Attractions plus the hotels and restaurants around them, read once per run"""
+
+    def __init__(self, conn):
+        self.attractions = {}
+        self.by_word = defaultdict(list)
+        for row in conn.execute(text(
+            "SELECT id, name, district, destination_id, category, difficulty, accessibility "
+            "FROM attractions ORDER BY id"
+        )):
+            self.attractions[row.id] = row
+            for word in name_words(row.name):
+                self.by_word[word].append(row.id)
+
+        self.hotels = defaultdict(list)  # destination_id -> [(hotel id, rating, price)]
+        for row in conn.execute(text(
+            "SELECT hd.destination_id, h.id, h.rating, h.price FROM hotel_destinations hd "
+            "JOIN hotels h ON h.id = hd.hotel_id ORDER BY h.id"
+        )):
+            self.hotels[row.destination_id].append((row.id, row.rating, row.price))
+
+        self.restaurants = [
+            (row.location.lower(), row.rating) for row in conn.execute(text(
+                "SELECT location, rating FROM restaurants WHERE rating IS NOT NULL AND location IS NOT NULL"
+            ))
+        ]
+
+    def best_matches(self, name, location):
+        """Attractions tied for the best match with a place, lowest id first"""
+        # A shared word counts 1 / (number of attractions using it), so
+        # "Bandipur" decides a match and "Village" barely does
+        scores = defaultdict(float)
+        for word in name_words(name):
+            matches = self.by_word.get(word, ())
+            for attraction_id in matches:
+                scores[attraction_id] += 1 / len(matches)
+        if not scores:
+            return []
+        district = (location or "").split(",")[0].strip().lower()
+        for attraction_id in scores:
+            scores[attraction_id] += (self.attractions[attraction_id].district or "").lower() == district
+        best = max(scores.values())
+        return sorted(a for a, score in scores.items() if score >= best - 1e-9)
+
+    def attributes(self, place):
+        """Materialized column values for one place row"""
+        matches = [self.attractions[a] for a in self.best_matches(place.name, place.location)]
+        first = matches[0] if matches else None
+
+        hotels = {}
+        for attraction in matches:
+            for hotel_id, rating, price in self.hotels.get(attraction.destination_id, ()):
+                hotels[hotel_id] = (rating, price)
+        ratings = [rating for rating, _ in hotels.values() if rating is not None]
+        if first and first.district:
+            district = first.district.lower()
+            ratings += [rating for location, rating in self.restaurants if district in location]
+        prices = Counter(price for _, price in (hotels[h] for h in sorted(hotels)) if price)
+
+        return {
+            "attraction_id": first.id if first else None,
+            "district": first.district if first else None,
+            "category": place.type or (first.category if first else None),
+            "difficulty": first.difficulty if first else None,
+            "duration": duration_for(first.accessibility) if first else None,
+            "rating": round(sum(ratings) / len(ratings), 1) if ratings else None,
+            "reviews": len(ratings) or None,
+            "price": prices.most_common(1)[0][0] if prices else None,
+        }
+
+
+PLACE_ATTRIBUTES = ("attraction_id", "district", "category", "difficulty", "duration", "rating", "reviews", "price")
+
+
+def _place_attribute_rows(conn, place_ids=None):
+    """Derived attributes of ``place_ids`` (default: every place), as parameters for _write_place_attributes"""
+    table = models.Place.__table__
+    catalog = _AttractionCatalog(conn)
+    query = select(table.c.id, table.c.name, table.c.location, table.c.type)
+    if place_ids is not None:
+        query = query.where(table.c.id.in_(place_ids))
+    return [
+        {"place_id": place.id, **{f"new_{k}": v for k, v in catalog.attributes(place).items()}}
+        for place in conn.execute(query)
+    ]
+
+
+def _write_place_attributes(conn, rows):
+    """Store rows from _place_attribute_rows, skipping places whose values did not change"""
+    table = models.Place.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("place_id"))
+        .where(or_(*(table.c[name].is_distinct_from(bindparam(f"new_{name}")) for name in PLACE_ATTRIBUTES)))
+        .values({name: bindparam(f"new_{name}") for name in PLACE_ATTRIBUTES})
+    )
+    return max(conn.execute(stmt, rows).rowcount, 0)
+
+
+def materialize_place_attributes(engine=default_engine, place_ids=None):
+    """Recompute the derived columns of ``place_ids`` (default: every place); returns rows changed"""
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        rows = _place_attribute_rows(conn, place_ids)
+    if not rows:
+        return 0
+    with engine.begin() as conn:
+        written = _write_place_attributes(conn, rows)
+    _report("Place attributes", started, len(rows), written)
+    return written
+
+
+def update_place_attributes(place_ids):
+    """
+    materialize_place_attributes for places saved by the app: the values are
+    derived on a plain connection and written by the write coordinator, so
+    the write queues with the app's other writes instead of racing them.
+    """
+    with default_engine.connect() as conn:
+        rows = _place_attribute_rows(conn, place_ids)
+    if not rows:
+        return 0
+    return writer.run(_store_place_attributes, rows)
+
+
+def _store_place_attributes(db, rows):
+    return _write_place_attributes(db.connection(), rows)
+
@@ -0,0 +1,434 @@
+"""
+Durable outbound mail queue.
+
+Emails are not sent inside the request that triggers them. ``enqueue`` stores
+a row in ``outbound_emails`` (through the write coordinator, so it is
+committed before the caller answers) and wakes the workers; the request
+returns without waiting for the SMTP server.
+
+A pool of worker threads drains the table:
+
+* a worker claims a few due rows at a time with one ``UPDATE ... RETURNING``
+  that marks them ``sending`` and leases them for ``LEASE`` seconds, so several
+  workers (or processes) never send the same row, and rows held by a worker
+  that died are picked up again once the lease runs out;
+* every worker keeps its own SMTP connection open, connected, STARTTLS'd and
+  logged in once and reused for every message, with a NOOP check after it
+  has been idle and a reconnect when the server drops it;
+* a failed send is retried with exponential backoff and jitter, up to
+  ``MAX_ATTEMPTS``; permanent failures (5xx replies, refused recipients) are
+  marked ``failed`` straight away;
+* outcomes are recorded with retries, since a row left ``sending`` is sent
+  again once its lease runs out. Claimed rows a worker did not get to (on
+  ``stop()`` or a login failure) are handed back without using up an attempt.
+
+A rejected login is a configuration error, not a bad message: the workers
+stop, the rows stay pending and ``stats()`` reports it. The workers are not
+started at all while ``SENDER_EMAIL`` or ``SENDER_PASSWORD`` still hold the
+placeholders of the example ``.env``; emails are still queued and go out
+once the settings are filled in and the app restarted.
+
+Templates live in ``app/email_templates`` and are loaded and rendered once
+per distinct context (the HTML part only depends on the sender).
+
+Settings come from the environment: ``SMTP_SERVER``, ``SMTP_PORT``,
+``SENDER_EMAIL``, ``SENDER_PASSWORD`` (empty: no login), ``SMTP_STARTTLS``
+(default 1) and ``MAIL_WORKERS`` (default 2). Any local SMTP stand-in works
+for testing, e.g. ``python -m aiosmtpd -n -l localhost:8025`` with
+``SMTP_SERVER=localhost SMTP_PORT=8025 SMTP_STARTTLS=0
+SENDER_EMAIL=news@example.com SENDER_PASSWORD=``; ``python mail_queue.py
+--test 500`` then queues 500 welcome emails to example.com addresses, sends
+them and reports the throughput. tests/test_mailer.py runs the queue against
+a stub server.
+"""
+
+import os
+import random
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+from string import Template
+
+from sqlalchemy import func, select, update
+
+from .models import OutboundEmail
+from .writer import writer
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_templates")
+
+# Template name -> subject; the bodies are <name>.txt and <name>.html
+SUBJECTS = {
+    "welcome": "Welcome to Roamio Wanderly Newsletter! 🌄",
+}
+
+WORKERS = 2
+BATCH = 10          # rows a worker claims at a time
+LEASE = 300         # seconds before a claimed but unsent row is claimed again
+POLL = 5.0          # seconds between checks for due retries when not woken
+MAX_ATTEMPTS = 8
+BACKOFF = 30.0      # seconds before the first retry; doubled on every retry
+MAX_BACKOFF = 3600.0
+IDLE_CHECK = 30.0   # seconds idle after which a pooled connection is NOOP-checked
+RATE_WINDOW = 60.0  # seconds of sends behind the reported rate
+RECORD_RETRIES = 5  # attempts at storing send outcomes, RECORD_BACKOFF apart (doubled each time)
+RECORD_BACKOFF = 0.5
+
+# Values of the example .env, which cannot send anything
+PLACEHOLDER_SENDER = "your-email@gmail.com"
+PLACEHOLDER_PASSWORD = "your-app-password"
+
+SmtpSettings = namedtuple("SmtpSettings", "host port sender password starttls timeout")
+ClaimedEmail = namedtuple("ClaimedEmail", "id recipient template attempts")
+
+
+def smtp_settings():
+    """SMTP settings from the environment (read when the queue starts, after .env is loaded)"""
+    return SmtpSettings(
+        host=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        port=int(os.getenv("SMTP_PORT", "587")),
+        sender=os.getenv("SENDER_EMAIL", PLACEHOLDER_SENDER),
+        password=os.getenv("SENDER_PASSWORD", PLACEHOLDER_PASSWORD),
+        starttls=os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no"),
+        timeout=30.0,
+    )
+
+
+def is_configured(settings):
+    """False while the sender or password are still the example placeholders"""
+    return bool(settings.sender) and settings.sender != PLACEHOLDER_SENDER \
+        and settings.password != PLACEHOLDER_PASSWORD
+
+
+# ------------------ TEMPLATES ------------------
+
+@lru_cache(maxsize=None)
+def _load_template(name, part):
+    with open(os.path.join(TEMPLATES_DIR, f"{name}.{part}"), encoding="utf-8") as f:
+        return Template(f.read())
+
+
+@lru_cache(maxsize=1024)
+def render(name, part, **context):
+    """Render ``<name>.<part>`` with ``$placeholders`` filled from ``context``"""
+    return _load_template(name, part).substitute(context)
+
+
+def build_message(template, recipient, sender):
+    message = MIMEMultipart("alternative")
+    message["Subject"] = SUBJECTS[template]
+    message["From"] = f"Roamio Wanderly <{sender}>"
+    message["To"] = recipient
+    message.attach(MIMEText(render(template, "txt", email=recipient), "plain", "utf-8"))
+    message.attach(MIMEText(render(template, "html", sender_email=sender), "html", "utf-8"))
+    return message
+
+
+# ------------------ SMTP CONNECTIONS ------------------
+
+class SmtpConnection:
+    """One authenticated SMTP connection, opened on first use and kept open"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._smtp = None
+        self._last_used = 0.0
+        self.opened = 0
+
+    def _connect(self):
+        s = self.settings
+        smtp = smtplib.SMTP(s.host, s.port, timeout=s.timeout)
+        try:
+            if s.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+            if s.password:
+                smtp.login(s.sender, s.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.opened += 1
+        return smtp
+
+    def send(self, message):
+        if self._smtp is not None and time.monotonic() - self._last_used > IDLE_CHECK:
+            try:
+                self._smtp.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        # A pooled connection may have been dropped by the server; reconnect once
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(message)
+                break
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if attempt:
+                    raise
+        self._last_used = time.monotonic()
+
+    def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+
+def is_permanent_error(error):
+    """
+    True for failures a retry cannot fix (refused recipients, 5xx replies).
+    A rejected login is neither: the queue stops on it (MailQueue._work).
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+# ------------------ WRITE JOBS ------------------
+
+def _enqueue(db, recipient, template):
+    email = OutboundEmail(recipient=recipient, template=template)
+    db.add(email)
+    db.flush()
+    return email.id
+
+
+def _claim(db, limit, lease):
+    now = datetime.utcnow()
+    due = select(OutboundEmail.id).where(
+        OutboundEmail.status.in_(("pending", "sending")),
+        OutboundEmail.next_attempt_at <= now,
+    ).order_by(OutboundEmail.next_attempt_at).limit(limit)
+    rows = db.execute(
+        update(OutboundEmail)
+        .where(OutboundEmail.id.in_(due.scalar_subquery()))
+        .values(status="sending", attempts=OutboundEmail.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease))
+        .returning(OutboundEmail.id, OutboundEmail.recipient, OutboundEmail.template, OutboundEmail.attempts)
+    )
+    return [ClaimedEmail(*row) for row in rows]
+
+
+def _record(db, outcomes, released=()):
+    """Store send outcomes ([(id, values)]) and hand claimed but unsent rows back"""
+    for email_id, values in outcomes:
+        db.execute(update(OutboundEmail).where(OutboundEmail.id == email_id).values(**values))
+    if released:
+        db.execute(
+            update(OutboundEmail)
+            .where(OutboundEmail.id.in_(released), OutboundEmail.status == "sending")
+            .values(status="pending", attempts=OutboundEmail.attempts - 1, next_attempt_at=datetime.utcnow())
+        )
+
+
+def count_due(db):
+    """Rows waiting for a first or retried send that is due now, plus rows being sent"""
+    return db.execute(select(func.count()).select_from(OutboundEmail).where(
+        (OutboundEmail.status == "sending")
+        | ((OutboundEmail.status == "pending") & (OutboundEmail.next_attempt_at <= datetime.utcnow()))
+    )).scalar()
+
+
+# ------------------ QUEUE ------------------
+
+class MailQueue:
+    """Worker pool that sends the rows of ``outbound_emails``"""
+
+    def __init__(self, settings=None, workers=None, batch=BATCH, lease=LEASE, poll=POLL, writer=writer):
+        self.settings = settings
+        self.workers = workers
+        self.batch = batch
+        self.lease = lease
+        self.poll = poll
+        self.writer = writer
+
+        self._threads = []
+        self._connections = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.worker_errors = 0
+        self.config_error = None  # why sending stopped, e.g. a rejected login
+        self._recent = deque()  # monotonic times of sends within RATE_WINDOW
+
+    def enqueue(self, recipient, template="welcome"):
+        """Store an email for sending; returns its id once committed"""
+        email_id = self.writer.run(_enqueue, recipient, template)
+        self._wake.set()
+        return email_id
+
+    # ------------------ WORKERS ------------------
+
+    def start(self):
+        """
+        Start the workers, or restart them if they stopped (e.g. on a rejected
+        login); False, with nothing started, while SMTP is not configured.
+        """
+        with self._lock:
+            if any(thread.is_alive() for thread in self._threads):
+                return True
+            self._threads, self._connections = [], []
+            if self.settings is None:
+                self.settings = smtp_settings()
+            if not is_configured(self.settings):
+                print("⚠️ Mail queue not started: set SENDER_EMAIL and SENDER_PASSWORD to send queued emails")
+                return False
+            if self.workers is None:
+                self.workers = int(os.getenv("MAIL_WORKERS", WORKERS))
+            self._stop.clear()
+            self.config_error = None
+            for i in range(self.workers):
+                connection = SmtpConnection(self.settings)
+                thread = threading.Thread(target=self._work, args=(connection,), name=f"mail-worker-{i}", daemon=True)
+                self._connections.append(connection)
+                self._threads.append(thread)
+                thread.start()
+            return True
+
+    def stop(self, timeout=None):
+        """
+        Stop the workers after the message each is sending. Rows they had
+        claimed but not sent are handed back to the queue.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._connections = []
+        self._stop.set()
+        self._wake.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def _work(self, connection):
+        try:
+            while not self._stop.is_set() and self.config_error is None:
+                try:
+                    self._work_once(connection)
+                except Exception as e:
+                    # Keep the worker alive; whatever it had claimed is retried after the lease
+                    self.worker_errors += 1
+                    connection.close()
+                    print(f"⚠️ Mail queue worker error: {type(e).__name__}: {e}")
+                    self._stop.wait(self.poll)
+        finally:
+            connection.close()
+
+    def _work_once(self, connection):
+        """Claim a batch of due rows, send them and record the outcomes"""
+        try:
+            claimed = self.writer.run(_claim, self.batch, self.lease)
+        except Exception as e:
+            print(f"⚠️ Mail queue: could not claim emails: {e}")
+            claimed = []
+        if not claimed:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            return
+
+        outcomes = []
+        try:
+            for email in claimed:
+                if self._stop.is_set():
+                    break
+                outcomes.append((email.id, self._send(connection, email)))
+        except smtplib.SMTPAuthenticationError as e:
+            self.config_error = f"SMTP login rejected: {e}"[:500]
+            print(f"❌ Mail queue stopped, {self.config_error}")
+            self._wake.set()  # the other workers stop too
+        finally:
+            done = {email_id for email_id, _ in outcomes}
+            released = [email.id for email in claimed if email.id not in done]
+            if outcomes or released:
+                self._store(outcomes, released)
+
+    def _store(self, outcomes, released):
+        """
+        Record outcomes, retrying on failure: until they are stored the rows
+        stay ``sending`` and would be sent a second time after the lease.
+        """
+        for attempt in range(RECORD_RETRIES):
+            try:
+                self.writer.run(_record, outcomes, released)
+                return True
+            except Exception as e:
+                print(f"⚠️ Mail queue: could not record {len(outcomes)} send outcomes: {e}")
+                time.sleep(RECORD_BACKOFF * 2 ** attempt)
+        print(f"❌ Mail queue: gave up recording {len(outcomes)} send outcomes; they are sent again after the lease")
+        return False
+
+    def _send(self, connection, email):
+        """Send one claimed email; returns the column values recording the outcome"""
+        try:
+            connection.send(build_message(email.template, email.recipient, self.settings.sender))
+        except smtplib.SMTPAuthenticationError:
+            raise  # a configuration error, not this email's: see _work_once
+        except Exception as e:
+            if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                connection.close()  # state of the session is unknown
+            error = f"{type(e).__name__}: {e}"[:500]
+            if is_permanent_error(e) or email.attempts >= MAX_ATTEMPTS:
+                self.failed += 1
+                print(f"❌ Failed to send {email.template} email to {email.recipient}: {error}")
+                return {"status": "failed", "last_error": error}
+            self.retried += 1
+            delay = min(BACKOFF * 2 ** (email.attempts - 1), MAX_BACKOFF) * random.uniform(0.5, 1.5)
+            return {"status": "pending", "last_error": error,
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)}
+        self._count_sent()
+        return {"status": "sent", "sent_at": datetime.utcnow(), "last_error": None}
+
+    def _count_sent(self):
+        now = time.monotonic()
+        with self._lock:
+            self.sent += 1
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > RATE_WINDOW:
+                self._recent.popleft()
+
+    # ------------------ REPORTING ------------------
+
+    def stats(self, db=None):
+        """Counters for this process, plus the queue's rows by status when ``db`` is given"""
+        now = time.monotonic()
+        with self._lock:
+            recent = [t for t in self._recent if now - t <= RATE_WINDOW]
+            connections = sum(c.opened for c in self._connections)
+            alive = sum(thread.is_alive() for thread in self._threads)
+            dead = len(self._threads) - alive
+        if len(recent) > 1:
+            rate = len(recent) / max(now - recent[0], 1e-3)
+        else:
+            rate = 0.0
+        stats = {
+            "workers": alive,
+            "dead_workers": dead,
+            "worker_errors": self.worker_errors,
+            "config_error": self.config_error,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "sent_per_second": round(rate, 2),
+            "connections_opened": connections,
+        }
+        if db is not None:
+            stats["queue"] = dict(db.execute(
+                select(OutboundEmail.status, func.count()).group_by(OutboundEmail.status)
+            ).all())
+        return stats
+
+
+# Shared instance started by create_app
+mail_queue = MailQueue()
@@ -0,0 +1,87 @@
+"""
+Full-text search over chat messages.
+
+``message_search`` is an external-content FTS5 table over ``message.content``:
+it stores only the inverted index (the text stays in ``message``) and is kept
+in sync by triggers, so searching years of history is an index lookup rather
+than a ``LIKE`` over every message.
+"""
+
+from sqlalchemy import text
+
+from .search_index import build_match_query
+
+MESSAGE_FTS_TABLE = "message_search"
+
+
+# ------------------ SCHEMA ------------------
+
+def _create_statements():
+    fts = MESSAGE_FTS_TABLE
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            content,
+            content = 'message', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS message_search_ai AFTER INSERT ON message BEGIN
+            INSERT INTO {fts}(rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS message_search_ad AFTER DELETE ON message BEGIN
+            INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS message_search_au AFTER UPDATE OF content ON message BEGIN
+            INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO {fts}(rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+    ]
+
+
+def init_message_search(conn):
+    """Create the FTS table and sync triggers and index the existing messages"""
+    for statement in _create_statements():
+        conn.execute(text(statement))
+    conn.execute(text(f"INSERT INTO {MESSAGE_FTS_TABLE}({MESSAGE_FTS_TABLE}) VALUES ('rebuild')"))
+
+
+# ------------------ QUERYING ------------------
+
+def search_chats(db, user_id, q: str, limit):
+    """
+    A user's chats with messages matching ``q``, the most recent match first:
+    [(chat id, title, message id, snippet)], one row per chat.
+
+    Matches are read newest first straight from the FTS index (rowid order,
+    no sort) and the scan stops once ``limit`` chats have been found.
+    """
+    match = build_match_query(q)
+    if not match:
+        return []
+    rows = db.execute(text(f"""
+        SELECT c.id AS chat_id, c.title, m.id AS message_id,
+               snippet({MESSAGE_FTS_TABLE}, 0, '', '', '…', 12) AS snippet
+        FROM {MESSAGE_FTS_TABLE}
+        JOIN message m ON m.id = {MESSAGE_FTS_TABLE}.rowid
+        JOIN chat c ON c.id = m.chat_id
+        WHERE {MESSAGE_FTS_TABLE} MATCH :match AND c.user_id = :user_id
+        ORDER BY {MESSAGE_FTS_TABLE}.rowid DESC
+    """), {"match": match, "user_id": user_id})
+
+    results, seen = [], set()
+    for row in rows:
+        if row.chat_id not in seen:
+            seen.add(row.chat_id)
+            results.append(row)
+            if len(results) == limit:
+                break
+    rows.close()
+    return results
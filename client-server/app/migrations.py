@@ -0,0 +1,303 @@
+"""
+Versioned, forward-only schema migrations.
+
+The ``schema_migrations`` table records every step applied to a database, so
+its schema version is ``max(version)``. ``run_migrations`` (called from
+``init_db``) applies the steps above that version in order, each in its own
+transaction together with the row that records it: a failing step leaves the
+database at the previous version and is retried on the next start.
+
+Released steps are never edited or removed; to change the schema, append a
+new one. New columns are steps too (``_add_columns``), so ``schema_migrations``
+describes the whole schema. Steps are written to be harmless when re-run (``IF NOT EXISTS``,
+idempotent data fixes), so two processes starting at once cannot break them.
+Fresh databases already get the declared tables and indexes from
+``create_all``; for them the steps find nothing to do and are only recorded.
+
+``check_query_plans`` runs ``EXPLAIN QUERY PLAN`` over the queries behind
+the hot routes and reports any that fall back to a full table scan. Run
+``python migrate.py`` to migrate, and ``python migrate.py --check`` for both.
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text, tuple_
+
+from . import models
+from .message_search import init_message_search
+from .pagination import prefix_filter
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Tables whose size is kept in ROW_COUNTS_TABLE by triggers (see migration 5)
+ROW_COUNTS_TABLE = "row_counts"
+COUNTED_TABLES = ("hotels",)
+
+Migration = namedtuple("Migration", "version description apply")
+
+# Applied in order; append only
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register ``apply(conn)`` as schema version ``version``"""
+    def register(apply):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} must come after {MIGRATIONS[-1].version}")
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+    return register
+
+
+def _create_index(conn, model, name):
+    """
+    Create one of the indexes declared on ``model`` if it does not exist yet.
+    An index a later migration has since replaced (and removed from the
+    model) is skipped, so a fresh database never builds it just to drop it.
+    """
+    index = next((i for i in model.__table__.indexes if i.name == name), None)
+    if index is not None:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _add_columns(conn, model, names):
+    """Add the columns ``names`` declared on ``model`` that its table does not have yet"""
+    table = model.__table__
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    for name in names:
+        if name not in existing:
+            column_type = table.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{name}" {column_type}'))
+            print(f"✅ Added column {table.name}.{name}")
+
+
+# ------------------ MIGRATIONS ------------------
+
+@migration(0, "Catalog and booking columns added since the original schema")
+def _catalog_columns(conn):
+    # Until these were versioned, every start added them ahead of the
+    # migrations, so databases already at version 1 or later have them all.
+    # Step 0 brings unversioned ones (e.g. the original tourism.db) to the
+    # same point before the steps that index (4) and re-point (7) them.
+    _add_columns(conn, models.Hotel, ("rating", "price", "price_band", "province"))
+    _add_columns(conn, models.Restaurant, ("rating", "price_range", "province"))
+    _add_columns(conn, models.Attraction, (
+        "destination_id", "district", "latitude", "longitude", "best_season", "season_mask",
+        "category", "activities", "difficulty", "accessibility", "province",
+    ))
+    _add_columns(conn, models.Place, (
+        "attraction_id", "district", "category", "difficulty", "duration", "rating", "reviews", "price",
+    ))
+    # The original tourism.db predates most of the bookings model; place_name
+    # is NOT NULL without a default, which SQLite cannot add to a table
+    _add_columns(conn, models.Booking, (
+        "user_name", "user_email", "place_location", "booking_date", "travel_date",
+        "number_of_people", "total_price", "status", "special_requests",
+    ))
+
+
+@migration(1, "Unique (user_id, place_id) on wishlists")
+def _unique_wishlist_entries(conn):
+    # Double clicks used to save the same place twice; keep the first save
+    result = conn.execute(text(
+        "DELETE FROM wishlists WHERE id NOT IN "
+        "(SELECT min(id) FROM wishlists GROUP BY user_id, place_id)"
+    ))
+    if result.rowcount:
+        print(f"⚠️ Removed {result.rowcount} duplicate wishlist entries")
+    _create_index(conn, models.Wishlist, "ux_wishlists_user_place")
+
+
+@migration(2, "Index chats by user and messages by chat")
+def _chat_indexes(conn):
+    _create_index(conn, models.Chat, "ix_chat_user_id")
+    _create_index(conn, models.Message, "ix_message_chat_id")
+
+
+@migration(3, "Index the /details name lookups")
+def _name_indexes(conn):
+    # hotels and restaurants are covered by their (name, location) natural keys
+    _create_index(conn, models.Place, "ix_places_name")
+    _create_index(conn, models.Attraction, "ix_attractions_name")
+
+
+@migration(4, "Filter indexes for /api/places and /api/hotels")
+def _filter_indexes(conn):
+    for name in ("ix_hotels_location", "ix_hotels_province", "ix_hotels_rating"):
+        _create_index(conn, models.Hotel, name)
+    for name in ("ix_places_location", "ix_places_type"):
+        _create_index(conn, models.Place, name)
+
+
+@migration(5, "Trigger-maintained row counts")
+def _row_counts(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {ROW_COUNTS_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL
+        )
+    """))
+    for table in COUNTED_TABLES:
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN "
+            f"UPDATE {ROW_COUNTS_TABLE} SET row_count = row_count + 1 WHERE table_name = '{table}'; END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN "
+            f"UPDATE {ROW_COUNTS_TABLE} SET row_count = row_count - 1 WHERE table_name = '{table}'; END"
+        ))
+        # Seeded in the same transaction that adds the triggers, so no write is missed
+        conn.execute(text(
+            f"INSERT OR REPLACE INTO {ROW_COUNTS_TABLE} (table_name, row_count) "
+            f"SELECT '{table}', count(*) FROM {table}"
+        ))
+
+
+@migration(6, "Paged chat history and full-text search over messages")
+def _chat_history(conn):
+    _create_index(conn, models.Chat, "ix_chat_user_created")
+    _create_index(conn, models.Message, "ix_message_chat_id_id")
+    conn.execute(text("DROP INDEX IF EXISTS ix_chat_user_id"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_message_chat_id"))
+    init_message_search(conn)
+
+
+def _merge_duplicates(conn, table, key, where="1", references=()):
+    """
+    Keep the first row of each natural-key group of ``table``: rows in
+    ``references`` ([(table, column)]) that point at a duplicate are moved to
+    the kept row (or dropped when it already has the same link), then the
+    duplicates are deleted.
+    """
+    columns = ", ".join(key)
+    conn.execute(text(f"""
+        CREATE TEMP TABLE duplicate_rows AS
+        SELECT id, keep FROM (
+            SELECT id, min(id) OVER (PARTITION BY {columns}) AS keep FROM {table} WHERE {where}
+        ) WHERE id != keep
+    """))
+    for ref_table, column in references:
+        moved = conn.execute(text(
+            f"UPDATE OR IGNORE {ref_table} SET {column} = "
+            f"(SELECT keep FROM duplicate_rows WHERE id = {ref_table}.{column}) "
+            f"WHERE {column} IN (SELECT id FROM duplicate_rows)"
+        )).rowcount
+        dropped = conn.execute(text(
+            f"DELETE FROM {ref_table} WHERE {column} IN (SELECT id FROM duplicate_rows)"
+        )).rowcount
+        if moved or dropped:
+            print(f"⚠️ {ref_table}.{column}: {moved} rows moved to the kept {table} row, "
+                  f"{dropped} duplicate links dropped")
+    removed = conn.execute(text(f"DELETE FROM {table} WHERE id IN (SELECT id FROM duplicate_rows)")).rowcount
+    conn.execute(text("DROP TABLE duplicate_rows"))
+    if removed:
+        print(f"⚠️ Merged {removed} duplicate rows of {table}")
+
+
+@migration(7, "Unique natural keys on hotels, restaurants and attractions")
+def _natural_keys(conn):
+    # The old append-only loader left duplicates; the ingest upserts need the keys
+    _merge_duplicates(conn, "hotels", ("name", "location"),
+                      references=[("hotel_destinations", "hotel_id")])
+    _merge_duplicates(conn, "restaurants", ("name", "location"))
+    _merge_duplicates(conn, "attractions", ("destination_id",), "destination_id IS NOT NULL",
+                      references=[("places", "attraction_id")])
+    _merge_duplicates(conn, "attractions", ("name", "location"), "destination_id IS NULL",
+                      references=[("places", "attraction_id")])
+    _create_index(conn, models.Hotel, "ux_hotels_name_location")
+    _create_index(conn, models.Restaurant, "ux_restaurants_name_location")
+    _create_index(conn, models.Attraction, "ux_attractions_destination_id")
+    _create_index(conn, models.Attraction, "ux_attractions_name_location")
+
+
+# ------------------ RUNNER ------------------
+
+def _ensure_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """))
+
+
+def schema_version(engine):
+    """Highest migration applied to the database (-1 for none, as step 0 is pending)"""
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return conn.execute(text(f"SELECT coalesce(max(version), -1) FROM {MIGRATIONS_TABLE}")).scalar()
+
+
+def run_migrations(engine):
+    """Apply every pending migration in order; returns the resulting schema version"""
+    version = schema_version(engine)
+    applied = False
+    for step in MIGRATIONS:
+        if step.version <= version:
+            continue
+        applied = True
+        with engine.begin() as conn:
+            step.apply(conn)
+            conn.execute(
+                text(f"INSERT OR IGNORE INTO {MIGRATIONS_TABLE} (version, description, applied_at) "
+                     "VALUES (:version, :description, :applied_at)"),
+                {"version": step.version, "description": step.description,
+                 "applied_at": datetime.utcnow().isoformat(timespec="seconds")},
+            )
+        version = step.version
+        print(f"✅ Migration {step.version}: {step.description}")
+    if applied:
+        # Pooled connections keep the schema they read earlier, and SQLite
+        # prepares statements against it: an upsert on a key index created
+        # above would fail with "ON CONFLICT clause does not match"
+        engine.dispose()
+    return version
+
+
+# ------------------ QUERY PLAN CHECK ------------------
+
+def hot_queries():
+    """Route -> the statement it runs, with representative parameters"""
+    W, C, M = models.Wishlist, models.Chat, models.Message
+    H, P = models.Hotel, models.Place
+    queries = {
+        "POST/DELETE /api/wishlist/<user_id>/<place_id>[/check]": select(W.id).where(W.user_id == "u", W.place_id == 1),
+        "GET /api/wishlist/<user_id>/check?ids=": select(W.place_id).where(
+            W.user_id == "u", W.place_id.in_([1, 2, 3])),
+        "GET /api/wishlist/<user_id>": select(W, models.Place).join(
+            models.Place, W.place_id == models.Place.id).where(W.user_id == "u"),
+        "GET /api/hotels?province=": select(H.id, H.name).where(H.province == 3).order_by(H.id).limit(51),
+        "GET /api/hotels?location=": select(H.id, H.name).where(
+            prefix_filter(H.location, "Kath")).order_by(H.id).limit(51),
+        "GET /api/places?type=": select(P.id, P.name).where(P.type == "trekking").order_by(P.id.desc()).limit(51),
+        "GET /api/chat/history?user_id=": select(C.id, C.title, C.created_at).where(
+            C.user_id == "u", tuple_(C.created_at, C.id) < tuple_(datetime(2024, 1, 1), 9)
+        ).order_by(C.created_at.desc(), C.id.desc()).limit(51),
+        "GET /api/chat/messages?chat_id=": select(M.sender, M.content, M.id).where(
+            M.chat_id == 1, M.id < 100).order_by(M.id.desc()).limit(51),
+    }
+    for kind, model in (("place", models.Place), ("hotel", models.Hotel),
+                        ("restaurant", models.Restaurant), ("attraction", models.Attraction)):
+        queries[f"GET /api/details/{kind}/<name>"] = select(model).where(model.name == "x").limit(1)
+    return queries
+
+
+# "SCAN wishlists" is a full table scan; "SCAN x USING INDEX" and "SEARCH" are not
+_FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?\w+(?: AS \w+)?$")
+
+
+def check_query_plans(engine):
+    """
+    EXPLAIN QUERY PLAN every hot query. Returns [(route, uses_index, plan lines)];
+    ``uses_index`` is False when any step of the plan scans a whole table.
+    """
+    results = []
+    with engine.connect() as conn:
+        for route, statement in hot_queries().items():
+            compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+            results.append((route, not any(_FULL_SCAN_RE.match(step) for step in plan), plan))
+    return results
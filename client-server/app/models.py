@@ -1,12 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, Float, Index, text
 from datetime import datetime
-from .database import Base, db
+from .database import Base
 from sqlalchemy import ForeignKey, DateTime
 
 # ------------------ SQLAlchemy MODELS ------------------
 
 class Hotel(Base):
     __tablename__ = "hotels"
+    __table_args__ = (
+        # Natural key used by the CSV loaders to upsert
+        Index("ux_hotels_name_location", "name", "location", unique=True),
+        # /api/hotels filters
+        Index("ix_hotels_location", "location"),
+        Index("ix_hotels_province", "province"),
+        Index("ix_hotels_rating", "rating"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -14,10 +22,28 @@ class Hotel(Base):
     description = Column(Text)
     tags = Column(String)
     image_url = Column(String)
+    rating = Column(Float)
+    price = Column(String)       # as written in hotel.csv, e.g. "Medium (~$35–60)"
+    price_band = Column(String)  # low / mid / high
+    province = Column(Integer)
+
+
+class HotelDestination(Base):
+    """hotel.csv lists each hotel under the attractions it is near ("Destination ID")"""
+    __tablename__ = "hotel_destinations"
+    __table_args__ = (
+        Index("ix_hotel_destinations_destination", "destination_id"),
+    )
+
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), primary_key=True)
+    destination_id = Column(Integer, primary_key=True)  # attractions.destination_id
 
 
 class Restaurant(Base):
     __tablename__ = "restaurants"
+    __table_args__ = (
+        Index("ux_restaurants_name_location", "name", "location", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -25,10 +51,21 @@ class Restaurant(Base):
     description = Column(Text)
     tags = Column(String)
     image_url = Column(String)
+    rating = Column(Float)
+    price_range = Column(String)  # low / mid / high
+    province = Column(Integer)
 
 
 class Attraction(Base):
     __tablename__ = "attractions"
+    __table_args__ = (
+        Index("ux_attractions_destination_id", "destination_id", unique=True),
+        # Attractions that did not come from attraction.csv are keyed by name + location
+        Index("ux_attractions_name_location", "name", "location", unique=True,
+              sqlite_where=text("destination_id IS NULL")),
+        # /details looks attractions up by name alone
+        Index("ix_attractions_name", "name"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -36,10 +73,27 @@ class Attraction(Base):
     description = Column(Text)
     tags = Column(String)
     image_url = Column(String)
+    destination_id = Column(Integer)  # "Destination ID" in datasets/attraction.csv
+    district = Column(String)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    best_season = Column(String)
+    season_mask = Column(Integer)  # bit 0 = January ... bit 11 = December (see seasons.py)
+    category = Column(String)       # "Main Category"
+    activities = Column(Text)
+    difficulty = Column(String)     # "Difficulty Level" as written, e.g. "Easy", "Moderate-High"
+    accessibility = Column(String)
+    province = Column(Integer)
 
 
 class Place(Base):
     __tablename__ = "places"
+    __table_args__ = (
+        Index("ix_places_name", "name"),
+        # /api/places filters
+        Index("ix_places_location", "location"),
+        Index("ix_places_type", "type"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -50,6 +104,31 @@ class Place(Base):
     image_url = Column(String)
     created_at = Column(String, default=str(datetime.utcnow()))
 
+    # Materialized from the datasets by ingest.materialize_place_attributes
+    attraction_id = Column(Integer)  # best matching attraction, if any
+    district = Column(String)
+    category = Column(String)
+    difficulty = Column(String)
+    duration = Column(String)
+    rating = Column(Float)     # mean rating of the hotels/restaurants around it
+    reviews = Column(Integer)  # number of those rated listings
+    price = Column(String)     # most common hotel price nearby, e.g. "Medium (~$35–60)"
+
+
+class PlaceImage(Base):
+    __tablename__ = "place_images"
+    __table_args__ = (
+        Index("ux_place_images_place_hash", "place_id", "content_hash", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    place_id = Column(Integer, ForeignKey('places.id'), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    content_hash = Column(String, nullable=False)  # SHA-256; the file is stored once per hash
+    url = Column(String, nullable=False)
+    original_filename = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 
 # ------------------ ADMIN MODEL ------------------
 
@@ -85,6 +164,10 @@ class Booking(Base):
 
 class Wishlist(Base):
     __tablename__ = "wishlists"
+    __table_args__ = (
+        # One row per saved place; also serves the per-user wishlist lookups
+        Index("ux_wishlists_user_place", "user_id", "place_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(String, nullable=False)
@@ -104,22 +187,51 @@ class Newsletter(Base):
     preferences = Column(String, default="general")  # travel tips, deals, news, etc.
 
 
-# ------------------ FLASK-SQLALCHEMY MODELS ------------------
+# ------------------ MAIL QUEUE MODEL ------------------
+
+class OutboundEmail(Base):
+    """An email waiting to be sent (or already sent) by the mail queue workers"""
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        # Workers claim due rows: status IN ('pending', 'sending') AND next_attempt_at <= now
+        Index("ix_outbound_emails_due", "status", "next_attempt_at"),
+    )
 
-class Chat(db.Model):
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    template = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+
+# ------------------ CHAT MODELS ------------------
+
+class Chat(Base):
     __tablename__ = "chat"
+    __table_args__ = (
+        # History pages: a user's chats newest first (the rowid id breaks ties)
+        Index("ix_chat_user_created", "user_id", "created_at"),
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String, nullable=False)
-    title = db.Column(db.String, default="New Chat")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False)
+    title = Column(String, default="New Chat")
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
-class Message(db.Model):
+class Message(Base):
     __tablename__ = "message"
+    __table_args__ = (
+        # Message pages: a chat's messages in id order
+        Index("ix_message_chat_id_id", "chat_id", "id"),
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
-    chat_id = db.Column(db.Integer, db.ForeignKey("chat.id"), nullable=False)
-    sender = db.Column(db.String, nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, ForeignKey("chat.id"), nullable=False)
+    sender = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
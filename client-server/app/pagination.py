@@ -0,0 +1,128 @@
+"""
+Helpers for cursor (keyset) pagination, field projection and streamed JSON responses.
+"""
+
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, select, tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+class InvalidFields(ValueError):
+    """Raised for a ``fields=`` projection naming unknown columns"""
+
+
+def page_limit(args, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """
+    The page size for a list endpoint that predates paging: None (the whole
+    list, as existing clients expect) unless ``limit`` or ``cursor`` is given.
+    """
+    if args.get("limit") is None and args.get("cursor") is None:
+        return None
+    return parse_limit(args.get("limit"), default, maximum)
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Parse a ``limit`` query parameter, clamped to 1..maximum"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(key) -> str:
+    """Encode the sort key of the last row on a page as an opaque URL-safe token"""
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size=None):
+    """Decode a token from ``encode_cursor``; returns None when no cursor was given"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if not isinstance(key, list) or (size is not None and len(key) != size):
+        raise InvalidCursor(cursor)
+    return key
+
+
+def stream_json_array(key, items, trailer=None):
+    """
+    Yield ``{"<key>": [...items], **trailer()}`` chunk by chunk.
+
+    ``trailer`` is called after the items are exhausted, so it can report
+    values (like the next cursor) that are only known once the page is read.
+    """
+    yield '{"%s":[' % key
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(item)
+    yield "]"
+    if trailer:
+        for name, value in trailer().items():
+            yield f",{json.dumps(name)}:{json.dumps(value)}"
+    yield "}"
+
+
+def parse_fields(value, allowed, default):
+    """
+    Parse ``fields=name,location`` against the ``allowed`` field names.
+    Returns ``default`` when the parameter is absent.
+    """
+    if not value:
+        return list(default)
+    fields = list(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        raise InvalidFields(", ".join(unknown))
+    return fields
+
+
+def prefix_filter(column, value):
+    """
+    ``column`` starts with ``value`` (case-sensitive), written as the range
+    ``value <= column < value + U+10FFFF`` so SQLite answers it with a SEARCH
+    on a plain index on the column (a ``LIKE`` is only indexable under
+    ``COLLATE NOCASE``).
+    """
+    return and_(column >= value, column < value + "\U0010ffff")
+
+
+def keyset_page(db, columns, key, filters, limit, after=None, descending=False):
+    """
+    One page of ``columns`` ordered by the unique ``key`` column, starting
+    after the key value ``after``. Rows are Core rows (no ORM objects).
+
+    ``key`` may also be a tuple of columns that is unique together (e.g.
+    ``(created_at, id)``); ``after`` and the next key are then lists too.
+
+    A ``limit`` of None returns every remaining row as one page.
+
+    Returns ``(rows, next_key)``; ``next_key`` is None on the last page.
+    """
+    keys = key if isinstance(key, tuple) else (key,)
+    query = select(*columns, *keys).where(*filters)
+    if after is not None:
+        bound = tuple_(*keys) if isinstance(key, tuple) else key
+        value = tuple_(*after) if isinstance(key, tuple) else after
+        query = query.where(bound < value if descending else bound > value)
+    query = query.order_by(*(k.desc() if descending else k for k in keys))
+    if limit is None:
+        return db.execute(query).all(), None
+    rows = db.execute(query.limit(limit + 1)).all()
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], list(last[-len(keys):]) if isinstance(key, tuple) else last[-1]
+    return rows, None
@@ -0,0 +1,322 @@
+"""
+Content-based "similar places" recommender.
+
+Every place, attraction and attraction.csv destination is turned into a TF-IDF
+vector over its tags, category, activities and description (a SciPy sparse
+matrix). Cosine top-k neighbours for the whole catalog are computed in batched
+sparse matrix products and saved to ``cache/similar_items.npz`` (next to
+``app/``), so serving a recommendation is a dict lookup plus a row slice.
+
+Each item's best-season month mask (see seasons.py) is stored alongside, so
+recommendations can be limited to what is worth visiting in a given month.
+
+Rebuild offline with ``python build_recommendations.py``; the app also builds
+the table on startup if the cache file is missing or out of date. The file
+records a fingerprint of the catalog it was built from (row counts and max
+ids, the search index version and attraction.csv's mtime and size), so a
+re-ingest or a database changed while the app was down is noticed.
+"""
+
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import text
+
+from .database import BASE_DIR, SessionLocal
+from . import models
+from .datasets import ATTRACTIONS_CSV, DATASETS_DIR, province_name, read_rows
+from .search_index import index_version
+from .seasons import parse_season
+from .shared_index import BackgroundRebuild
+
+SIMILAR_CACHE = os.path.join(BASE_DIR, "cache", "similar_items.npz")
+TOP_K = 20
+BATCH_SIZE = 512
+
+TABLE_KEYS = ("ids", "types", "names", "locations", "masks", "neighbours", "scores", "fingerprint")
+
+# How much each field contributes to an item's term frequencies
+FIELD_WEIGHTS = {
+    "tags": 3.0,
+    "category": 2.0,
+    "activities": 2.0,
+    "description": 1.0,
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or the to with "
+    "near local various nepal".split()
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+# ------------------ CATALOG ------------------
+
+def collect_items():
+    """
+    Catalog items as dicts with ``id``, ``type``, ``name``, ``location``,
+    ``season_mask`` and the text fields in FIELD_WEIGHTS.
+    """
+    items = []
+
+    db = SessionLocal()
+    try:
+        for p in db.query(models.Place):
+            items.append({
+                "id": f"place-{p.id}", "type": "Place", "name": p.name,
+                "location": p.location or "", "season_mask": 0,
+                "tags": p.tags, "category": p.type, "activities": "",
+                "description": p.description,
+            })
+        # Attractions loaded from attraction.csv come in below with their richer CSV fields
+        for a in db.query(models.Attraction).filter(models.Attraction.destination_id.is_(None)):
+            items.append({
+                "id": f"attraction-{a.id}", "type": "Attraction", "name": a.name,
+                "location": a.location or "", "season_mask": a.season_mask or 0,
+                "tags": a.tags, "category": "", "activities": "",
+                "description": a.description,
+            })
+    finally:
+        db.close()
+
+    try:
+        for row in read_rows(ATTRACTIONS_CSV):
+            location = ", ".join(filter(None, [row["District"], province_name(row["Province"])]))
+            items.append({
+                "id": f"destination-{row['Destination ID']}", "type": "Attraction",
+                "name": row["Destination Name"], "location": location,
+                "season_mask": parse_season(row["Best Season"]),
+                "tags": row["Tags"], "category": row["Main Category"],
+                "activities": row["Activities"], "description": "",
+            })
+    except FileNotFoundError as e:
+        print(f"⚠️ {e}; recommending from database items only")
+
+    return items
+
+
+def catalog_fingerprint():
+    """Checksum that changes whenever the items collect_items() reads may have changed"""
+    db = SessionLocal()
+    try:
+        parts = [
+            tuple(db.execute(text("SELECT count(*), max(id) FROM places")).one()),
+            tuple(db.execute(text("SELECT count(*), max(id) FROM attractions")).one()),
+            index_version(db),  # every catalog insert, update or delete
+        ]
+    finally:
+        db.close()
+    try:
+        stat = os.stat(os.path.join(DATASETS_DIR, ATTRACTIONS_CSV))
+        parts.append((stat.st_mtime_ns, stat.st_size))
+    except OSError:
+        parts.append(None)
+    return zlib.crc32(repr(parts).encode())
+
+
+# ------------------ MODEL ------------------
+
+def tfidf_matrix(items):
+    """L2-normalised TF-IDF matrix (items x vocabulary) as CSR"""
+    vocabulary = {}
+    rows, cols, values = [], [], []
+
+    for i, item in enumerate(items):
+        counts = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(item.get(field)):
+                counts[token] += weight
+        for token, tf in counts.items():
+            rows.append(i)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+            values.append(1.0 + math.log(tf))  # sublinear tf
+
+    n = len(items)
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)),
+        shape=(n, max(len(vocabulary), 1)),
+    )
+
+    df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1.0 + n) / (1.0 + df)).astype(np.float32) + 1.0
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+def top_k_neighbours(matrix, k=TOP_K, batch_size=BATCH_SIZE):
+    """
+    Cosine top-k neighbours of every row, computed ``batch_size`` rows at a time.
+
+    Returns (indices int32 [n, k], scores float32 [n, k]); slots without a
+    neighbour of positive similarity hold index -1.
+    """
+    n = matrix.shape[0]
+    k = min(k, max(n - 1, 0))
+    indices = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    transposed = matrix.T.tocsc()
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        sims = (matrix[start:stop] @ transposed).toarray()
+        sims[np.arange(stop - start), np.arange(start, stop)] = -1.0  # not your own neighbour
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        top[top_scores <= 0] = -1
+        indices[start:stop] = top
+        scores[start:stop] = np.clip(top_scores, 0, None)
+
+    return indices, scores
+
+
+class SimilarItems:
+    """Precomputed neighbour table with O(1) lookups"""
+
+    def __init__(self, cache_path=SIMILAR_CACHE):
+        self.cache_path = cache_path
+        self._table = None
+        self._lock = threading.RLock()
+        self._rebuild = BackgroundRebuild(self.build, "similar-items table")
+
+    def build(self):
+        """Recompute the neighbour table for the whole catalog and persist it"""
+        started = time.perf_counter()
+        # Taken first: a write during the build leaves the saved table stale, not wrongly current
+        fingerprint = catalog_fingerprint()
+        items = collect_items()
+        indices, scores = top_k_neighbours(tfidf_matrix(items))
+        table = {
+            "ids": np.array([item["id"] for item in items]),
+            "types": np.array([item["type"] for item in items]),
+            "names": np.array([item["name"] for item in items]),
+            "locations": np.array([item["location"] for item in items]),
+            "masks": np.array([item["season_mask"] for item in items], dtype=np.uint16),
+            "neighbours": indices,
+            "scores": scores,
+            "fingerprint": np.array(fingerprint, dtype=np.int64),
+        }
+        self._install(table)
+        self._save(table)
+        print(f"✅ Similar-items table built for {len(items)} items "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def load(self):
+        """Load the persisted table, building it if there is none or the catalog has changed since"""
+        try:
+            with np.load(self.cache_path) as data:
+                table = {key: data[key] for key in TABLE_KEYS}
+        except (OSError, ValueError, KeyError):
+            table = None
+        if table is None or int(table["fingerprint"]) != catalog_fingerprint():
+            self.build()
+        else:
+            self._install(table)
+
+    def invalidate(self):
+        """Rebuild in the background, serving the old table until it is ready"""
+        self._rebuild.request()
+
+    def wait(self, timeout=None):
+        """Wait for a pending background rebuild to finish"""
+        return self._rebuild.wait(timeout)
+
+    def _install(self, arrays):
+        table = dict(arrays)
+        table["position"] = {item_id: i for i, item_id in enumerate(table["ids"].tolist())}
+        table["by_name"] = {
+            (item_type.lower(), name): i
+            for i, (item_type, name) in enumerate(zip(table["types"].tolist(), table["names"].tolist()))
+        }
+        with self._lock:
+            self._table = table
+
+    def _save(self, table):
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.cache_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # A unique temp file, so a CLI build and the app never share one
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".similar_items.", suffix=".npz")
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **table)
+            os.replace(tmp_path, self.cache_path)
+            tmp_path = None
+        except OSError as e:
+            print(f"⚠️ Could not persist similar-items table: {e}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _get_table(self):
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self.load()
+        return self._table
+
+    def _item(self, table, i, score=None):
+        item = {
+            "id": str(table["ids"][i]),
+            "type": str(table["types"][i]),
+            "name": str(table["names"][i]),
+            "location": str(table["locations"][i]),
+        }
+        if score is not None:
+            item["score"] = round(float(score), 4)
+        return item
+
+    def item(self, item_id):
+        table = self._get_table()
+        i = table["position"].get(item_id)
+        return None if i is None else self._item(table, i)
+
+    def find_id(self, item_type, name):
+        """Recommender id for a catalog entry looked up by type and name"""
+        table = self._get_table()
+        i = table["by_name"].get((item_type.lower(), name))
+        return None if i is None else str(table["ids"][i])
+
+    def similar(self, item_id, limit=10, month_bits=None):
+        """
+        Most similar items to ``item_id`` (None if the id is unknown).
+
+        With ``month_bits``, neighbours whose known best season misses those
+        months are skipped, so fewer than ``limit`` items may come back.
+        """
+        table = self._get_table()
+        i = table["position"].get(item_id)
+        if i is None:
+            return None
+        neighbours = table["neighbours"][i]
+        scores = table["scores"][i]
+        keep = neighbours >= 0
+        if month_bits:
+            masks = table["masks"][neighbours]
+            keep &= (masks == 0) | ((masks & np.uint16(month_bits)) != 0)
+        return [self._item(table, j, s) for j, s in zip(neighbours[keep][:limit], scores[keep][:limit])]
+
+
+similar_items = SimilarItems()
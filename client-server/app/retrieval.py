@@ -0,0 +1,294 @@
+"""
+Catalog-grounded chat answers.
+
+A message goes through three in-memory steps, with no database access and no
+call to an external model:
+
+1. Extraction: the word-trie matcher of the intent engine (ai.py) finds
+   districts (the attraction districts plus the aliases in intents.json, e.g.
+   "Pokhara" -> Kaski), categories ("temples" -> Cultural & Religious Sites),
+   budgets ("cheap" -> low) and seasons ("in October", "spring", "Kartik").
+   The intent decides what to list: hotels, places to eat or places to visit.
+2. Retrieval: the catalog (attractions, places, hotels, restaurants) is held
+   as NumPy arrays plus one boolean mask per district and category. The
+   constraints are ANDed into one mask and the best rated rows are taken.
+3. Templating: the reply lists the top results with location, rating, price
+   and best months. If nothing satisfies every constraint, the least important
+   ones are dropped (season, then budget, then category) and the reply says so.
+
+Messages without a district or category (or a budget/season for a hotel or
+food question) get the intent engine's reply as before.
+"""
+
+import json
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import text
+
+from .ai import INTENTS_FILE, IntentEngine, intent_engine
+from .database import SessionLocal
+from .hotel_index import PRICE_BANDS
+from .ingest import price_band
+from .seasons import describe, parse_season
+from .shared_index import SharedIndex
+
+TOP_RESULTS = 5
+
+# Topic intent -> catalog types listed for it; anything else lists places to visit
+TOPIC_TYPES = {
+    "hotels": ("Hotel",),
+    "food": ("Restaurant",),
+}
+SIGHTS = ("Attraction", "Place")
+
+Constraints = namedtuple("Constraints", "districts categories budget season")
+Record = namedtuple("Record", "type name location rating price")
+
+
+# ------------------ EXTRACTION ------------------
+
+class EntityExtractor:
+    """Finds districts, categories, budgets and seasons in free text"""
+
+    def __init__(self, districts, entities):
+        self._engine = IntentEngine()
+        for district in districts:
+            self._engine.add_intent(("district", district), [district])
+        for alias, district in entities.get("district_aliases", {}).items():
+            self._engine.add_intent(("district", district), [alias])
+        for category, words in entities.get("categories", {}).items():
+            self._engine.add_intent(("category", category), [category, *words])
+        for band, words in entities.get("budgets", {}).items():
+            self._engine.add_intent(("budget", band), words)
+        for word in entities.get("seasons", ()):
+            self._engine.add_intent(("season", word), [word])
+
+    def extract(self, message):
+        districts, categories = [], []
+        budget, season = None, 0
+        for _, names in self._engine.scan(message):
+            for kind, value in sorted(names):
+                if kind == "district" and value not in districts:
+                    districts.append(value)
+                elif kind == "category" and value not in categories:
+                    categories.append(value)
+                elif kind == "budget":
+                    budget = value
+                elif kind == "season":
+                    season |= parse_season(value)
+        return Constraints(tuple(districts), tuple(categories), budget, season)
+
+    def values(self, kind, text):
+        """Distinct values of one entity kind mentioned in ``text``"""
+        return {value for _, names in self._engine.scan(text or "") for k, value in names if k == kind}
+
+
+# ------------------ CATALOG ------------------
+
+def load_rows():
+    """(type, name, location, rating, price, band, season mask, area text, category text)"""
+    db = SessionLocal()
+    try:
+        rows = []
+        for r in db.execute(text(
+            "SELECT name, location, district, category, season_mask FROM attractions"
+        )):
+            rows.append(("Attraction", r.name, r.district or r.location, None, None, None,
+                         r.season_mask or 0, f"{r.district or ''} {r.location or ''}", r.category))
+        for r in db.execute(text(
+            "SELECT p.name, p.location, p.district, p.category, p.type, p.rating, p.price, a.season_mask "
+            "FROM places p LEFT JOIN attractions a ON a.id = p.attraction_id"
+        )):
+            rows.append(("Place", r.name, r.location, r.rating, r.price, price_band(r.price),
+                         r.season_mask or 0, f"{r.district or ''} {r.location or ''}",
+                         f"{r.category or ''} {r.type or ''}"))
+        for r in db.execute(text(
+            "SELECT h.name, h.location, h.rating, h.price, h.price_band, "
+            "(SELECT group_concat(a.district, ' ') FROM hotel_destinations hd "
+            " JOIN attractions a ON a.destination_id = hd.destination_id WHERE hd.hotel_id = h.id) AS districts "
+            "FROM hotels h"
+        )):
+            rows.append(("Hotel", r.name, r.location, r.rating, r.price, r.price_band,
+                         0, f"{r.districts or ''} {r.location or ''}", None))
+        for r in db.execute(text("SELECT name, location, rating, price_range FROM restaurants")):
+            price = f"{r.price_range} budget" if r.price_range else None
+            rows.append(("Restaurant", r.name, r.location, r.rating, price, r.price_range,
+                         0, r.location or "", None))
+        districts = [d for (d,) in db.execute(text(
+            "SELECT DISTINCT district FROM attractions WHERE district IS NOT NULL"
+        ))]
+        return rows, districts
+    finally:
+        db.close()
+
+
+def load_entities(path=INTENTS_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("entities", {})
+
+
+class ChatCatalog:
+    """The catalog as arrays and masks, searchable by extracted constraints"""
+
+    def __init__(self, rows, extractor):
+        self.extractor = extractor
+        self.records = [Record(*row[:5]) for row in rows]
+        size = len(rows)
+        self.ratings = np.array([row[3] if row[3] is not None else -1.0 for row in rows], dtype=np.float64)
+        self.seasons = np.array([row[6] for row in rows], dtype=np.uint16)
+        bands = np.array([row[5] or "" for row in rows], dtype=object)
+        self._bands = {band: bands == band for band in PRICE_BANDS}
+        kinds = np.array([row[0] for row in rows], dtype=object)
+        self._types = {kind: kinds == kind for kind in set(kinds)}
+
+        self._districts = {}
+        self._categories = {}
+        for i, row in enumerate(rows):
+            for district in extractor.values("district", row[7]):
+                self._districts.setdefault(district, np.zeros(size, dtype=bool))[i] = True
+            for category in extractor.values("category", row[8]):
+                self._categories.setdefault(category, np.zeros(size, dtype=bool))[i] = True
+        self._none = np.zeros(size, dtype=bool)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _any(self, masks, keys):
+        mask = self._none.copy()
+        for key in keys:
+            if key in masks:
+                mask |= masks[key]
+        return mask
+
+    def search(self, types, constraints, limit=TOP_RESULTS):
+        """Best rated records of ``types`` satisfying ``constraints``"""
+        mask = self._any(self._types, types)
+        if constraints.districts:
+            mask &= self._any(self._districts, constraints.districts)
+        if constraints.categories:
+            mask &= self._any(self._categories, constraints.categories)
+        if constraints.budget:
+            mask &= self._bands[constraints.budget]
+        if constraints.season:
+            mask &= (self.seasons & np.uint16(constraints.season)) != 0
+        positions = np.flatnonzero(mask)
+        positions = positions[np.lexsort((positions, -self.ratings[positions]))]
+        # The same sight can be both a place and an attraction (or listed twice)
+        results, seen = [], set()
+        for i in positions:
+            key = self.records[i].name.lower()
+            if key not in seen:
+                seen.add(key)
+                results.append((self.records[i], int(self.seasons[i])))
+                if len(results) == limit:
+                    break
+        return results
+
+    def answer_lines(self, types, constraints):
+        """Templated reply listing the best matches, one line at a time, relaxing constraints if needed"""
+        sights = types == SIGHTS
+        # Categories and seasons describe places to visit; budgets describe what costs money
+        constraints = constraints._replace(
+            categories=constraints.categories if sights else (),
+            season=constraints.season if sights else 0,
+            budget=None if sights else constraints.budget,
+        )
+        dropped = []
+        results = self.search(types, constraints)
+        for field, label, empty in (("season", "the season", 0), ("budget", "the budget", None),
+                                    ("categories", "the category", ())):
+            if results or getattr(constraints, field) == empty:
+                continue
+            constraints = constraints._replace(**{field: empty})
+            dropped.append(label)
+            results = self.search(types, constraints)
+        return render_lines(types, constraints, results, dropped)
+
+
+# ------------------ TEMPLATES ------------------
+
+def _subject(types, constraints):
+    if types == ("Hotel",):
+        return " for hotels"
+    if types == ("Restaurant",):
+        return " for places to eat"
+    if constraints.categories:
+        return " for " + " and ".join(category.lower() for category in constraints.categories)
+    return " to visit"
+
+
+def _line(record, season):
+    details = []
+    if record.rating is not None:
+        details.append(f"rated {record.rating:.1f}")
+    if record.price:
+        details.append(record.price)
+    if season:
+        details.append("best in " + ", ".join(describe(season)))
+    line = f"• {record.name}"
+    if record.location:
+        line += f" ({record.location})"
+    if details:
+        line += " – " + ", ".join(details)
+    return line
+
+
+def render_lines(types, constraints, results, dropped=()):
+    """The templated reply one line at a time, each rendered when it is consumed"""
+    scope = _subject(types, constraints)
+    if constraints.districts:
+        scope += " in " + " or ".join(constraints.districts)
+    if constraints.budget:
+        scope += f" on a {constraints.budget} budget"
+    if constraints.season:
+        scope += " in " + ", ".join(describe(constraints.season))
+
+    if not results:
+        yield (f"I couldn't find anything{scope} in our catalog yet. "
+               "Try a nearby district, or ask me about hotels, food or things to do elsewhere.")
+        return
+
+    yield f"Here are my top picks{scope}:"
+    for record, season in results:
+        yield _line(record, season)
+    if dropped:
+        yield f"(Nothing matched everything you asked for, so I left out {' and '.join(dropped)}.)"
+    yield "Ask me about any of them for more details!"
+
+
+# ------------------ CHAT ENTRY POINT ------------------
+
+def chat_reply(message):
+    """Reply grounded in the catalog when the message names something to look up, else the intent reply"""
+    return "\n".join(chat_reply_lines(message))
+
+
+def chat_reply_lines(message):
+    """
+    chat_reply() one line at a time, without line breaks. Nothing runs until
+    the first line is asked for; the catalog lookup then runs before the
+    header (which names the constraints that had to be relaxed) and each
+    result line is rendered as it is consumed.
+    """
+    engine = intent_engine.get()
+    matches = engine.match(message)
+    topic = next((m.intent.name for m in matches if m.intent.name in TOPIC_TYPES), None)
+
+    catalog = chat_catalog.get()
+    constraints = catalog.extractor.extract(message)
+    grounded = constraints.districts or constraints.categories or (
+        topic and (constraints.budget or constraints.season))
+    if not grounded:
+        yield from (matches[0].intent.reply if matches else engine.fallback).splitlines()
+        return
+    yield from catalog.answer_lines(TOPIC_TYPES.get(topic, SIGHTS), constraints)
+
+
+def build_catalog():
+    rows, districts = load_rows()
+    extractor = EntityExtractor([d for d in districts if d.replace(" ", "").isalpha()], load_entities())
+    return ChatCatalog(rows, extractor)
+
+
+chat_catalog = SharedIndex(build_catalog, "chat catalog")
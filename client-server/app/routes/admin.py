@@ -1,8 +1,8 @@
 from flask import Blueprint, jsonify, request
-from sqlalchemy.orm import Session
 from sqlalchemy import func
-from ..database import SessionLocal
+from ..database import get_session
 from ..models import Admin, Booking
+from ..mailer import mail_queue
 import requests
 import os
 from datetime import datetime
@@ -26,19 +26,16 @@ def admin_login():
     if not username or not password:
         return jsonify({"error": "Username and password required"}), 400
 
-    db: Session = SessionLocal()
-    try:
-        admin = db.query(Admin).filter(Admin.username == username).first()
-        if not admin or admin.password != password:
-            return jsonify({"error": "Invalid credentials"}), 401
-
-        return jsonify({
-            "message": "Admin login successful",
-            "admin_id": admin.id,
-            "username": admin.username
-        }), 200
-    finally:
-        db.close()
+    db = get_session()
+    admin = db.query(Admin).filter(Admin.username == username).first()
+    if not admin or admin.password != password:
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    return jsonify({
+        "message": "Admin login successful",
+        "admin_id": admin.id,
+        "username": admin.username
+    }), 200
 
 # -----------------------------
 # Clerk Helper
@@ -103,16 +100,19 @@ def new_users():
 # Total bookings from SQLite
 @admin_bp.route("/admin/dashboard/total-bookings", methods=["GET"])
 def total_bookings():
-    session = SessionLocal()
+    session = get_session()
     count = session.query(Booking).count()
-    session.close()
     return jsonify({"totalBookings": count})
 
 # Bookings per city
 @admin_bp.route("/admin/dashboard/bookings-per-city", methods=["GET"])
 def bookings_per_city():
-    session = SessionLocal()
+    session = get_session()
     results = session.query(Booking.city, func.count(Booking.id)).group_by(Booking.city).all()
-    session.close()
     data = [{"city": row[0], "count": row[1]} for row in results]
     return jsonify(data)
+
+# Outbound mail queue: sends, retries and throughput of this process, rows by status
+@admin_bp.route("/admin/dashboard/mail-queue", methods=["GET"])
+def mail_queue_stats():
+    return jsonify(mail_queue.stats(get_session()))
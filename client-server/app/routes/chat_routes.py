@@ -1,20 +1,31 @@
-from flask import Blueprint, request, jsonify
-from ..database import db
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from .. import message_search
+from ..database import get_session
 from ..models import Chat, Message
-from ..ai import get_ai_reply
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page, parse_limit
+from ..retrieval import chat_reply, chat_reply_lines
+from ..writer import writer
 
 
 chat_bp = Blueprint("chat", __name__)
 
+
+def _add(db, obj):
+    """Write job: insert one row and return it with its id"""
+    db.add(obj)
+    db.flush()
+    return obj
+
 # ----------- CREATE NEW CHAT -----------
 @chat_bp.route("/new", methods=["POST"])
 def create_chat():
     data = request.json
     user_id = data.get("user_id")
 
-    new_chat = Chat(user_id=user_id)
-    db.session.add(new_chat)
-    db.session.commit()
+    new_chat = writer.run(_add, Chat(user_id=user_id))
 
     return jsonify({"chat_id": new_chat.id})
 
@@ -29,55 +40,93 @@ def save_message():
         content=data["content"]
     )
 
-    db.session.add(msg)
-    db.session.commit()
+    writer.run(_add, msg)
     return jsonify({"status": "saved"})
 
 
-# ----------- GET ALL MESSAGES FROM CHAT -----------
+# ----------- GET MESSAGES FROM CHAT -----------
 @chat_bp.route("/messages", methods=["GET"])
 def get_messages():
-    chat_id = request.args.get("chat_id")
-    msgs = Message.query.filter_by(chat_id=chat_id).all()
-
-    return jsonify([
-        {"type": m.sender, "text": m.content}
-        for m in msgs
+    """
+    The latest ``limit`` messages of a chat (default 50, max 200), oldest
+    first. Earlier messages are fetched with ``cursor`` set to the previous
+    response's ``X-Next-Cursor`` header, which is absent on the first message.
+    """
+    chat_id = request.args.get("chat_id", type=int)
+    if chat_id is None:
+        return jsonify({"error": "chat_id is required"}), 400
+    limit = parse_limit(request.args.get("limit"))
+    try:
+        before = decode_cursor(request.args.get("cursor"), size=1)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    if before is not None and not isinstance(before[0], int):
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    rows, next_key = keyset_page(
+        get_session(), [Message.sender, Message.content], Message.id,
+        [Message.chat_id == chat_id], limit, before[0] if before else None, descending=True
+    )
+    response = jsonify([
+        {"id": m.id, "type": m.sender, "text": m.content}
+        for m in reversed(rows)
     ])
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor([next_key])
+    return response
 
 
 # ----------- GET CHAT HISTORY FOR USER -----------
 @chat_bp.route("/history", methods=["GET"])
 def chat_history():
+    """
+    A user's chats, newest first, ``limit`` at a time (default 50, max 200);
+    pass the ``X-Next-Cursor`` header back as ``cursor`` for the next page.
+    """
     user_id = request.args.get("user_id")
-    chats = Chat.query.filter_by(user_id=user_id).all()
-
-    return jsonify([
-        {"id": c.id, "title": c.title}
-        for c in chats
+    limit = parse_limit(request.args.get("limit"))
+    try:
+        after = decode_cursor(request.args.get("cursor"), size=2)
+        if after is not None:
+            after = [datetime.fromisoformat(after[0]), int(after[1])]
+    except (InvalidCursor, TypeError, ValueError):
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    rows, next_key = keyset_page(
+        get_session(), [Chat.title], (Chat.created_at, Chat.id),
+        [Chat.user_id == user_id], limit, after, descending=True
+    )
+    response = jsonify([
+        {"id": c.id, "title": c.title, "created_at": c.created_at.isoformat() if c.created_at else None}
+        for c in rows
     ])
+    if next_key is not None:
+        created_at, chat_id = next_key
+        response.headers["X-Next-Cursor"] = encode_cursor([created_at.isoformat(), chat_id])
+    return response
 
 
 # ----------- SEARCH CHATS -----------
 @chat_bp.route("/search", methods=["GET"])
 def search_chats():
+    """
+    A user's chats whose messages match ``query`` (every word, as a prefix),
+    most recent match first, with a snippet of the matching message.
+    ``limit`` defaults to 20 (max 100).
+    """
     user_id = request.args.get("user_id")
-    query = request.args.get("query")
+    query = request.args.get("query") or ""
+    limit = parse_limit(request.args.get("limit"), default=20, maximum=100)
 
-    results = Chat.query.filter(
-        Chat.user_id == user_id,
-        Chat.title.ilike(f"%{query}%")
-    ).all()
+    results = message_search.search_chats(get_session(), user_id, query, limit)
 
     return jsonify([
-        {"id": c.id, "title": c.title}
-        for c in results
+        {"id": r.chat_id, "title": r.title, "message_id": r.message_id, "snippet": r.snippet}
+        for r in results
     ])
 
 @chat_bp.route("/ai-reply", methods=["POST"])
 def ai_reply():
-    from app.ai import get_ai_reply
-
     data = request.json
     chat_id = data.get("chat_id")
     message = data.get("message")
@@ -85,7 +134,7 @@ def ai_reply():
     if not chat_id or not message:
         return jsonify({"error": "chat_id and message are required"}), 400
 
-    ai_text = get_ai_reply(message)
+    ai_text = chat_reply(message)
 
     return jsonify({
         "chat_id": chat_id,
@@ -101,17 +150,65 @@ def send_message():
     chat_id = data["chat_id"]
     user_msg = data["message"]
 
-    # save user message
-    msg = Message(chat_id=chat_id, sender="user", content=user_msg)
-    db.session.add(msg)
-    db.session.commit()
+    # save user message while the reply is generated
+    saved = writer.submit(_add, Message(chat_id=chat_id, sender="user", content=user_msg))
 
     # ai reply
-    bot_reply = get_ai_reply(user_msg)
+    bot_reply = chat_reply(user_msg)
 
-    # save bot reply
-    bot_msg = Message(chat_id=chat_id, sender="bot", content=bot_reply)
-    db.session.add(bot_msg)
-    db.session.commit()
+    # save bot reply; usually lands in the same group commit
+    writer.run(_add, Message(chat_id=chat_id, sender="bot", content=bot_reply))
+    saved.result(timeout=writer.timeout)
 
     return jsonify({"reply": bot_reply})
+
+
+# ----------- SEND AND STREAM BOT REPLY (SSE) -----------
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+@chat_bp.route("/stream", methods=["POST"])
+def stream_message():
+    """
+    Send a message and stream the bot reply as Server-Sent Events: ``start``,
+    one ``delta`` per line of the reply, then ``done``. ``start`` goes out
+    before the reply is worked out, and each line is sent as soon as it is
+    rendered (retrieval.chat_reply_lines); the catalog lookup itself happens
+    in one step before the first line.
+
+    Both messages are written behind the response (writer.defer), so no
+    commit sits between the request and its first byte.
+    """
+    data = request.json or {}
+    chat_id = data.get("chat_id")
+    user_msg = data.get("message")
+    if not chat_id or not user_msg:
+        return jsonify({"error": "chat_id and message are required"}), 400
+    # Checked up front: once the stream has started the status can no longer change
+    if get_session().get(Chat, chat_id) is None:
+        return jsonify({"error": "Chat not found"}), 404
+
+    writer.defer(_add, Message(chat_id=chat_id, sender="user", content=user_msg))
+
+    def events():
+        yield _event("start", {"chat_id": chat_id})
+        reply = chat_reply_lines(user_msg)
+        lines = []
+        try:
+            for line in reply:
+                # Line breaks go before every line but the first, so the deltas concatenate to the reply
+                text = ("\n" if lines else "") + line
+                lines.append(line)
+                yield _event("delta", {"text": text})
+            yield _event("done", {"chat_id": chat_id})
+        finally:
+            # Saved in full even if the client disconnects mid-stream
+            lines.extend(reply)
+            if lines:
+                writer.defer(_add, Message(chat_id=chat_id, sender="bot", content="\n".join(lines)))
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
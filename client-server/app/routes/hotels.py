@@ -1,39 +1,92 @@
-from flask import Blueprint, jsonify
-from ..database import SessionLocal
+from flask import Blueprint, request, jsonify
+from ..database import get_session
 from ..models import Hotel
+from .. import crud
+from ..hotel_index import PRICE_BANDS, destination_hotels
+from ..pagination import (
+    InvalidCursor, InvalidFields, decode_cursor, encode_cursor, keyset_page, parse_fields,
+    page_limit, prefix_filter,
+)
 
 hotels_bp = Blueprint('hotels', __name__)
 
+# Fields a client can ask for with ?fields=, and the ones sent by default
+HOTEL_FIELDS = {
+    name: getattr(Hotel, name)
+    for name in ('id', 'name', 'location', 'description', 'tags', 'image_url',
+                 'rating', 'price', 'price_band', 'province')
+}
+DEFAULT_HOTEL_FIELDS = ('id', 'name', 'location', 'description', 'tags', 'image_url')
+
 @hotels_bp.route('/hotels', methods=['GET'])
 def list_hotels():
-    """Get all hotels from the database"""
-    session = SessionLocal()
+    """
+    Hotels in id order: all of them, or one page at a time when ``limit``
+    or ``cursor`` is given.
+
+    Query params: ``limit`` (default 50, max 200), ``cursor`` (from the
+    previous response's ``X-Next-Cursor`` header), ``fields`` (comma-separated
+    columns), and the filters ``location`` (case-sensitive prefix),
+    ``province`` (1-7) and ``min_rating``.
+    """
+    limit = page_limit(request.args)
     try:
-        hotels = session.query(Hotel).all()
-        out = []
-        for hotel in hotels:
-            out.append({
-                'id': hotel.id,
-                'name': hotel.name,
-                'location': hotel.location,
-                'description': hotel.description,
-                'tags': hotel.tags,
-                'image_url': hotel.image_url
-            })
-        return jsonify(out)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        session.close()
+        fields = parse_fields(request.args.get('fields'), HOTEL_FIELDS, DEFAULT_HOTEL_FIELDS)
+        after = decode_cursor(request.args.get('cursor'), size=1)
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    if after is not None and not isinstance(after[0], int):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    filters = []
+    if request.args.get('location'):
+        filters.append(prefix_filter(Hotel.location, request.args['location']))
+    try:
+        if request.args.get('province'):
+            filters.append(Hotel.province == int(request.args['province']))
+        if request.args.get('min_rating'):
+            filters.append(Hotel.rating >= float(request.args['min_rating']))
+    except ValueError:
+        return jsonify({'error': 'province and min_rating must be numbers'}), 400
+
+    rows, next_key = keyset_page(
+        get_session(), [HOTEL_FIELDS[f] for f in fields], Hotel.id, filters,
+        limit, after[0] if after else None
+    )
+    response = jsonify([dict(zip(fields, row)) for row in rows])
+    if next_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor([next_key])
+    return response
 
 @hotels_bp.route('/hotels/count', methods=['GET'])
 def get_hotel_count():
-    """Get total count of hotels"""
-    session = SessionLocal()
+    """Get total count of hotels (kept up to date by triggers, not COUNT(*))"""
     try:
-        count = session.query(Hotel).count()
-        return jsonify({'count': count})
+        return jsonify({'count': crud.count_rows(get_session(), Hotel.__tablename__)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        session.close()
\ No newline at end of file
+
+@hotels_bp.route('/attractions/<int:attraction_id>/hotels', methods=['GET'])
+def hotels_near_attraction(attraction_id):
+    """
+    Best rated hotels listed near an attraction in hotel.csv, read from the
+    precomputed destination index. ``budget`` (low / mid / high) keeps hotels
+    in that price band or cheaper; ``limit`` defaults to 10.
+    """
+    budget = (request.args.get('budget') or '').lower() or None
+    if budget is not None and budget not in PRICE_BANDS:
+        return jsonify({'error': f"budget must be one of {', '.join(PRICE_BANDS)}"}), 400
+    limit = parse_limit(request.args.get('limit'), default=10, maximum=100)
+
+    index = destination_hotels.get()
+    if attraction_id not in index:
+        return jsonify({'error': f'No hotels listed for attraction {attraction_id}'}), 404
+
+    return jsonify({
+        'attraction_id': attraction_id,
+        'budget': budget,
+        'bands': index.band_counts(attraction_id),
+        'results': [hotel._asdict() for hotel in index.best(attraction_id, budget, limit)]
+    })
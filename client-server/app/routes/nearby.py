@@ -0,0 +1,64 @@
+from flask import Blueprint, request, jsonify
+from ..geo import spatial_index
+from ..pagination import parse_limit
+
+nearby_bp = Blueprint('nearby', __name__)
+
+def _float_arg(name):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    return float(value)
+
+@nearby_bp.route('/attractions/nearby', methods=['GET'])
+def nearby_attractions():
+    """
+    Attractions around a point, served from the in-memory spatial index.
+
+    Give either ``lat``/``lon`` or ``near`` (an attraction name or district).
+    With ``radius_km`` the response lists everything inside the radius (up to
+    ``limit``); without it, the ``k`` nearest attractions.
+    """
+    index = spatial_index.get()
+    try:
+        lat, lon = _float_arg('lat'), _float_arg('lon')
+        radius_km = _float_arg('radius_km')
+    except ValueError:
+        return jsonify({'error': 'lat, lon and radius_km must be numbers'}), 400
+
+    origin = None
+    near = request.args.get('near')
+    if near:
+        resolved = index.resolve(near)
+        if not resolved:
+            return jsonify({'error': f"Unknown attraction or district '{near}'"}), 404
+        lat, lon, origin = resolved
+    elif lat is None or lon is None:
+        return jsonify({'error': 'Provide lat and lon, or near'}), 400
+
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'Coordinates out of range'}), 400
+
+    if radius_km is not None:
+        if radius_km <= 0:
+            return jsonify({'error': 'radius_km must be positive'}), 400
+        limit = parse_limit(request.args.get('limit'))
+        hits = index.within(lat, lon, radius_km, limit=limit, exclude=origin)
+    else:
+        k = parse_limit(request.args.get('k'), default=10, maximum=100)
+        hits = index.nearest(lat, lon, k=k, exclude=origin)
+
+    return jsonify({
+        'origin': {'lat': lat, 'lon': lon},
+        'results': [
+            {
+                'id': attraction_id,
+                'name': name,
+                'district': district,
+                'lat': a_lat,
+                'lon': a_lon,
+                'distance_km': round(distance, 3)
+            }
+            for attraction_id, name, district, a_lat, a_lon, distance in hits
+        ]
+    })
@@ -1,14 +1,61 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
-import os
-from ..database import SessionLocal
-from ..models import Place
+from ..database import get_session
+from ..ingest import update_place_attributes
+from ..models import Place, PlaceImage
+from ..suggest import suggest_index
+from ..recommender import similar_items
+from ..facets import facet_index
+from ..retrieval import chat_catalog
+from ..seasons import season_index
+from ..uploads import store_upload, UnsupportedUpload
+from ..thumbnails import derivatives
+from ..writer import writer
+from ..pagination import (
+    InvalidCursor, InvalidFields, decode_cursor, encode_cursor, keyset_page, parse_fields,
+    page_limit, prefix_filter,
+)
 
 places_bp = Blueprint('places', __name__)
 
-UPLOAD_DIR = os.path.join(os.getcwd(), 'datasets', 'uploads')
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
+# New places get their derived attributes on one background worker
+_place_updates = ThreadPoolExecutor(max_workers=1, thread_name_prefix="place-attributes")
+
+def _after_create(place_id):
+    """Derive a new place's attributes, then refresh the indexes built from places"""
+    try:
+        update_place_attributes([place_id])
+    except Exception as e:
+        print(f"⚠️ Deriving attributes of place {place_id} failed: {e}")
+    suggest_index.invalidate()
+    similar_items.invalidate()
+    facet_index.invalidate()
+    chat_catalog.invalidate()
+    season_index.invalidate()
+
+def _create_place(db, fields, stored):
+    """Write job: insert a place and its images (once per content hash); returns its id and image urls"""
+    place = Place(**fields)
+    db.add(place)
+    db.flush()
+
+    urls = []
+    seen = set()
+    for f in stored:
+        if f.content_hash in seen:
+            continue
+        seen.add(f.content_hash)
+        urls.append(f.url)
+        db.add(PlaceImage(
+            place_id=place.id,
+            position=len(urls) - 1,
+            content_hash=f.content_hash,
+            url=f.url,
+            original_filename=f.original_filename
+        ))
+    db.flush()
+    return place.id, urls
 
 @places_bp.route('/places', methods=['POST'])
 def create_place():
@@ -22,56 +69,109 @@ def create_place():
     if not name:
         return jsonify({'error': 'Name is required'}), 400
 
-    # handle file uploads (image_1, image_2 etc.) - take first if present
-    image_url = None
-    for key in request.files:
-        f = request.files[key]
-        if f and f.filename:
-            filename = secure_filename(f.filename)
-            save_path = os.path.join(UPLOAD_DIR, filename)
-            f.save(save_path)
-            # store path relative to /datasets for serving
-            image_url = f"/datasets/uploads/{filename}"
-            break
-
-    # Save to DB
-    session = SessionLocal()
+    # handle file uploads (image_1, image_2 etc.) - every file is kept, stored by content hash
+    stored = []
     try:
-        place = Place(
+        for key in request.files:
+            for f in request.files.getlist(key):
+                if f and f.filename:
+                    stored.append(store_upload(f))
+    except UnsupportedUpload as e:
+        return jsonify({'error': f"Unsupported image type: {e}"}), 400
+
+    # the first image stays the cover shown in lists
+    image_url = stored[0].url if stored else None
+
+    # Save to DB through the shared writer, like every other write
+    try:
+        place_id, urls = writer.run(_create_place, dict(
             name=name,
             location=location,
             type=ptype,
             description=description,
             tags=tags,
             image_url=image_url
-        )
-        session.add(place)
-        session.commit()
-        session.refresh(place)
-        return jsonify({'success': True, 'place_id': place.id}), 201
+        ), stored)
     except Exception as e:
-        session.rollback()
         current_app.logger.error('Failed to create place: %s', e)
         return jsonify({'error': 'internal server error'}), 500
-    finally:
-        session.close()
+
+    # Rating, district etc. are derived from the datasets after the response
+    _place_updates.submit(_after_create, place_id)
+
+    # Thumbnails are rendered in the background; responses use the originals until then
+    if stored:
+        derivatives.build_async({f.path for f in stored})
+
+    return jsonify({
+        'success': True,
+        'place_id': place_id,
+        'images': urls
+    }), 201
+
+# Fields a client can ask for with ?fields=, and the ones sent by default.
+# "images" is not a column; it is filled from place_images for the page.
+PLACE_FIELDS = {
+    name: getattr(Place, name)
+    for name in ('id', 'name', 'location', 'type', 'description', 'tags', 'image_url',
+                 'category', 'district', 'difficulty', 'duration', 'rating', 'reviews', 'price')
+}
+PLACE_FIELDS['images'] = Place.image_url
+DEFAULT_PLACE_FIELDS = ('id', 'name', 'location', 'type', 'description', 'tags', 'image_url', 'images')
 
 @places_bp.route('/places', methods=['GET'])
 def list_places():
-    session = SessionLocal()
+    """
+    Places, newest first: all of them, or one page at a time when ``limit``
+    or ``cursor`` is given.
+
+    Query params: ``limit`` (default 50, max 200), ``cursor`` (from the
+    previous response's ``X-Next-Cursor`` header), ``fields`` (comma-separated)
+    and the filters ``location`` (case-sensitive prefix), ``type`` and
+    ``min_rating``.
+    """
+    limit = page_limit(request.args)
     try:
-        places = session.query(Place).order_by(Place.id.desc()).all()
-        out = []
-        for p in places:
-            out.append({
-                'id': p.id,
-                'name': p.name,
-                'location': p.location,
-                'type': p.type,
-                'description': p.description,
-                'tags': p.tags,
-                'image_url': p.image_url
-            })
-        return jsonify(out)
-    finally:
-        session.close()
+        fields = parse_fields(request.args.get('fields'), PLACE_FIELDS, DEFAULT_PLACE_FIELDS)
+        after = decode_cursor(request.args.get('cursor'), size=1)
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    if after is not None and not isinstance(after[0], int):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    filters = []
+    if request.args.get('location'):
+        filters.append(prefix_filter(Place.location, request.args['location']))
+    if request.args.get('type'):
+        filters.append(Place.type == request.args['type'])
+    try:
+        if request.args.get('min_rating'):
+            filters.append(Place.rating >= float(request.args['min_rating']))
+    except ValueError:
+        return jsonify({'error': 'min_rating must be a number'}), 400
+
+    session = get_session()
+    rows, next_key = keyset_page(
+        session, [PLACE_FIELDS[f] for f in fields], Place.id, filters,
+        limit, after[0] if after else None, descending=True
+    )
+    out = [dict(zip(fields, row)) for row in rows]
+
+    if 'images' in fields:
+        # This page's images in one query instead of one per place
+        images = defaultdict(list)
+        page_ids = [row[-1] for row in rows]
+        for place_id, url in session.query(PlaceImage.place_id, PlaceImage.url).filter(
+            PlaceImage.place_id.in_(page_ids)
+        ).order_by(PlaceImage.place_id, PlaceImage.position):
+            images[place_id].append(url)
+        for place, row in zip(out, rows):
+            cover = place['images']
+            place['images'] = images.get(row[-1]) or ([cover] if cover else [])
+
+    response = jsonify(out)
+    if next_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor([next_key])
+    return response
@@ -0,0 +1,59 @@
+from flask import Blueprint, request, jsonify
+from ..database import get_session
+from ..models import Place
+from ..recommender import similar_items
+from ..collaborative import co_saves
+from ..pagination import parse_limit
+from ..seasons import month_bits
+
+recommendations_bp = Blueprint('recommendations', __name__)
+
+@recommendations_bp.route('/recommendations/similar/<item_id>', methods=['GET'])
+def get_similar(item_id):
+    """
+    Items most similar to ``item_id`` (e.g. ``place-3``, ``destination-885``).
+    ``month`` keeps only items worth visiting that month.
+    """
+    limit = parse_limit(request.args.get('limit'), default=10, maximum=20)
+    bits = None
+    if request.args.get('month'):
+        bits = month_bits(request.args['month'])
+        if bits is None:
+            return jsonify({'error': 'Invalid month'}), 400
+
+    similar = similar_items.similar(item_id, limit, month_bits=bits)
+    if similar is None:
+        return jsonify({'error': f"Unknown item '{item_id}'"}), 404
+
+    return jsonify({
+        'item': similar_items.item(item_id),
+        'similar': similar
+    })
+
+
+@recommendations_bp.route('/recommendations/also-saved/<int:place_id>', methods=['GET'])
+def get_also_saved(place_id):
+    """"People who saved this also saved", from the precomputed co-save table"""
+    limit = parse_limit(request.args.get('limit'), default=10, maximum=20)
+    neighbours = co_saves.also_saved(place_id, limit)
+
+    db = get_session()
+    ids = [other for other, _, _ in neighbours]
+    places = {p.id: p for p in db.query(Place).filter(Place.id.in_(ids))} if ids else {}
+
+    out = []
+    for other, score, together in neighbours:
+        place = places.get(other)
+        if not place:
+            continue
+        out.append({
+            'id': place.id,
+            'name': place.name,
+            'location': place.location,
+            'type': place.type,
+            'image_url': place.image_url,
+            'score': round(score, 4),
+            'saved_together': together
+        })
+
+    return jsonify({'place_id': place_id, 'also_saved': out})
@@ -1,16 +1,14 @@
 # app/routes/rooms.py
 from flask import Blueprint, request, jsonify
-from ..database import SessionLocal
+from ..database import get_session
 from .. import crud
 
 rooms_blueprint = Blueprint('rooms', __name__)
 
 @rooms_blueprint.route("/", methods=["POST"])
 def create_room_route():
-    db = SessionLocal()
     data = request.json
-    room = crud.create_room(db, data)
-    db.close()
+    room = crud.create_room(data)
     return jsonify({
         "id": room.id,
         "name": room.name,
@@ -21,9 +19,8 @@ def create_room_route():
 
 @rooms_blueprint.route("/", methods=["GET"])
 def get_rooms_route():
-    db = SessionLocal()
+    db = get_session()
     rooms = crud.get_rooms(db)
-    db.close()
     return jsonify([
         {"id": r.id, "name": r.name, "description": r.description, "price": r.price, "image": r.image}
         for r in rooms
@@ -1,100 +1,171 @@
 # app/routes/search.py
 
-from flask import Blueprint, request, jsonify
-from ..database import SessionLocal
-from .. import models
-import os
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from ..database import get_session
+from .. import models, search_index
+from ..image_manifest import image_manifest
+from ..thumbnails import derivatives
+from ..static_assets import asset_index
+from ..suggest import suggest_index
+from ..recommender import similar_items
+from ..hotel_index import destination_hotels
+from ..facets import FACETS, facet_index
+from ..seasons import month_bits
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor, parse_limit, stream_json_array
 
 # IMPORTANT: blueprint name must be UNIQUE
 search_blueprint = Blueprint('search_bp', __name__)
 
-BASE_IMAGE_DIR = "datasets/project_imgfold/project_images"
-
-
 # ---------------------- Helper: Get Images ----------------------
 def get_images_for_place(place_name):
-    folder_path = os.path.join(BASE_IMAGE_DIR, place_name)
-    images = []
+    # O(1) lookup in the in-memory manifest instead of listing the folder per result
+    return image_manifest.get(place_name)
 
-    if os.path.exists(folder_path):
-        for file in os.listdir(folder_path):
-            if file.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
-                images.append(
-                    os.path.join(BASE_IMAGE_DIR, place_name, file).replace("\\", "/")
-                )
 
-    return images
+# ---------------------- SEARCH ROUTE ----------------------
+def _search_result(hit):
+    # For Places, use image_url if available, otherwise get images from folder
+    if hit.type == "Place" and hit.image_url:
+        images = [hit.image_url]
+    else:
+        images = get_images_for_place(hit.name)
+
+    return {
+        "name": hit.name,
+        "type": hit.type,
+        "description": hit.description or "",
+        "location": hit.location or "",
+        "tags": hit.tags or "",
+        # Result cards only need thumbnails
+        "images": asset_index.urls(derivatives.urls(images, "thumb"))
+    }
+
+
+def _facet_selection():
+    """{facet: [values]} from ``?district=Kaski,Chitwan&price_band=low`` style params"""
+    selected = {}
+    for facet in FACETS:
+        values = [v.strip() for arg in request.args.getlist(facet) for v in arg.split(",") if v.strip()]
+        if values:
+            selected[facet] = values
+    return selected
+
+
+def _facet_counts(counts):
+    return [
+        {"facet": facet, "label": label, "values": [{"value": v, "count": n} for v, n in counts[facet]]}
+        for facet, label in FACETS.items()
+    ]
 
 
-# ---------------------- SEARCH ROUTE ----------------------
 @search_blueprint.route("/search/", methods=["GET"])
 def search_items():
+    """
+    Ranked search over all catalog types.
+
+    Query params: ``q``, ``limit`` (default 50, max 200), ``cursor`` (from the
+    previous page's ``next_cursor``), ``count`` (``1`` to add ``total``,
+    ``only`` to return just the total without fetching rows) and ``month``
+    (1-12, a month name or a Nepali month) to drop attractions out of season.
+
+    Ranked pages are keyed by (score, rowid). Any write to the catalog
+    changes every BM25 score, so a ``next_cursor`` from before the write
+    would skip or repeat rows; it is rejected with 409 and the client starts
+    again from the first page.
+
+    Facet filters: ``type``, ``province``, ``district``, ``category``,
+    ``difficulty``, ``accessibility`` and ``price_band``, each taking one or
+    more comma-separated values. ``facets=1`` adds the count of every facet
+    value under the current query and filters (see facets.py).
+    """
     q = request.args.get("q", "")
-    db = SessionLocal()
-    query = f"%{q}%"
-    results = []
-
-    def add_result(obj, obj_type):
-        # For Places, use image_url if available, otherwise get images from folder
-        if obj_type == "Place" and hasattr(obj, 'image_url') and obj.image_url:
-            images = [obj.image_url]
-        else:
-            images = get_images_for_place(obj.name)
-            
-        results.append({
-            "name": obj.name,
-            "type": obj_type,
-            "description": obj.description or "",
-            "location": obj.location or "",
-            "tags": obj.tags or "",
-            "images": images
-        })
-
-    # Places (New tourism places data)
-    places = db.query(models.Place).filter(
-        models.Place.name.ilike(query) |
-        models.Place.tags.ilike(query) |
-        models.Place.description.ilike(query) |
-        models.Place.location.ilike(query)
-    ).all()
-    for p in places:
-        add_result(p, "Place")
-
-    # Hotels
-    hotels = db.query(models.Hotel).filter(
-        models.Hotel.name.ilike(query) |
-        models.Hotel.tags.ilike(query) |
-        models.Hotel.description.ilike(query)
-    ).all()
-    for h in hotels:
-        add_result(h, "Hotel")
-
-    # Restaurants
-    restaurants = db.query(models.Restaurant).filter(
-        models.Restaurant.name.ilike(query) |
-        models.Restaurant.tags.ilike(query) |
-        models.Restaurant.description.ilike(query)
-    ).all()
-    for r in restaurants:
-        add_result(r, "Restaurant")
-
-    # Attractions
-    attractions = db.query(models.Attraction).filter(
-        models.Attraction.name.ilike(query) |
-        models.Attraction.tags.ilike(query) |
-        models.Attraction.description.ilike(query)
-    ).all()
-    for a in attractions:
-        add_result(a, "Attraction")
-
-    db.close()
-    return jsonify({"results": results})
+    limit = parse_limit(request.args.get("limit"))
+    count_mode = request.args.get("count", "").lower()
+    selected = _facet_selection()
+    want_facets = request.args.get("facets", "").lower() in ("1", "true")
+
+    bits = None
+    if request.args.get("month"):
+        bits = month_bits(request.args["month"])
+        if bits is None:
+            return jsonify({"error": "Invalid month"}), 400
+
+    try:
+        after = decode_cursor(request.args.get("cursor"))
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    db = get_session()
+    rowids = counts = None
+    if selected or want_facets:
+        # Text and month matches become a bitset; the facets are bitset ops on top
+        index = facet_index.get()
+        matches = search_index.matching_rowids(db, q, bits)
+        base = None if matches is None else index.mask_for_rowids(matches)
+        mask, counts = index.query(selected, base)
+        if selected:
+            rowids = index.rowids_in(mask)
+            if count_mode == "only":
+                return jsonify({"total": index.count(mask)})
+
+    if count_mode == "only":
+        return jsonify({"total": search_index.count(db, q, bits)})
+
+    try:
+        total = None
+        if count_mode in ("1", "true"):
+            total = len(rowids) if rowids is not None else search_index.count(db, q, bits)
+        # Read before the rows: a write in between only makes the next cursor stale
+        version = search_index.index_version(db)
+        # Ask for one extra row to know whether there is a next page
+        rows = search_index.search(db, q, limit=limit + 1, after=after, month_bits=bits, rowids=rowids)
+    except search_index.StaleCursor:
+        return jsonify({"error": "The catalog changed; start again from the first page"}), 409
+    except ValueError:
+        return jsonify({"error": "Cursor does not match this query"}), 400
+
+    page = {"next_cursor": None}
+    if want_facets:
+        page["facets"] = _facet_counts(counts)
+
+    def results():
+        last = None
+        for i, hit in enumerate(rows):
+            if i == limit:
+                page["next_cursor"] = encode_cursor(search_index.cursor_key(last, version))
+                break
+            last = hit
+            yield _search_result(hit)
+
+    def trailer():
+        if total is not None:
+            page["total"] = total
+        return page
+
+    # Results are written out as they are read from SQLite; the request's
+    # session stays open until the stream ends
+    return Response(
+        stream_with_context(stream_json_array("results", results(), trailer)),
+        mimetype="application/json"
+    )
+
+
+# ---------------------- SUGGEST ROUTE ----------------------
+@search_blueprint.route("/suggest", methods=["GET"])
+def suggest():
+    """Typo-tolerant autocomplete served from memory (no database access)"""
+    q = request.args.get("q", "")
+    limit = parse_limit(request.args.get("limit"), default=8, maximum=20)
+    suggestions = suggest_index.get().suggest(q, limit)
+    return jsonify({
+        "suggestions": [{"name": name, "type": kind} for name, kind in suggestions]
+    })
 
 
 # ---------------------- DETAILS ROUTE ----------------------
 @search_blueprint.route("/details/<string:type>/<string:name>/", methods=["GET"])
 def get_details(type, name):
-    db = SessionLocal()
+    db = get_session()
     obj = None
 
     t = type.lower()
@@ -109,13 +180,17 @@ def get_details(type, name):
         obj = db.query(models.Attraction).filter(models.Attraction.name == name).first()
 
     if not obj:
-        db.close()
         return jsonify({"error": f"No {type} found with name '{name}'"}), 404
 
-    # Handle images - use image_url for Places, folder images for others
-    if hasattr(obj, 'image_url') and obj.image_url:
+    # Handle images - uploaded images for Places, image_url or folder images for others
+    images = []
+    if t == "place":
+        images = [url for (url,) in db.query(models.PlaceImage.url).filter(
+            models.PlaceImage.place_id == obj.id
+        ).order_by(models.PlaceImage.position)]
+    if not images and getattr(obj, 'image_url', None):
         images = [obj.image_url]
-    else:
+    elif not images:
         images = get_images_for_place(obj.name)
 
     result = {
@@ -123,9 +198,18 @@ def get_details(type, name):
         "description": obj.description or "",
         "location": obj.location or "",
         "tags": obj.tags or "",
-        "images": images,
+        "images": asset_index.urls(derivatives.urls(images, "medium")),
         "wikipedia_url": f"https://en.wikipedia.org/wiki/{obj.name.replace(' ', '_')}"
     }
 
-    db.close()
+    # Hotels listed near the attraction in hotel.csv, best rated first
+    if t == "attraction":
+        result["hotels"] = [hotel._asdict() for hotel in destination_hotels.get().best(obj.id, limit=5)]
+
+    # Precomputed content-based recommendations, when the item is in the catalog model
+    item_id = similar_items.find_id(t, obj.name)
+    if item_id:
+        result["recommendation_id"] = item_id
+        result["similar"] = similar_items.similar(item_id, 5)
+
     return jsonify(result)
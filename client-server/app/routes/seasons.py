@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify
+from ..seasons import season_index, month_bits, describe
+from ..pagination import parse_limit, encode_cursor, decode_cursor, InvalidCursor
+
+seasons_bp = Blueprint('seasons', __name__)
+
+@seasons_bp.route('/seasons/<month>', methods=['GET'])
+def visit_in_month(month):
+    """
+    Attractions whose best season includes ``month`` (1-12, a month name or a
+    Nepali month such as ``baisakh``), in id order with ``limit``/``cursor``.
+    """
+    bits = month_bits(month)
+    if bits is None:
+        return jsonify({'error': f"Unknown month '{month}'"}), 400
+
+    limit = parse_limit(request.args.get('limit'))
+    try:
+        after = decode_cursor(request.args.get('cursor'), size=1)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    if after is not None and not isinstance(after[0], int):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    # One extra record tells whether there is a next page
+    records, total = season_index.get().page(bits, limit + 1, after[0] if after else None)
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor([records[-1][0]])
+
+    return jsonify({
+        'month': describe(bits),
+        'total': total,
+        'results': [
+            {
+                'id': attraction_id,
+                'name': name,
+                'district': district,
+                'best_months': describe(mask)
+            }
+            for attraction_id, name, district, mask in records
+        ],
+        'next_cursor': next_cursor
+    })
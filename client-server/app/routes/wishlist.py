@@ -1,62 +1,31 @@
 from flask import Blueprint, request, jsonify
-from ..database import SessionLocal
+from ..database import get_session
 from .. import crud
-import random
 
 wishlist_bp = Blueprint('wishlist', __name__)
 
 @wishlist_bp.route('/wishlist/<user_id>', methods=['GET'])
 def get_user_wishlist(user_id):
     """Get all places in user's wishlist"""
-    db = SessionLocal()
     try:
-        wishlist_items = crud.get_user_wishlist(db, user_id)
-        
-        result = []
-        for wishlist_item, place in wishlist_items:
-            # Generate realistic additional data for tourism
-            categories = ['trekking', 'culture', 'nature', 'wildlife', 'adventure', 'heritage']
-            difficulties = ['Easy', 'Moderate', 'Challenging', 'Moderate to Challenging']
-            durations = ['1 day', '2 days', '3 days', '5 days', '7 days', '10 days', '14 days', '16 days']
-            
-            # Generate consistent data based on place ID for consistency
-            random.seed(place.id)
-            
-            place_data = {
-                'id': place.id,
-                'name': place.name,
-                'location': place.location or 'Nepal',
-                'description': place.description or f'Explore the beautiful {place.name} and discover its unique charm.',
-                'image': place.image_url or 'https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=800',
-                'category': place.type or random.choice(categories),
-                'rating': round(4.2 + random.random() * 0.7, 1),  # 4.2-4.9 range
-                'reviews': random.randint(500, 3000),
-                'duration': random.choice(durations),
-                'difficulty': random.choice(difficulties),
-                'price': f'${random.randint(200, 1500)}',
-                'tags': place.tags or '',
-                'added_at': wishlist_item.created_at.isoformat() if wishlist_item.created_at else None
-            }
-            result.append(place_data)
-        
-        return jsonify(result)
-    
+        response = jsonify(crud.get_user_wishlist(get_session(), user_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
+
+    # Same wishlist -> same bytes, so clients can revalidate with If-None-Match
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @wishlist_bp.route('/wishlist/<user_id>/<int:place_id>', methods=['POST'])
 def add_to_wishlist(user_id, place_id):
     """Add place to user's wishlist"""
-    db = SessionLocal()
     try:
-        # Check if place exists
-        place = crud.get_place_by_id(db, place_id)
-        if not place:
+        if not crud.add_to_wishlist(user_id, place_id):
             return jsonify({'error': 'Place not found'}), 404
-        
-        wishlist_item = crud.add_to_wishlist(db, user_id, place_id)
+
+        wishlist_item = crud.get_wishlist_item(get_session(), user_id, place_id)
         return jsonify({
             'success': True,
             'message': 'Added to wishlist',
@@ -65,15 +34,12 @@ def add_to_wishlist(user_id, place_id):
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
 @wishlist_bp.route('/wishlist/<user_id>/<int:place_id>', methods=['DELETE'])
 def remove_from_wishlist(user_id, place_id):
     """Remove place from user's wishlist"""
-    db = SessionLocal()
     try:
-        success = crud.remove_from_wishlist(db, user_id, place_id)
+        success = crud.remove_from_wishlist(user_id, place_id)
         if success:
             return jsonify({
                 'success': True,
@@ -84,18 +50,66 @@ def remove_from_wishlist(user_id, place_id):
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
 @wishlist_bp.route('/wishlist/<user_id>/<int:place_id>/check', methods=['GET'])
 def check_wishlist_status(user_id, place_id):
     """Check if place is in user's wishlist"""
-    db = SessionLocal()
+    db = get_session()
     try:
         is_in_wishlist = crud.is_in_wishlist(db, user_id, place_id)
         return jsonify({'in_wishlist': is_in_wishlist})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
\ No newline at end of file
+
+
+# -----------------------------
+# Batch operations
+# -----------------------------
+def _place_ids(value):
+    """A list of integer place IDs from JSON or a comma-separated query string, else None"""
+    if isinstance(value, str):
+        value = [v for v in value.split(',') if v.strip()]
+    if not isinstance(value, list) or len(value) > crud.MAX_WISHLIST_BATCH:
+        return None
+    try:
+        return [int(v) for v in value]
+    except (TypeError, ValueError):
+        return None
+
+@wishlist_bp.route('/wishlist/<user_id>/batch', methods=['POST'])
+def batch_update_wishlist(user_id):
+    """
+    Add, remove and check many places in one transaction.
+    Body: {"add": [ids], "remove": [ids], "check": [ids]}; adds are applied first.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = {key: _place_ids(data.get(key, [])) for key in ('add', 'remove', 'check')}
+    invalid = [key for key, value in ids.items() if value is None]
+    if invalid:
+        return jsonify({'error': f"'{invalid[0]}' must be a list of at most "
+                                 f"{crud.MAX_WISHLIST_BATCH} place IDs"}), 400
+
+    try:
+        changes = crud.update_wishlist(user_id, ids['add'], ids['remove'], ids['check'])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    saved = set(changes.saved)
+    return jsonify({
+        'success': True,
+        'added': changes.added,
+        'removed': changes.removed,
+        'not_found': changes.missing,
+        'in_wishlist': {str(pid): pid in saved for pid in ids['check']}
+    })
+
+@wishlist_bp.route('/wishlist/<user_id>/check', methods=['GET'])
+def batch_check_wishlist(user_id):
+    """Membership for a whole results page: ?ids=1,2,3"""
+    place_ids = _place_ids(request.args.get('ids', ''))
+    if place_ids is None:
+        return jsonify({'error': f'ids must be at most {crud.MAX_WISHLIST_BATCH} comma-separated place IDs'}), 400
+
+    saved = set(crud.wishlisted_places(get_session(), user_id, place_ids))
+    return jsonify({'in_wishlist': {str(pid): pid in saved for pid in place_ids}})
@@ -0,0 +1,229 @@
+"""
+Full-text search index for places, hotels, restaurants and attractions.
+
+All four tables are mirrored into a single SQLite FTS5 table that is kept in
+sync by triggers, so one MATCH query returns every entity type ranked by BM25.
+"""
+
+import json
+import re
+import zlib
+from sqlalchemy import text
+
+FTS_TABLE = "search_index"
+
+# Entity label -> (table name, kind code). The FTS rowid is ``id * 4 + kind`` so
+# every row of the four source tables maps to a unique, directly addressable
+# rowid and the triggers never have to scan the index.
+ENTITY_KINDS = {
+    "Place": ("places", 0),
+    "Hotel": ("hotels", 1),
+    "Restaurant": ("restaurants", 2),
+    "Attraction": ("attractions", 3),
+}
+KIND_COUNT = 4
+
+# BM25 weights, one per FTS column in declaration order (name > tags > location > description)
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 0.0, 0.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ------------------ SCHEMA ------------------
+
+def _create_statements():
+    statements = [f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            name, tags, location, description,
+            type UNINDEXED, image_url UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """]
+
+    for label, (table, kind) in ENTITY_KINDS.items():
+        insert_new = f"""
+            INSERT INTO {FTS_TABLE}(rowid, name, tags, location, description, type, image_url)
+            VALUES (new.id * {KIND_COUNT} + {kind}, new.name, new.tags, new.location,
+                    new.description, '{label}', new.image_url);
+        """
+        delete_old = f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id * {KIND_COUNT} + {kind};"
+
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN
+                {insert_new}
+            END
+        """)
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN
+                {delete_old}
+            END
+        """)
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE ON {table} BEGIN
+                {delete_old}
+                {insert_new}
+            END
+        """)
+    return statements
+
+
+def _populate(conn):
+    """Copy every row of the source tables into the FTS table"""
+    conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    for label, (table, kind) in ENTITY_KINDS.items():
+        conn.execute(text(f"""
+            INSERT INTO {FTS_TABLE}(rowid, name, tags, location, description, type, image_url)
+            SELECT id * {KIND_COUNT} + {kind}, name, tags, location, description, :label, image_url
+            FROM {table}
+        """), {"label": label})
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def init_search_index(engine):
+    """Create the FTS table and sync triggers, populating the index on first run"""
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"
+        ), {"name": FTS_TABLE}).first()
+
+        for statement in _create_statements():
+            conn.execute(text(statement))
+
+        if not exists:
+            _populate(conn)
+            print("✅ Search index built")
+
+
+def rebuild_search_index(engine):
+    """Rebuild the whole index from the source tables (e.g. after bulk edits with triggers off)"""
+    with engine.begin() as conn:
+        for statement in _create_statements():
+            conn.execute(text(statement))
+        _populate(conn)
+
+
+# ------------------ QUERYING ------------------
+
+def build_match_query(q: str) -> str:
+    """Turn free text into an FTS5 query where every token must match as a prefix"""
+    tokens = _TOKEN_RE.findall(q.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _score_expr():
+    weights = ", ".join(str(w) for w in COLUMN_WEIGHTS)
+    return f"bm25({FTS_TABLE}, {weights})"
+
+
+def _filters(match, month_bits, params, rowids=None):
+    """WHERE clause for the FTS match, the optional best-season month filter and facet rowids"""
+    conditions = []
+    if match:
+        conditions.append(f"{FTS_TABLE} MATCH :match")
+        params["match"] = match
+    if month_bits:
+        # Drop attractions whose known best season misses the month; rows
+        # without season data (hotels, restaurants, unparsed seasons) stay.
+        _, kind = ENTITY_KINDS["Attraction"]
+        conditions.append(f"""rowid NOT IN (
+            SELECT id * {KIND_COUNT} + {kind} FROM attractions
+            WHERE season_mask > 0 AND (season_mask & :month_bits) = 0
+        )""")
+        params["month_bits"] = month_bits
+    if rowids is not None:
+        # Rows left by the facet filters (see facets.py), bound as one JSON array
+        conditions.append("rowid IN (SELECT value FROM json_each(:rowids))")
+        params["rowids"] = json.dumps([int(r) for r in rowids])
+    return ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+
+def search(db, q: str, limit=None, after=None, month_bits=None, rowids=None):
+    """
+    Return ranked rows (rowid, type, name, location, description, tags,
+    image_url, score) for ``q``, ordered by (score, rowid).
+
+    ``after`` is the ``cursor_key`` of the last row of the previous page
+    (a ranked key from before the last index write raises ``StaleCursor``),
+    ``month_bits`` an optional month mask (see seasons.py) and ``rowids`` the
+    rows allowed by facet filters; rows are streamed from SQLite, so callers
+    should iterate the result rather than fetching it all.
+    """
+    match = build_match_query(q)
+    columns = "rowid, type, name, location, description, tags, image_url"
+    params = {"limit": -1 if limit is None else limit}
+    where = _filters(match, month_bits, params, rowids)
+
+    if not match:
+        # No tokens: the whole catalog in rowid order
+        after_clause = ""
+        if after is not None:
+            _check_key(after, 1)
+            after_clause = f"{'AND' if where else 'WHERE'} rowid > :after_rowid"
+            params["after_rowid"] = after[0]
+        return db.execute(text(f"""
+            SELECT {columns}, NULL AS score FROM {FTS_TABLE} {where} {after_clause}
+            ORDER BY rowid LIMIT :limit
+        """), params)
+
+    after_clause = ""
+    if after is not None:
+        _check_key(after, 3)
+        if after[2] != index_version(db):
+            raise StaleCursor("the search index changed since this cursor was issued")
+        after_clause = "WHERE score > :after_score OR (score = :after_score AND rowid > :after_rowid)"
+        params["after_score"], params["after_rowid"] = after[:2]
+    return db.execute(text(f"""
+        SELECT * FROM (
+            SELECT {columns}, {_score_expr()} AS score FROM {FTS_TABLE} {where}
+        ) {after_clause}
+        ORDER BY score, rowid LIMIT :limit
+    """), params)
+
+
+def count(db, q: str, month_bits=None) -> int:
+    """Number of rows matching ``q`` without fetching them"""
+    params = {}
+    where = _filters(build_match_query(q), month_bits, params)
+    return db.execute(text(f"SELECT count(*) FROM {FTS_TABLE} {where}"), params).scalar()
+
+
+def matching_rowids(db, q: str, month_bits=None):
+    """Rowids of every row matching ``q``, or None when nothing narrows the catalog"""
+    params = {}
+    where = _filters(build_match_query(q), month_bits, params)
+    if not where:
+        return None
+    return [rowid for (rowid,) in db.execute(text(f"SELECT rowid FROM {FTS_TABLE} {where}"), params)]
+
+
+def index_version(db) -> int:
+    """
+    Checksum of the FTS5 averages and structure records, which change with
+    every write to the index. BM25 scores depend on the whole index (row
+    count, average lengths, term frequencies), so a ranked cursor is only
+    valid while this stays the same.
+    """
+    blocks = db.execute(text(
+        f"SELECT block FROM {FTS_TABLE}_data WHERE id IN (1, 10) ORDER BY id"
+    )).scalars().all()
+    return zlib.crc32(b"".join(blocks))
+
+
+def cursor_key(row, version=None):
+    """
+    Sort key of a row returned by ``search``, for building the next-page
+    cursor. Ranked keys carry the ``index_version`` they were read at.
+    """
+    if row.score is None:
+        return [row.rowid]
+    return [row.score, row.rowid, version]
+
+
+class StaleCursor(ValueError):
+    """Raised for a ranked cursor issued before the index last changed"""
+
+
+def _check_key(key, size):
+    if len(key) != size or not all(isinstance(v, (int, float)) for v in key):
+        raise ValueError("cursor does not match this query")
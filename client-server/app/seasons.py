@@ -0,0 +1,173 @@
+"""
+Best-season parsing and month filtering.
+
+The free-text "Best Season" column of attraction.csv ("Mar-May, Sep-Nov",
+"Oct–Mar", "Spring/Autumn", "All Year", ...) is parsed once at ingest into a
+12-bit mask, bit 0 = January ... bit 11 = December, stored in
+``attractions.season_mask``. Month filters are then plain bitmask tests.
+
+Bikram Sambat months are accepted too; each one straddles two Gregorian months
+(Baisakh is mid-April to mid-May), so it maps to both of them.
+"""
+
+import re
+
+import numpy as np
+
+from .database import SessionLocal
+from . import models
+from .shared_index import SharedIndex
+
+ALL_MONTHS = (1 << 12) - 1
+
+MONTH_NAMES = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+
+_MONTHS = {}
+for _i, _name in enumerate(MONTH_NAMES):
+    _MONTHS[_name] = _i
+    _MONTHS[_name[:3]] = _i
+_MONTHS["sept"] = 8
+
+# Bikram Sambat month -> first Gregorian month it overlaps (it runs into the next one)
+BS_MONTHS = {
+    "baisakh": 3, "baishakh": 3, "vaishakh": 3, "besakh": 3,
+    "jestha": 4, "jeth": 4,
+    "ashadh": 5, "asadh": 5, "asar": 5, "ashar": 5,
+    "shrawan": 6, "srawan": 6, "saun": 6, "sawan": 6,
+    "bhadra": 7, "bhadau": 7,
+    "ashwin": 8, "asoj": 8,
+    "kartik": 9,
+    "mangsir": 10, "mangshir": 10,
+    "poush": 11, "paush": 11, "push": 11,
+    "magh": 0,
+    "falgun": 1, "fagun": 1, "phalgun": 1,
+    "chaitra": 2, "chait": 2,
+}
+
+# Season name -> (first month, last month), as used for travel in Nepal
+SEASONS = {
+    "spring": (2, 4),
+    "summer": (5, 7),
+    "monsoon": (5, 8),
+    "autumn": (8, 10),
+    "fall": (8, 10),
+    "winter": (11, 1),
+}
+
+_ALL_YEAR_RE = re.compile(r"\b(all[\s-]*year|year[\s-]*round|any\s*time|throughout the year)\b")
+_TOKEN_RE = re.compile(r"[a-z]+|-")
+
+
+def _span(first, last):
+    """Mask of the months from ``first`` to ``last`` inclusive, wrapping past December"""
+    mask = 0
+    month = first
+    while True:
+        mask |= 1 << month
+        if month == last:
+            return mask
+        month = (month + 1) % 12
+
+
+def _term(word):
+    """(first month, last month) for a month, BS month or season word, else None"""
+    if word in _MONTHS:
+        return _MONTHS[word], _MONTHS[word]
+    if word in BS_MONTHS:
+        return BS_MONTHS[word], (BS_MONTHS[word] + 1) % 12
+    if word in SEASONS:
+        return SEASONS[word]
+    return None
+
+
+def parse_season(text):
+    """12-bit month mask for a free-text season description (0 if nothing is recognised)"""
+    text = (text or "").lower()
+    if _ALL_YEAR_RE.search(text):
+        return ALL_MONTHS
+
+    text = re.sub(r"[‐-―]|\bto\b|\btill\b|\buntil\b", "-", text)
+    tokens = _TOKEN_RE.findall(text)
+
+    mask = 0
+    i = 0
+    while i < len(tokens):
+        term = _term(tokens[i])
+        if term is None:
+            i += 1
+            continue
+        # "X - Y" is a range from the start of X to the end of Y
+        if i + 2 < len(tokens) and tokens[i + 1] == "-" and _term(tokens[i + 2]):
+            mask |= _span(term[0], _term(tokens[i + 2])[1])
+            i += 3
+        else:
+            mask |= _span(*term)
+            i += 1
+    return mask
+
+
+def month_bits(value):
+    """
+    Mask for a month given as 1-12, an English name/abbreviation or a Bikram
+    Sambat month name. Returns None if the value is not a month.
+    """
+    value = (value or "").strip().lower()
+    if value.isdigit():
+        month = int(value)
+        return 1 << (month - 1) if 1 <= month <= 12 else None
+    if value in _MONTHS:
+        return 1 << _MONTHS[value]
+    if value in BS_MONTHS:
+        return _span(BS_MONTHS[value], (BS_MONTHS[value] + 1) % 12)
+    return None
+
+
+def describe(mask):
+    """Month names in a mask, e.g. ['Mar', 'Apr', 'May']"""
+    return [MONTH_NAMES[m][:3].title() for m in range(12) if mask & (1 << m)]
+
+
+# ------------------ MONTH INDEX ------------------
+
+class SeasonIndex:
+    """Attractions and their season masks as NumPy arrays"""
+
+    def __init__(self, records=()):
+        records = list(records)
+        self.ids = np.array([r[0] for r in records], dtype=np.int64)
+        self.names = [r[1] for r in records]
+        self.districts = [r[2] or "" for r in records]
+        self.masks = np.array([r[3] or 0 for r in records], dtype=np.uint16)
+
+    def matching(self, bits):
+        """Positions of attractions whose best season overlaps ``bits``"""
+        return np.flatnonzero(self.masks & np.uint16(bits))
+
+    def page(self, bits, limit, after_id=None):
+        """(records, total) for one id-ordered page of attractions in season"""
+        positions = self.matching(bits)
+        start = 0
+        if after_id is not None:
+            start = int(np.searchsorted(self.ids[positions], after_id, side="right"))
+        records = [
+            (int(self.ids[i]), self.names[i], self.districts[i], int(self.masks[i]))
+            for i in positions[start:start + limit]
+        ]
+        return records, len(positions)
+
+
+def load_records():
+    db = SessionLocal()
+    try:
+        return db.query(
+            models.Attraction.id, models.Attraction.name,
+            models.Attraction.district, models.Attraction.season_mask
+        ).filter(models.Attraction.season_mask > 0).order_by(models.Attraction.id).all()
+    finally:
+        db.close()
+
+
+season_index = SharedIndex(lambda: SeasonIndex(load_records()), "season index")
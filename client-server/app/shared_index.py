@@ -0,0 +1,88 @@
+"""
+Process-wide in-memory indexes that are rebuilt off the request path.
+
+``SharedIndex(build)`` holds the value returned by ``build()``. The first
+``get()`` builds it synchronously (create_app warms every index, so that
+happens at startup). After a catalog write, ``invalidate()`` schedules a
+rebuild on a background thread and requests keep being served from the
+current index until the new one is swapped in.
+
+Rebuilds never overlap: ``BackgroundRebuild`` runs at most one at a time,
+and invalidations that arrive while one is running mark the index dirty so
+exactly one more rebuild follows, which picks up all of them.
+"""
+
+import threading
+
+
+class BackgroundRebuild:
+    """Runs ``fn`` on a background thread, one run at a time, coalescing requests"""
+
+    def __init__(self, fn, name):
+        self._fn = fn
+        self.name = name
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._running = False
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def request(self):
+        """Ask for a run; returns at once"""
+        with self._lock:
+            self._dirty = True
+            if self._running:
+                return
+            self._running = True
+            self._idle.clear()
+        threading.Thread(target=self._loop, name=f"rebuild-{self.name}", daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Block until no run is pending; False on timeout"""
+        return self._idle.wait(timeout)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    self._running = False
+                    self._idle.set()
+                    return
+                self._dirty = False
+            try:
+                self._fn()
+            except Exception as e:
+                print(f"⚠️ Rebuilding {self.name} failed: {e}")
+
+
+class SharedIndex:
+    """Lazily built process-wide index, rebuilt in the background when invalidated"""
+
+    def __init__(self, build, name):
+        self._build = build
+        self.name = name
+        self._value = None
+        self._lock = threading.Lock()
+        self._rebuild = BackgroundRebuild(self._refresh, name)
+
+    def get(self):
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._build()
+                value = self._value
+        return value
+
+    def invalidate(self):
+        """Rebuild in the background (call after catalog writes); the current index stays in use"""
+        if self._value is None:
+            return  # never built: the next get() builds from the current data
+        self._rebuild.request()
+
+    def wait(self, timeout=None):
+        """Wait for a pending rebuild to be swapped in (scripts and tests)"""
+        return self._rebuild.wait(timeout)
+
+    def _refresh(self):
+        self._value = self._build()
@@ -0,0 +1,203 @@
+"""
+Cache-friendly serving of dataset and upload files (``/datasets/<path>``).
+
+* A hash index (``cache/asset_index.json``) maps every file under
+  ``datasets/`` to its (mtime, size, content hash). It is built once on
+  startup; afterwards a request costs one ``stat`` and files are only re-hashed
+  when their mtime or size changes.
+* URLs handed out in API responses carry the content hash
+  (``datasets/.../a.jpg?v=<hash>``). A request whose ``v`` matches the current
+  hash is immutable and is cached for a year; anything else must revalidate.
+* The hash doubles as a strong ETag, so revalidation and ``If-None-Match``
+  give 304s, and werkzeug's conditional responses handle ``Range`` requests.
+* Every response is logged with its status, size, time and the running
+  client-cache hit ratio (share of requests answered with a 304).
+"""
+
+import json
+import os
+import threading
+import time
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+from .database import BASE_DIR
+from .thumbnails import file_hash
+
+DATASETS_ROOT = os.path.join(BASE_DIR, "datasets")
+URL_PREFIX = "datasets/"
+INDEX_CACHE = os.path.join(BASE_DIR, "cache", "asset_index.json")
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 16
+SAVE_INTERVAL = 30.0
+
+_FORMAT_VERSION = 1
+
+
+class AssetIndex:
+    """relative path -> [mtime_ns, size, content hash] for files under DATASETS_ROOT"""
+
+    def __init__(self, root=DATASETS_ROOT, cache_path=INDEX_CACHE):
+        self.root = root
+        self.cache_path = cache_path
+        self._entries = {}
+        self._dirty = False
+        self._next_save = 0.0
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.cache_hits = 0   # 304 Not Modified
+        self.partial = 0      # 206 range responses
+
+    # ------------------ INDEX ------------------
+
+    def warm(self):
+        """Hash every file not already indexed with its current mtime/size"""
+        started = time.perf_counter()
+        self._load()
+        entries = {}
+        hashed = 0
+        for folder, _, files in os.walk(self.root, followlinks=True):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                full_path = os.path.join(folder, name)
+                relative = os.path.relpath(full_path, self.root).replace("\\", "/")
+                entry = self._entry(relative, full_path, self._entries.get(relative))
+                if entry:
+                    hashed += entry is not self._entries.get(relative)
+                    entries[relative] = entry
+        with self._lock:
+            self._entries = entries
+            self._dirty = True
+        self._save()
+        print(f"✅ Asset index: {len(entries)} files ({hashed} hashed) "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def _entry(self, relative, full_path, entry):
+        """Current entry for a file, reusing ``entry`` if mtime and size match"""
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry
+        return [stat.st_mtime_ns, stat.st_size, file_hash(full_path)[:HASH_LENGTH]]
+
+    def lookup(self, relative, full_path):
+        """Up-to-date entry for a file being served (None if it does not exist)"""
+        cached = self._entries.get(relative)
+        entry = self._entry(relative, full_path, cached)
+        if entry is not cached:
+            with self._lock:
+                if entry:
+                    self._entries[relative] = entry
+                else:
+                    self._entries.pop(relative, None)
+                self._dirty = True
+            self._save_later()
+        return entry
+
+    # ------------------ URLS ------------------
+
+    def url(self, path):
+        """
+        Content-hashed URL for a dataset path (``datasets/...`` or
+        ``/datasets/...``); other URLs are returned unchanged.
+        """
+        if not path or "://" in path:
+            return path
+        normalized = path.replace("\\", "/")
+        stripped = normalized.lstrip("/")
+        if not stripped.startswith(URL_PREFIX):
+            return path
+        relative = stripped[len(URL_PREFIX):]
+        entry = self._entries.get(relative)
+        if entry is None:
+            full_path = safe_join(self.root, relative)
+            entry = full_path and self.lookup(relative, full_path)
+            if not entry:
+                return path
+        return f"{normalized}?v={entry[2]}"
+
+    def urls(self, paths):
+        return [self.url(path) for path in paths]
+
+    # ------------------ PERSISTENCE ------------------
+
+    def _load(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == _FORMAT_VERSION:
+            self._entries = data["files"]
+
+    def _save_later(self):
+        if time.monotonic() >= self._next_save:
+            self._save()
+
+    def _save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": _FORMAT_VERSION, "files": dict(self._entries)}
+            self._dirty = False
+            self._next_save = time.monotonic() + SAVE_INTERVAL
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not persist asset index: {e}")
+
+    # ------------------ SERVING ------------------
+
+    def serve(self, filename):
+        """Send a file under DATASETS_ROOT with ETag, Cache-Control and Range support"""
+        started = time.perf_counter()
+        full_path = safe_join(self.root, filename)
+        if full_path is None or not os.path.isfile(full_path):
+            abort(404)
+        entry = self.lookup(filename.replace("\\", "/"), full_path)
+        if entry is None:
+            abort(404)
+
+        response = send_file(full_path, etag=entry[2], conditional=True, last_modified=entry[0] / 1e9)
+        response.headers["Accept-Ranges"] = "bytes"
+        if request.args.get("v") == entry[2]:
+            # The URL names this exact content, so it can never change
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+
+        self._log(filename, response, started)
+        return response
+
+    def _log(self, filename, response, started):
+        with self._lock:
+            self.requests += 1
+            if response.status_code == 304:
+                self.cache_hits += 1
+            elif response.status_code == 206:
+                self.partial += 1
+            ratio = self.cache_hits / self.requests
+        current_app.logger.info(
+            "static %s %d %sB %.2fms cache-hit-ratio=%.1f%% (%d/%d, %d ranges)",
+            filename, response.status_code,
+            0 if response.status_code == 304 else response.content_length or 0,
+            (time.perf_counter() - started) * 1000, ratio * 100,
+            self.cache_hits, self.requests, self.partial,
+        )
+
+
+# Shared instance used by the app and the routes
+asset_index = AssetIndex()
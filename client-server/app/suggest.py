@@ -0,0 +1,224 @@
+"""
+In-memory autocomplete index for the search box.
+
+Names of places, hotels, restaurants, attractions, districts and provinces are
+collected from the database and the dataset CSVs once, then served without
+touching SQLite:
+
+* prefix matches come from a sorted array of name keys (one key per word
+  start, so "durbar" finds "Kathmandu Durbar Square") searched with bisect;
+* typo-tolerant matches come from a symmetric-delete dictionary over the
+  name vocabulary, so "pokara" finds "Pokhara".
+"""
+
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from .database import SessionLocal
+from .shared_index import SharedIndex
+from . import models
+from .datasets import (
+    ATTRACTIONS_CSV, HOTELS_CSV, RESTAURANTS_CSV, PROVINCE_NAMES, read_rows,
+)
+
+# Lower rank is shown first when match quality is equal
+KIND_RANK = {
+    "Place": 0,
+    "Attraction": 1,
+    "District": 2,
+    "Province": 3,
+    "Hotel": 4,
+    "Restaurant": 5,
+}
+
+MIN_FUZZY_LENGTH = 4
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+def max_distance(word):
+    """Edit distance allowed for a word of this length"""
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(word) <= 7 else 2
+
+
+def _deletes(word, distance):
+    """All strings reachable from ``word`` by deleting up to ``distance`` characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SuggestIndex:
+    """Prefix + symmetric-delete index over catalog names"""
+
+    def __init__(self, entries=()):
+        self.entries = []        # [(name, kind)]
+        self._keys = []          # sorted [(normalized suffix, entry id, word position)]
+        self._word_entries = defaultdict(set)   # word -> entry ids
+        self._deletes = defaultdict(set)        # delete variant -> words
+        self._build(entries)
+
+    def _build(self, entries):
+        seen = set()
+        keys = []
+        for name, kind in entries:
+            norm = normalize(name)
+            if not norm or (norm, kind) in seen:
+                continue
+            seen.add((norm, kind))
+            entry_id = len(self.entries)
+            self.entries.append((name, kind))
+
+            words = norm.split()
+            for position in range(len(words)):
+                keys.append((" ".join(words[position:]), entry_id, position))
+            for word in words:
+                self._word_entries[word].add(entry_id)
+
+        keys.sort()
+        self._keys = keys
+        for word in self._word_entries:
+            for variant in _deletes(word, max_distance(word)):
+                self._deletes[variant].add(word)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ------------------ LOOKUP ------------------
+
+    def _prefix_matches(self, query, cap):
+        """entry id -> word position of the best prefix match"""
+        matches = {}
+        i = bisect_left(self._keys, (query,))
+        while i < len(self._keys) and len(matches) < cap:
+            key, entry_id, position = self._keys[i]
+            if not key.startswith(query):
+                break
+            if position < matches.get(entry_id, position + 1):
+                matches[entry_id] = position
+            i += 1
+        return matches
+
+    def _similar_words(self, token):
+        """word -> edit distance for vocabulary words close to ``token``"""
+        limit = max_distance(token)
+        if not limit:
+            return {token: 0} if token in self._word_entries else {}
+        candidates = set()
+        for variant in _deletes(token, limit):
+            candidates |= self._deletes.get(variant, set())
+        found = {}
+        for word in candidates:
+            distance = edit_distance(token, word, limit)
+            if distance <= limit:
+                found[word] = distance
+        return found
+
+    def _fuzzy_matches(self, tokens):
+        """entry id -> total edit distance, for entries matching every token"""
+        result = None
+        for token in tokens:
+            distances = {}
+            for word, distance in self._similar_words(token).items():
+                for entry_id in self._word_entries[word]:
+                    if distance < distances.get(entry_id, distance + 1):
+                        distances[entry_id] = distance
+            if result is None:
+                result = distances
+            else:
+                result = {e: d + distances[e] for e, d in result.items() if e in distances}
+            if not result:
+                return {}
+        return result or {}
+
+    def suggest(self, query, limit=8):
+        """Return up to ``limit`` (name, kind) suggestions for a partially typed query"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        # Score tuples sort best-first: (match class, distance, kind rank, name length)
+        scored = {}
+        for entry_id, position in self._prefix_matches(query, cap=limit * 50).items():
+            scored[entry_id] = (0 if position == 0 else 1, 0)
+
+        if len(scored) < limit:
+            for entry_id, distance in self._fuzzy_matches(query.split()).items():
+                scored.setdefault(entry_id, (2, distance))
+
+        ranked = sorted(
+            scored.items(),
+            key=lambda item: (
+                item[1],
+                KIND_RANK.get(self.entries[item[0]][1], len(KIND_RANK)),
+                len(self.entries[item[0]][0]),
+                self.entries[item[0]][0],
+            ),
+        )
+        return [self.entries[entry_id] for entry_id, _ in ranked[:limit]]
+
+
+# ------------------ INDEX SOURCES ------------------
+
+def collect_entries():
+    """(name, kind) pairs from the database tables and the dataset CSVs"""
+    entries = []
+
+    db = SessionLocal()
+    try:
+        for model, kind in (
+            (models.Place, "Place"),
+            (models.Attraction, "Attraction"),
+            (models.Hotel, "Hotel"),
+            (models.Restaurant, "Restaurant"),
+        ):
+            entries.extend((name, kind) for (name,) in db.query(model.name))
+    finally:
+        db.close()
+
+    try:
+        for row in read_rows(ATTRACTIONS_CSV):
+            entries.append((row["Destination Name"], "Attraction"))
+            entries.append((row["District"], "District"))
+        for row in read_rows(HOTELS_CSV):
+            entries.append((row["Hotel Name"], "Hotel"))
+        for row in read_rows(RESTAURANTS_CSV):
+            entries.append((row["Name"], "Restaurant"))
+    except FileNotFoundError as e:
+        print(f"⚠️ Dataset missing, suggestions limited to the database: {e}")
+
+    entries.extend((name, "Province") for name in PROVINCE_NAMES.values())
+    return entries
+
+
+suggest_index = SharedIndex(lambda: SuggestIndex(collect_entries()), "suggest index")
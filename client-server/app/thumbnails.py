@@ -0,0 +1,298 @@
+"""
+Pre-generated, resized derivatives of the dataset and upload images.
+
+Every image under ``SOURCE_DIRS`` gets a small ``thumb`` (search result cards)
+and a ``medium`` (detail pages) variant under ``datasets/derived/<variant>/``,
+mirroring the source path, e.g.
+
+    datasets/project_imgfold/project_images/Pokhara/a.jpg
+    -> datasets/derived/thumb/project_imgfold/project_images/Pokhara/a.webp
+
+Builds run in a process pool and are incremental: ``cache/derivatives.json``
+records each source's mtime, size and SHA-1, so unchanged files are skipped by
+a stat and touched-but-identical files by a hash. A variant is only kept when
+it is smaller than its source. Responses reference a derivative once it is
+recorded there, and fall back to the original otherwise.
+
+Rebuild offline with ``python build_thumbnails.py``.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from .database import BASE_DIR
+from .image_manifest import IMAGE_EXTENSIONS
+
+DATASETS_DIR = os.path.join(BASE_DIR, "datasets")
+SOURCE_DIRS = (
+    os.path.join(DATASETS_DIR, "project_imgfold", "project_images"),
+    os.path.join(DATASETS_DIR, "uploads"),
+)
+DERIVED_DIR = os.path.join(DATASETS_DIR, "derived")
+STATE_FILE = os.path.join(BASE_DIR, "cache", "derivatives.json")
+
+# Variant -> longest side in pixels
+VARIANTS = {
+    "thumb": 256,    # search cards are 128 CSS px; 2x for high-DPI screens
+    "medium": 1280,
+}
+QUALITY = 80
+
+if PIL_AVAILABLE and features.check("webp"):
+    FORMAT, EXTENSION = "WEBP", ".webp"
+else:
+    FORMAT, EXTENSION = "JPEG", ".jpg"
+
+_FORMAT_VERSION = 2
+
+
+def normalize_path(path):
+    """
+    ``/datasets/uploads/a.jpg``, ``datasets\\x\\a.jpg`` or the absolute path
+    -> ``datasets/uploads/a.jpg``, the form used in URLs and the state file
+    """
+    path = (path or "").replace("\\", "/")
+    base = BASE_DIR.replace("\\", "/").rstrip("/") + "/"
+    if path.startswith(base):
+        path = path[len(base):]
+    return path.lstrip("/")
+
+
+def disk_path(path):
+    """Where a normalized path is on disk, whatever the working directory"""
+    return os.path.join(BASE_DIR, *path.split("/"))
+
+
+def derivative_path(source, variant):
+    """Where ``variant`` of a source image under ``datasets/`` is written (normalized)"""
+    relative = os.path.relpath(disk_path(source), DATASETS_DIR)
+    return normalize_path(os.path.join(DERIVED_DIR, variant, os.path.splitext(relative)[0] + EXTENSION))
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ------------------ RENDERING (runs in worker processes) ------------------
+
+def render(source):
+    """
+    Decode ``source`` once and write every variant that comes out smaller than
+    the original (many dataset images are already thumbnail-sized, and those
+    are served as they are). Returns (source, [variants written], error or None).
+    Module-level so it can be pickled into the process pool.
+    """
+    written = []
+    try:
+        source_size = os.path.getsize(disk_path(source))
+        with Image.open(disk_path(source)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            for variant, size in VARIANTS.items():
+                target = disk_path(derivative_path(source, variant))
+                copy = image.copy()
+                copy.thumbnail((size, size), Image.LANCZOS)
+                buffer = io.BytesIO()
+                copy.save(buffer, FORMAT, quality=QUALITY)
+                if buffer.tell() >= source_size:
+                    _remove(target)
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f"{target}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(buffer.getbuffer())
+                os.replace(tmp_path, target)
+                written.append(variant)
+        return source, written, None
+    except Exception as e:  # a corrupt file must not stop the build
+        return source, written, str(e)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ------------------ BUILD + LOOKUP ------------------
+
+class Derivatives:
+    """Builds derivatives and maps source image paths to derivative URLs"""
+
+    def __init__(self, source_dirs=SOURCE_DIRS, state_path=STATE_FILE, check_interval=30.0):
+        self.source_dirs = source_dirs
+        self.state_path = state_path
+        self.check_interval = check_interval
+
+        self._state = {}   # source path -> [mtime_ns, size, sha1, [variants built]]
+        self._state_mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._background = None
+
+    # ------------------ LOOKUP ------------------
+
+    def url(self, path, variant):
+        """Derivative path for an image if it has been built, else the path unchanged"""
+        if time.monotonic() >= self._next_check:
+            self._reload()
+        source = normalize_path(path)
+        entry = self._state.get(source)
+        if entry and variant in entry[3]:
+            return derivative_path(source, variant)
+        return path
+
+    def urls(self, paths, variant):
+        return [self.url(path, variant) for path in paths]
+
+    def _reload(self):
+        """Pick up builds made by other processes (build_thumbnails.py, upload workers)"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtime = os.stat(self.state_path).st_mtime_ns
+            except OSError:
+                return
+            if mtime != self._state_mtime:
+                self._state = self._load_state()
+                self._state_mtime = mtime
+
+    # ------------------ BUILDING ------------------
+
+    def _sources(self):
+        for root in self.source_dirs:
+            for folder, _, files in os.walk(root):
+                for name in files:
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield normalize_path(os.path.join(folder, name))
+
+    def build(self, sources=None, workers=None):
+        """
+        Bring derivatives up to date for ``sources`` (default: every source
+        image). Returns (rendered, skipped, failed).
+        """
+        if not PIL_AVAILABLE:
+            print("⚠️ Pillow not installed; serving original images only")
+            return 0, 0, 0
+
+        started = time.perf_counter()
+        full_scan = sources is None
+        state = self._load_state()
+        fresh = {}
+        pending = []
+        seen = set()
+        skipped = 0
+
+        for source in (self._sources() if full_scan else map(normalize_path, sources)):
+            try:
+                stat = os.stat(disk_path(source))
+            except OSError:
+                continue
+            seen.add(source)
+            entry = state.get(source)
+            if entry and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+                fresh[source] = entry
+                skipped += 1
+                continue
+            digest = file_hash(disk_path(source))
+            if entry and entry[2] == digest:
+                fresh[source] = [stat.st_mtime_ns, stat.st_size, digest, entry[3]]  # touched, not changed
+                skipped += 1
+                continue
+            pending.append((source, [stat.st_mtime_ns, stat.st_size, digest]))
+
+        failed = 0
+        entries = dict(pending)
+        workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(render, entries, chunksize=max(1, len(pending) // (4 * workers)))
+        else:
+            pool = None
+            results = map(render, entries)
+        try:
+            for source, written, error in results:
+                if error:
+                    failed += 1
+                    print(f"⚠️ Could not resize {source}: {error}")
+                else:
+                    fresh[source] = entries[source] + [written]
+        finally:
+            if pool:
+                pool.shutdown()
+
+        with self._lock:
+            # Re-read so concurrent partial builds are not lost
+            state = self._load_state()
+            if full_scan:
+                for source in set(state) - seen:
+                    self._remove_outputs(source)
+                state = {s: e for s, e in state.items() if s in seen}
+            state.update(fresh)
+            self._save_state(state)
+            self._state = state
+
+        rendered = len(pending) - failed
+        print(f"✅ Image derivatives: {rendered} rendered, {skipped} up to date, {failed} failed "
+              f"in {time.perf_counter() - started:.2f}s")
+        return rendered, skipped, failed
+
+    def build_async(self, sources):
+        """
+        Queue derivatives for newly saved images on a single background
+        worker, so the caller (e.g. an upload request) does not wait for them.
+        """
+        with self._lock:
+            if self._background is None:
+                self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="derivatives")
+        return self._background.submit(self.build, list(sources), 1)
+
+    def _remove_outputs(self, source):
+        """Delete the derivatives of a source image that no longer exists"""
+        for variant in VARIANTS:
+            _remove(disk_path(derivative_path(source, variant)))
+
+    # ------------------ PERSISTENCE ------------------
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != _FORMAT_VERSION or data.get("format") != FORMAT:
+            return {}
+        return data["sources"]
+
+    def _save_state(self, state):
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": _FORMAT_VERSION, "format": FORMAT, "sources": state},
+                          f, separators=(",", ":"))
+            os.replace(tmp_path, self.state_path)
+            self._state_mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError as e:
+            print(f"⚠️ Could not persist derivative state: {e}")
+
+
+# Shared instance used by the routes
+derivatives = Derivatives()
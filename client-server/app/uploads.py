@@ -0,0 +1,83 @@
+"""
+Content-addressed store for user uploaded images.
+
+Each upload is streamed to a temporary file in fixed-size chunks while it is
+hashed (SHA-256), then moved to ``datasets/uploads/<aa>/<hash><ext>``. Files
+are named by their content, so two users uploading ``image.jpg`` never clash,
+and the same image uploaded twice is stored once.
+"""
+
+import hashlib
+import os
+import uuid
+from collections import namedtuple
+
+from werkzeug.utils import secure_filename
+
+from .database import BASE_DIR
+from .image_manifest import IMAGE_EXTENSIONS
+
+UPLOAD_DIR = os.path.join(BASE_DIR, "datasets", "uploads")
+UPLOAD_URL = "/datasets/uploads"
+CHUNK_SIZE = 64 * 1024
+
+
+class UnsupportedUpload(ValueError):
+    """Raised for files that are not one of the accepted image types"""
+
+
+# Where an upload ended up: ``path`` on disk (relative to the app directory),
+# ``url`` as served by /datasets/<path>, and whether identical content was
+# already stored
+StoredFile = namedtuple("StoredFile", "content_hash path url original_filename size duplicate")
+
+
+def _extension(filename):
+    ext = os.path.splitext(secure_filename(filename or ""))[1].lower()
+    if ext not in IMAGE_EXTENSIONS:
+        raise UnsupportedUpload(filename)
+    return ".jpg" if ext == ".jpeg" else ext
+
+
+def store_upload(file_storage, upload_dir=UPLOAD_DIR):
+    """Stream a werkzeug FileStorage into the store and return its StoredFile"""
+    ext = _extension(file_storage.filename)
+    os.makedirs(upload_dir, exist_ok=True)
+    tmp_path = os.path.join(upload_dir, f".upload-{uuid.uuid4().hex}.tmp")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        content_hash = digest.hexdigest()
+        name = f"{content_hash}{ext}"
+        folder = os.path.join(upload_dir, content_hash[:2])
+        path = os.path.join(folder, name)
+
+        duplicate = os.path.exists(path)
+        if duplicate:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(folder, exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StoredFile(
+        content_hash=content_hash,
+        path=os.path.relpath(path, BASE_DIR).replace("\\", "/"),
+        url=f"{UPLOAD_URL}/{content_hash[:2]}/{name}",
+        original_filename=file_storage.filename,
+        size=size,
+        duplicate=duplicate,
+    )
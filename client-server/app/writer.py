@@ -0,0 +1,237 @@
+"""
+Serialized writes with group commit.
+
+SQLite allows one writer at a time. When every request commits its own small
+transaction, concurrent requests queue on the write lock, and a transaction
+that read first and writes second can fail straight away with "database is
+locked" (a lock upgrade does not wait on busy_timeout).
+
+Instead, write jobs are queued to a single writer thread. Each job is a
+function ``fn(db, *args)`` that receives the writer's session. The thread
+takes every job waiting in the queue, up to ``max_batch``, and runs them in one
+``BEGIN IMMEDIATE`` transaction:
+
+* every job runs inside its own SAVEPOINT, so a failing job (e.g. an
+  IntegrityError) is rolled back and reported on its own future without
+  affecting the rest of the batch;
+* the batch is committed once (group commit), so N concurrent writes cost one
+  fsync instead of N;
+* if the database is busy (another process is writing), the whole batch is
+  rolled back and retried with exponential backoff and jitter.
+
+A job's future resolves only after its batch has committed. Latency is
+bounded: a job waits for the commit in progress plus its own batch, and never
+sits waiting for more jobs to arrive.
+
+``defer()`` is the write-behind variant for writes nobody waits on (e.g. chat
+messages saved while the reply streams): the job is queued and the caller
+moves on. Deferred jobs are committed by ``close()``, which runs at exit, and
+``exit_on_sigterm()`` makes a SIGTERM exit that way too instead of killing the
+process with jobs still queued.
+
+Jobs must only touch the database. Side effects such as cache updates belong
+after ``run()`` returns, because a job may run more than once if its batch is
+retried. Objects returned by a job stay readable after the commit
+(``expire_on_commit=False``) but are detached from any session.
+"""
+
+import atexit
+import queue
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, wait
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from .database import engine
+
+MAX_BATCH = 256
+RETRIES = 8
+BACKOFF = 0.01   # seconds; doubled on every retry
+TIMEOUT = 30.0   # seconds a caller waits for its write
+
+_STOP = object()
+
+
+def is_busy_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED errors, which are worth retrying"""
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+class WriteCoordinator:
+    """Single writer thread that group-commits queued write jobs"""
+
+    def __init__(self, bind=engine, max_batch=MAX_BATCH, retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+        self._session_factory = sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._deferred = set()
+        self._deferred_lock = threading.Lock()
+
+        self.jobs = 0
+        self.commits = 0
+        self.busy_retries = 0
+        self.deferred_failures = 0
+
+    # ------------------ SUBMITTING ------------------
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(db, *args, **kwargs)``; returns a Future for its result"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Write jobs cannot submit other write jobs")
+        self._start()
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Queue a write job and wait until it has been committed; returns its result"""
+        return self.submit(fn, *args, **kwargs).result(timeout=self.timeout)
+
+    def defer(self, fn, *args, **kwargs):
+        """
+        Queue a write job without waiting for it (write-behind). Nobody sees
+        its result, so a failure is reported and dropped.
+        """
+        future = self.submit(fn, *args, **kwargs)
+        with self._deferred_lock:
+            self._deferred.add(future)
+        future.add_done_callback(self._deferred_done)
+        return future
+
+    def _deferred_done(self, future):
+        with self._deferred_lock:
+            self._deferred.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            self.deferred_failures += 1
+            print(f"⚠️ Deferred write failed: {future.exception()}")
+
+    def flush(self, timeout=None):
+        """Wait for every deferred job queued so far; False if some are still pending"""
+        with self._deferred_lock:
+            pending = list(self._deferred)
+        return not wait(pending, timeout=self.timeout if timeout is None else timeout).not_done
+
+    def stats(self):
+        return {
+            "jobs": self.jobs,
+            "commits": self.commits,
+            "jobs_per_commit": round(self.jobs / self.commits, 2) if self.commits else 0.0,
+            "busy_retries": self.busy_retries,
+            "queued": self._queue.qsize(),
+            "deferred_pending": len(self._deferred),
+            "deferred_failures": self.deferred_failures,
+        }
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                thread.start()
+                self._thread = thread
+                atexit.register(self.close)
+
+    def close(self):
+        """Commit everything already queued, then stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    # ------------------ WRITER THREAD ------------------
+
+    def _loop(self):
+        while True:
+            job = self._queue.get()
+            stop = job is _STOP
+            batch = [] if stop else [job]
+            # Take whatever queued up while the previous batch was committing
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stop = True
+                    break
+                batch.append(job)
+            if batch:
+                self._commit([job for job in batch if job[0].set_running_or_notify_cancel()])
+            if stop:
+                return
+
+    def _commit(self, batch):
+        attempt = 0
+        while True:
+            try:
+                results = self._execute(batch)
+                break
+            except Exception as e:
+                if is_busy_error(e) and attempt < self.retries:
+                    self.busy_retries += 1
+                    time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                    attempt += 1
+                    continue
+                for future, *_ in batch:
+                    future.set_exception(e)
+                return
+
+        self.jobs += len(batch)
+        self.commits += 1
+        for (future, *_), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _execute(self, batch):
+        """Run one batch in a single transaction; returns [(ok, result or exception)]"""
+        results = []
+        with self._session_factory() as db:
+            connection = db.connection()
+            if connection.dialect.name == "sqlite":
+                # Take the write lock up front (waiting on busy_timeout) instead
+                # of failing on a read -> write lock upgrade halfway through
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+            for _, fn, args, kwargs in batch:
+                try:
+                    with db.begin_nested():
+                        results.append((True, fn(db, *args, **kwargs)))
+                except Exception as e:
+                    if is_busy_error(e):
+                        raise
+                    results.append((False, e))
+            db.commit()
+        return results
+
+
+def exit_on_sigterm():
+    """
+    Make SIGTERM a normal exit, so atexit handlers (``close()``) commit the
+    queued writes; by default SIGTERM ends the process on the spot. Leaves
+    handlers installed by a server alone and must run in the main thread.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+
+# Shared instance used by crud and the routes
+writer = WriteCoordinator()
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Rebuild the precomputed "similar places" table (cache/similar_items.npz)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.recommender import similar_items
+
+if __name__ == "__main__":
+    similar_items.build()
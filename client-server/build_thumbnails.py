@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Render thumbnail and medium derivatives of the dataset and upload images
+(datasets/derived/), skipping images that have not changed since the last run
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.thumbnails import derivatives
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    derivatives.build(workers=args.workers)
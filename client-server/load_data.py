@@ -1,38 +1,17 @@
-import csv
-from database import SessionLocal
-from models import Hotel, Restaurant, Attraction
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-db = SessionLocal()
+from app.database import init_db
+from app.datasets import DATASETS_DIR
+from app.ingest import load_all, BATCH_SIZE
 
-with open("datasets/data.csv", newline="", encoding="utf-8") as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        images = row["image_url"].split(",") if row["image_url"] else []
-        if row["type"].lower() == "hotel":
-            db.add(Hotel(
-                name=row["name"],
-                location=row.get("location", ""),
-                description=row.get("description", ""),
-                tags=row.get("tags", ""),
-                image_url=images[0] if images else None
-            ))
-        elif row["type"].lower() == "restaurant":
-            db.add(Restaurant(
-                name=row["name"],
-                location=row.get("location", ""),
-                description=row.get("description", ""),
-                tags=row.get("tags", ""),
-                image_url=images[0] if images else None
-            ))
-        elif row["type"].lower() == "attraction":
-            db.add(Attraction(
-                name=row["name"],
-                location=row.get("location", ""),
-                description=row.get("description", ""),
-                tags=row.get("tags", ""),
-                image_url=images[0] if images else None
-            ))
+parser = argparse.ArgumentParser(description="Load (or reload) the dataset CSVs into the database")
+parser.add_argument("--datasets-dir", default=DATASETS_DIR, help="directory holding the CSVs")
+parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per transaction")
+args = parser.parse_args()
 
-db.commit()
-db.close()
+init_db()
+load_all(datasets_dir=args.datasets_dir, batch_size=args.batch_size)
 print("✅ Dataset loaded into database successfully!")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Show the outbound mail queue, send what is due (--drain), or measure the
+throughput of the workers and SMTP server with test emails (--test N)
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+from app.database import SessionLocal, init_db
+from app.mailer import count_due, mail_queue
+
+parser = argparse.ArgumentParser(description="Inspect or drain the outbound mail queue")
+parser.add_argument("--drain", action="store_true",
+                    help="send every email that is due, then exit")
+parser.add_argument("--test", type=int, metavar="N",
+                    help="queue N welcome emails to example.com addresses, send them and report throughput")
+args = parser.parse_args()
+
+
+def queue_query(fn):
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+init_db()
+
+if args.test or args.drain:
+    started = time.perf_counter()
+    if args.test:
+        for i in range(args.test):
+            mail_queue.enqueue(f"mail-queue-test+{i}@example.com", "welcome")
+        print(f"✅ Queued {args.test} test emails in {time.perf_counter() - started:.2f}s")
+
+    if not mail_queue.start():
+        sys.exit(1)
+    # Retries wait out their backoff; only what is due now is waited for
+    while queue_query(count_due) and mail_queue.stats()["workers"]:
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    stats = mail_queue.stats()
+    mail_queue.stop()
+    if stats["config_error"]:
+        print(f"❌ Mail queue stopped: {stats['config_error']}")
+
+    print(f"✅ Sent {stats['sent']} emails in {elapsed:.2f}s ({stats['sent'] / elapsed:.1f}/s) "
+          f"over {stats['connections_opened']} SMTP connections, {stats['workers']} workers")
+    if stats["retried"] or stats["failed"]:
+        print(f"⚠️ {stats['retried']} sends will be retried, {stats['failed']} failed for good")
+
+print(f"📊 Queue: {queue_query(lambda db: mail_queue.stats(db)['queue'])}")
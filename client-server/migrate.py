@@ -0,0 +1,24 @@
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine, init_db
+from app.migrations import MIGRATIONS, check_query_plans, schema_version
+
+parser = argparse.ArgumentParser(description="Bring the database schema up to date")
+parser.add_argument("--check", action="store_true",
+                    help="also verify with EXPLAIN QUERY PLAN that every hot route uses an index")
+args = parser.parse_args()
+
+init_db()
+print(f"✅ Schema version {schema_version(engine)} (latest {MIGRATIONS[-1].version})")
+
+if args.check:
+    failures = 0
+    for route, uses_index, plan in check_query_plans(engine):
+        print(f"{'✅' if uses_index else '❌'} {route}: {'; '.join(plan)}")
+        failures += not uses_index
+    if failures:
+        print(f"❌ {failures} hot queries scan a full table")
+        sys.exit(1)
@@ -0,0 +1,201 @@
+"""MailQueue against a stub SMTP server: claiming, sending, retries and failures"""
+
+import socketserver
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from app.mailer import MailQueue, SmtpSettings, _claim
+from app.models import OutboundEmail
+from app.writer import WriteCoordinator
+
+
+class StubSmtp(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP server. Recipients containing "bounce" are refused (550),
+    messages to "retry" addresses get a temporary 451 after DATA, and every
+    login is rejected when ``reject_login`` is set.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, reject_login=False):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.reject_login = reject_login
+        self.delivered = []
+        self.connections = 0
+
+
+class _StubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stub")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self.reply("535 authentication failed" if server.reject_login else "235 ok")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 ok")
+            elif verb == "RCPT":
+                if "bounce" in command:
+                    self.reply("550 no such user")
+                else:
+                    recipients.append(command[command.index("<") + 1:command.rindex(">")])
+                    self.reply("250 ok")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                if any("retry" in r for r in recipients):
+                    self.reply("451 try again later")
+                else:
+                    server.delivered.extend(recipients)
+                    self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+def start_stub(**options):
+    server = StubSmtp(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def writer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mail.db'}", connect_args={"check_same_thread": False})
+    OutboundEmail.__table__.create(engine)
+    writer = WriteCoordinator(bind=engine, timeout=5.0)
+    yield writer
+    writer.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def smtp():
+    server = start_stub()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_queue(writer, server, **options):
+    settings = SmtpSettings(host="127.0.0.1", port=server.server_address[1], sender="news@example.com",
+                            password="secret", starttls=False, timeout=5.0)
+    return MailQueue(settings=settings, workers=1, poll=0.05, writer=writer, **options)
+
+
+def rows(writer):
+    def read(db):
+        return {e.recipient: e for e in db.execute(select(OutboundEmail)).scalars()}
+    return writer.run(read)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_claim_leases_rows_to_one_worker(writer):
+    queue = MailQueue(writer=writer)
+    ids = [queue.enqueue(f"user{i}@example.com") for i in range(3)]
+
+    first = writer.run(_claim, 2, 300)
+    second = writer.run(_claim, 10, 300)
+    assert [e.id for e in first] == ids[:2]
+    assert [e.id for e in second] == ids[2:]
+    assert writer.run(_claim, 10, 300) == []
+    assert {e.status for e in rows(writer).values()} == {"sending"}
+    assert {e.attempts for e in rows(writer).values()} == {1}
+
+
+def test_send_retry_and_fail(writer, smtp):
+    queue = make_queue(writer, smtp)
+    for recipient in ("ok@example.com", "retry@example.com", "bounce@example.com"):
+        queue.enqueue(recipient)
+    assert queue.start()
+    try:
+        wait_until(lambda: queue.sent + queue.retried + queue.failed == 3)
+        stats = queue.stats()
+    finally:
+        queue.stop()
+
+    emails = rows(writer)
+    assert emails["ok@example.com"].status == "sent"
+    assert emails["retry@example.com"].status == "pending"
+    assert emails["retry@example.com"].attempts == 1
+    assert "451" in emails["retry@example.com"].last_error
+    assert emails["bounce@example.com"].status == "failed"
+    assert smtp.delivered == ["ok@example.com"]
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (1, 1, 1)
+    assert stats["connections_opened"] == smtp.connections
+
+
+def test_rejected_login_stops_the_queue(writer):
+    server = start_stub(reject_login=True)
+    try:
+        queue = make_queue(writer, server)
+        for i in range(3):
+            queue.enqueue(f"user{i}@example.com")
+        assert queue.start()
+        wait_until(lambda: queue.stats()["workers"] == 0)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = queue.stats()
+    assert "535" in stats["config_error"]
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (0, 0, 0)
+    # Handed back untouched: no attempt used up, due again straight away
+    assert {(e.status, e.attempts) for e in rows(writer).values()} == {("pending", 0)}
+
+
+def test_placeholder_settings_do_not_start(writer):
+    settings = SmtpSettings(host="smtp.gmail.com", port=587, sender="your-email@gmail.com",
+                            password="your-app-password", starttls=True, timeout=5.0)
+    queue = MailQueue(settings=settings, writer=writer)
+    assert not queue.start()
+    assert queue.stats()["workers"] == 0
+
+
+def test_failed_record_is_retried(writer, smtp, monkeypatch):
+    monkeypatch.setattr("app.mailer.RECORD_BACKOFF", 0.01)
+    queue = make_queue(writer, smtp)
+    queue.enqueue("ok@example.com")
+
+    real_run, failures = writer.run, []
+
+    def flaky_run(fn, *args, **kwargs):
+        if fn.__name__ == "_record" and not failures:
+            failures.append(fn)
+            raise RuntimeError("database is unavailable")
+        return real_run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(writer, "run", flaky_run)
+    assert queue.start()
+    try:
+        wait_until(lambda: rows(writer)["ok@example.com"].status == "sent")
+    finally:
+        queue.stop()
+    assert failures
+    assert queue.stats()["dead_workers"] == 0
@@ -0,0 +1,97 @@
+"""WriteCoordinator: group commit, per-job rollback and write-behind"""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from app.writer import WriteCoordinator
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}", connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def writer(engine):
+    writer = WriteCoordinator(bind=engine, timeout=5.0)
+    yield writer
+    writer.close()
+
+
+def insert(db, name):
+    return db.execute(text("INSERT INTO item (name) VALUES (:name) RETURNING id"), {"name": name}).scalar()
+
+
+def names(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT name FROM item ORDER BY id")).scalars().all()
+
+
+def hold_writer(writer):
+    """Keep the writer thread busy until the returned event is set, so later jobs queue up"""
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(db):
+        started.set()
+        release.wait(5.0)
+
+    future = writer.submit(blocking)
+    assert started.wait(5.0)
+    return future, release
+
+
+def test_queued_jobs_share_one_commit(engine, writer):
+    blocker, release = hold_writer(writer)
+    futures = [writer.submit(insert, f"item-{i}") for i in range(5)]
+    release.set()
+
+    assert [f.result(5.0) for f in futures] == [1, 2, 3, 4, 5]
+    blocker.result(5.0)
+    assert writer.stats()["commits"] == 2  # the blocking job's batch, then all five inserts
+    assert writer.stats()["jobs"] == 6
+    assert names(engine) == [f"item-{i}" for i in range(5)]
+
+
+def test_failing_job_is_rolled_back_alone(engine, writer):
+    writer.run(insert, "taken")
+    blocker, release = hold_writer(writer)
+    before = writer.submit(insert, "before")
+    duplicate = writer.submit(insert, "taken")
+    after = writer.submit(insert, "after")
+    release.set()
+
+    assert before.result(5.0) and after.result(5.0)
+    with pytest.raises(IntegrityError):
+        duplicate.result(5.0)
+    assert writer.stats()["commits"] == 3
+    assert names(engine) == ["taken", "before", "after"]
+
+
+def test_flush_waits_for_deferred_jobs(engine, writer):
+    blocker, release = hold_writer(writer)
+    for i in range(3):
+        writer.defer(insert, f"deferred-{i}")
+    writer.defer(insert, "deferred-0")  # fails on the unique name; reported, not raised
+    assert writer.stats()["deferred_pending"] == 4
+    assert not writer.flush(timeout=0.05)
+
+    release.set()
+    assert writer.flush()
+    assert writer.stats()["deferred_pending"] == 0
+    assert writer.stats()["deferred_failures"] == 1
+    assert names(engine) == ["deferred-0", "deferred-1", "deferred-2"]
+
+
+def test_close_commits_queued_jobs(engine, writer):
+    blocker, release = hold_writer(writer)
+    writer.defer(insert, "queued")
+    release.set()
+    writer.close()
+    assert names(engine) == ["queued"]
@@ -65,6 +65,9 @@ export default function ChatPage() {
   const [chats, setChats] = useState([]);
   const [currentChatId, setCurrentChatId] = useState(null);
   const [messages, setMessages] = useState([]);
+  // Cursors for the next page of older chats / earlier messages (null when none)
+  const [chatsCursor, setChatsCursor] = useState(null);
+  const [messagesCursor, setMessagesCursor] = useState(null);
 
   const [input, setInput] = useState("");
   const [searchQuery, setSearchQuery] = useState("");
@@ -83,27 +86,49 @@ export default function ChatPage() {
     if (userId) fetchChats();
   }, [userId]);
 
-  const fetchChats = async () => {
+  const fetchChats = async (cursor = null) => {
     try {
-      const res = await axios.get(`/api/chat/history?user_id=${userId}`);
-      setChats(res.data);
+      const res = await axios.get("/api/chat/history", {
+        params: { user_id: userId, cursor },
+      });
+      setChats((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setChatsCursor(res.headers["x-next-cursor"] || null);
     } catch (error) {
       console.error("Error fetching chats", error);
     }
   };
 
+  // Messages are stored as { sender, content } in the UI
+  const toUiMessages = (data) =>
+    data.map((m) => ({ sender: m.type, content: m.text }));
+
   const loadChat = async (chatId) => {
     setCurrentChatId(chatId);
     setShowHistory(false);
 
     try {
-      const res = await axios.get(`/api/chat/messages?chat_id=${chatId}`);
-      setMessages(res.data);
+      const res = await axios.get("/api/chat/messages", { params: { chat_id: chatId } });
+      setMessages(toUiMessages(res.data));
+      setMessagesCursor(res.headers["x-next-cursor"] || null);
     } catch (error) {
       console.error("Error loading chat", error);
     }
   };
 
+  const loadEarlierMessages = async () => {
+    if (!messagesCursor) return;
+
+    try {
+      const res = await axios.get("/api/chat/messages", {
+        params: { chat_id: currentChatId, cursor: messagesCursor },
+      });
+      setMessages((prev) => [...toUiMessages(res.data), ...prev]);
+      setMessagesCursor(res.headers["x-next-cursor"] || null);
+    } catch (error) {
+      console.error("Error loading earlier messages", error);
+    }
+  };
+
   const handleNewChat = async () => {
     if (!userId) return alert("You must sign in first!");
 
@@ -113,6 +138,7 @@ export default function ChatPage() {
 
       setCurrentChatId(newChatId);
       setMessages([]);
+      setMessagesCursor(null);
       fetchChats();
     } catch (error) {
       console.error("Error creating chat", error);
@@ -130,30 +156,41 @@ export default function ChatPage() {
     setInput("");
 
     try {
-      // 2. Save user message
-      await axios.post("/api/chat/message", {
-        chat_id: currentChatId,
-        sender: "user",
-        content: userText,
-      });
-
-      // 3. Request AI reply (auto reply)
-      const reply = await axios.post("/api/chat/ai", {
-        chat_id: currentChatId,
-        message: userText,
-      });
-
-      const botText = reply.data.response;
-
-      // 4. Show bot message in UI
-      setMessages((prev) => [...prev, { sender: "bot", content: botText }]);
-
-      // 5. Save bot message
-      await axios.post("/api/chat/message", {
-        chat_id: currentChatId,
-        sender: "bot",
-        content: botText,
+      // 2. Send it; the server saves both messages and streams the reply (SSE)
+      const response = await fetch("/api/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ chat_id: currentChatId, message: userText }),
       });
+      if (!response.ok || !response.body) {
+        throw new Error(`Chat stream failed (${response.status})`);
+      }
+
+      // 3. Show bot message in UI, growing as the reply arrives
+      setMessages((prev) => [...prev, { sender: "bot", content: "" }]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const event of events) {
+          const lines = event.split("\n");
+          const data = lines.find((line) => line.startsWith("data: "));
+          if (lines[0] !== "event: delta" || !data) continue;
+
+          const { text } = JSON.parse(data.slice(6));
+          setMessages((prev) => {
+            const last = prev[prev.length - 1];
+            return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+          });
+        }
+      }
     } catch (error) {
       console.error("Error sending message", error);
     }
@@ -220,8 +257,19 @@ export default function ChatPage() {
                   className="p-2 bg-white hover:bg-gray-200 rounded text-left"
                 >
                   {chat.title || `Chat ${chat.id}`}
+                  {chat.snippet && (
+                    <span className="block text-xs text-gray-500 truncate">{chat.snippet}</span>
+                  )}
                 </button>
               ))}
+              {searchResults.length === 0 && chatsCursor && (
+                <button
+                  onClick={() => fetchChats(chatsCursor)}
+                  className="p-2 text-sm text-blue-600 hover:underline"
+                >
+                  Load more
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -230,10 +278,18 @@ export default function ChatPage() {
         <div className="flex-1 flex flex-col items-center justify-start p-6">
           <div className="w-full max-w-2xl bg-black rounded-xl shadow-lg flex flex-col">
             <div className="p-4 h-[600px] overflow-y-auto flex flex-col gap-2">
+              {messagesCursor && (
+                <button
+                  onClick={loadEarlierMessages}
+                  className="self-center text-sm text-blue-400 hover:underline"
+                >
+                  Load earlier messages
+                </button>
+              )}
               {messages.map((msg, idx) => (
                 <div
                   key={idx}
-                  className={`p-2 rounded-md max-w-[75%] ${
+                  className={`p-2 rounded-md max-w-[75%] whitespace-pre-line ${
                     msg.sender === "user"
                       ? "bg-gray-800 text-white self-end"
                       : "bg-gray-700 text-white self-start"
@@ -91,10 +91,11 @@ const Wishlist = () => {
     }
   };
 
-  const getDifficultyColor = (difficulty) => {
+  const getDifficultyColor = (difficulty = '') => {
+    if (!difficulty) return 'text-gray-600 bg-gray-100';
     if (difficulty.includes('Easy')) return 'text-green-600 bg-green-100';
     if (difficulty.includes('Moderate')) return 'text-yellow-600 bg-yellow-100';
-    if (difficulty.includes('Challenging')) return 'text-red-600 bg-red-100';
+    if (difficulty.includes('Challenging') || difficulty.includes('Hard')) return 'text-red-600 bg-red-100';
     return 'text-gray-600 bg-gray-100';
   };
 
@@ -293,7 +294,7 @@ const WishlistCard = ({ item, theme, onRemove, getCategoryIcon, getDifficultyCol
         <div className="absolute bottom-4 right-4">
           <div className="flex items-center gap-1 bg-white/20 backdrop-blur-sm rounded-full px-3 py-1 border border-white/30">
             <FaStar className="text-yellow-400 text-sm" />
-            <span className="text-white text-sm font-bold">{item.rating}</span>
+            <span className="text-white text-sm font-bold">{item.rating ?? 'New'}</span>
           </div>
         </div>
       </div>
@@ -316,19 +317,19 @@ const WishlistCard = ({ item, theme, onRemove, getCategoryIcon, getDifficultyCol
         </p>
 
         <div className="flex items-center justify-between mb-4">
-          <span className={`px-3 py-1 rounded-lg text-xs font-semibold ${getDifficultyColor(item.difficulty)}`}>
-            {item.difficulty}
+          <span className={`px-3 py-1 rounded-lg text-xs font-semibold ${getDifficultyColor(item.difficulty || '')}`}>
+            {item.difficulty || 'Any level'}
           </span>
-          <span className="text-sm font-medium">{item.duration}</span>
+          <span className="text-sm font-medium">{item.duration || ''}</span>
         </div>
 
         <div className="flex items-center justify-between">
           <div className="flex items-center gap-1">
             <span className={`text-sm ${theme === 'dark' ? 'text-slate-400' : 'text-gray-600'}`}>
-              ({item.reviews} reviews)
+              {item.reviews ? `(${item.reviews} reviews)` : ''}
             </span>
           </div>
-          <span className="text-xl font-bold text-teal-500">{item.price}</span>
+          <span className="text-xl font-bold text-teal-500">{item.price || ''}</span>
         </div>
 
         <button className="w-full mt-4 bg-gradient-to-r from-teal-600 to-cyan-600 hover:from-teal-700 hover:to-cyan-700 text-white py-3 rounded-xl font-semibold transition-all duration-300 shadow-lg hover:shadow-xl transform hover:scale-105 flex items-center justify-center gap-2">
@@ -99,6 +99,55 @@ export const wishlistService = {
       console.error('Error checking wishlist status:', error);
       return false;
     }
+  },
+
+  /**
+   * Check a whole page of places with one request
+   * @param {Array<number>} placeIds - Place IDs to check (at most 500)
+   * @param {string} userId - User ID (optional, defaults to demo user)
+   * @returns {Promise<Object>} Map of place ID -> true if in wishlist
+   */
+  async checkMany(placeIds, userId = DEMO_USER_ID) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/wishlist/${userId}/check?ids=${placeIds.join(',')}`);
+      
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      
+      const data = await response.json();
+      return data.in_wishlist;
+    } catch (error) {
+      console.error('Error checking wishlist status:', error);
+      return {};
+    }
+  },
+
+  /**
+   * Add and remove many places in one request (and one transaction)
+   * @param {Object} changes - { add: [placeIds], remove: [placeIds], check: [placeIds] }
+   * @param {string} userId - User ID (optional, defaults to demo user)
+   * @returns {Promise<Object>} { added, removed, not_found, in_wishlist }
+   */
+  async updateMany({ add = [], remove = [], check = [] }, userId = DEMO_USER_ID) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/wishlist/${userId}/batch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ add, remove, check }),
+      });
+      
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      
+      return await response.json();
+    } catch (error) {
+      console.error('Error updating wishlist:', error);
+      throw error;
+    }
   }
 };
 